@@ -1,13 +1,20 @@
+import copy
+import logging
+import threading
 import time
 
 import gym
-import numpy as np
 import quanser_robots
 import torch
-from torch.multiprocessing import Value, Process
+from torch.multiprocessing import Process
 
+from a3c.predictor import Predictor, predict
 from a3c.train_test import train, test
-from a3c.util.util import get_model, get_shared_optimizer
+from a3c.util.export_util import export_policy
+from a3c.util.global_counter import GlobalCounter, GlobalReward
+from a3c.util.thread_budget import ThreadBudget
+from a3c.util.util import get_model, get_shared_optimizer, get_normalizer, load_saved_normalizer, \
+    get_n_env_processes
 
 
 class A3C(object):
@@ -19,9 +26,9 @@ class A3C(object):
         """
         self.args = args
 
-        # global counter
-        self.T = Value('i', 0)
-        self.global_reward = Value('d', -np.inf)
+        # global counter and running reward with one slot per worker
+        self.T = GlobalCounter(args.worker)
+        self.global_reward = GlobalReward(args.worker)
 
         # worker handling
         self.worker_pool = []
@@ -31,6 +38,31 @@ class A3C(object):
             raise Exception('Your given optimizer %s is currently not supported. Choose either "rmsprop" or "adam"',
                             args.optimizer)
 
+        if args.worker_envs < 1:
+            raise Exception('Each A3C worker requires at least one environment.')
+
+        worker_envs = args.n_envs if args.worker == 1 else args.worker_envs
+        if args.async_envs and (worker_envs < 2 or "RR" in args.env_name or args.predictors > 0):
+            raise Exception('Async environment stepping requires at least 2 environments per worker and no '
+                            'predictors.')
+
+        if args.worker_backend not in ['process', 'thread']:
+            raise Exception(f'Your given worker backend {args.worker_backend} is currently not supported. Choose '
+                            f'either "process" or "thread"')
+
+        # the vectorized envs of the worker threads would fork subprocesses from a multi-threaded process
+        if args.worker_backend == "thread" and worker_envs > 1 and args.vec_env != "dummy" \
+                and "RR" not in args.env_name:
+            raise Exception('Thread workers with multiple environments require the dummy vectorized environment.')
+
+        # the thread budget plans one trainer per process, but the intra-op threads are set for the whole process
+        if args.worker_backend == "thread" and args.thread_budget:
+            raise Exception('Thread workers do not support a thread budget.')
+
+        if args.eval_frequency > 0 and (args.eval_envs < 1 or "RR" in args.env_name):
+            raise Exception('Scheduled evaluation requires at least one evaluation environment and a simulated '
+                            'environment.')
+
     def run(self):
         """
         Start A3C worker and test thread
@@ -52,7 +84,8 @@ class A3C(object):
                               global_reward=self.global_reward)
             if not self.args.no_shared_optimizer:
                 optimizer = get_shared_optimizer(model=model, optimizer_name=self.args.optimizer, lr=self.args.lr,
-                                                 path=self.args.path)
+                                                 path=self.args.path, fused=self.args.fused_optimizer,
+                                                 lock=self.args.optimizer_lock)
         else:
             model, model_critic = get_model(env=env, shared=self.args.shared_model, path=self.args.path, T=self.T,
                                             global_reward=self.global_reward)
@@ -61,7 +94,9 @@ class A3C(object):
                                                                    lr=self.args.lr, path=self.args.path,
                                                                    model_critic=model_critic,
                                                                    optimizer_name_critic=self.args.optimizer,
-                                                                   lr_critic=self.args.lr_critic)
+                                                                   lr_critic=self.args.lr_critic,
+                                                                   fused=self.args.fused_optimizer,
+                                                                   lock=self.args.optimizer_lock)
 
         lr_scheduler = None
         lr_scheduler_critic = None
@@ -71,16 +106,85 @@ class A3C(object):
             if critic_optimizer:
                 lr_scheduler_critic = torch.optim.lr_scheduler.ExponentialLR(critic_optimizer, gamma=0.99)
 
+        # each process uses a copy of the normalizer, only the statistics of SharedMeanStd are shared
+        normalizer = get_normalizer(self.args.normalizer, env, self.args.normalizer_merge_frequency)
+        if self.args.path is not None:
+            load_saved_normalizer(normalizer, self.args.path)
+
+        if self.args.export is not None:
+            export_policy(model, normalizer, env.observation_space.shape[0], self.args.max_action, self.args.export,
+                          shared_model=self.args.shared_model, quantize=self.args.quantize)
+            logging.info(f"Exported policy to {self.args.export}.")
+            return
+
+        use_predictors = self.args.predictors > 0 and not self.args.test
+
+        if self.args.async_envs:
+            # the actions are selected without gradients, the loss is computed with one batched forward pass
+            self.args.batched_forward = True
+
+        thread_budget = None
+
+        if self.args.thread_budget:
+            n_trainers = 0 if self.args.test else self.args.worker
+            n_env_processes = 0
+            n_envs = self.args.n_envs if self.args.worker == 1 else self.args.worker_envs
+            # only vectorized envs with subprocesses, single A3C envs run in the worker process
+            if "RR" not in self.args.env_name and (self.args.worker == 1 or n_envs > 1):
+                # the async env groups are two separate vectorized envs
+                group_sizes = [n_envs // 2, n_envs - n_envs // 2] if self.args.async_envs else [n_envs]
+                n_env_processes = sum(get_n_env_processes(self.args.vec_env, n, self.args.envs_per_process)
+                                      for n in group_sizes)
+            thread_budget = ThreadBudget(n_trainers, n_env_processes,
+                                         n_predictors=self.args.predictors if use_predictors else 0)
+            thread_budget.log()
+
+        predictor = None
+
+        if use_predictors:
+            # the predictors only select the actions, the loss is computed with one batched forward pass
+            self.args.batched_forward = True
+
+            n_envs = self.args.n_envs if self.args.worker == 1 else self.args.worker_envs
+            predictor = Predictor(self.args.worker, n_envs, env.observation_space.shape[0],
+                                  env.action_space.shape[0])
+
+            for pid in range(self.args.predictors):
+                p = Process(target=predict, args=(self.args, pid, predictor, model, thread_budget))
+                p.start()
+                self.worker_pool.append(p)
+
         p = Process(target=test, args=(
-            self.args, self.args.worker, model, self.T, self.global_reward, optimizer, model_critic, critic_optimizer))
+            self.args, self.args.worker, model, self.T, self.global_reward, optimizer, model_critic, critic_optimizer,
+            thread_budget, normalizer))
         p.start()
         self.worker_pool.append(p)
 
         if not self.args.test:
+            grad_lock = None
+            if self.args.worker_backend == "thread":
+                # all worker threads share the intra-op thread pool of this process
+                torch.set_num_threads(1)
+
+                # the threads share the gradient buffers of the global models, which are created once here,
+                # the lock is held from copying the local grads until the end of the optimizer step
+                model.flat_parameters.init_grad()
+                if model_critic:
+                    model_critic.flat_parameters.init_grad()
+                grad_lock = threading.Lock()
+
             for wid in range(0, self.args.worker):
-                p = Process(target=train, args=(
-                    self.args, wid, model, self.T, self.global_reward, optimizer, model_critic,
-                    critic_optimizer, lr_scheduler, lr_scheduler_critic))
+                if self.args.worker_backend == "thread":
+                    # the threads use the global model, optimizers and counters directly,
+                    # args and normalizer are modified by the workers and copied for each thread
+                    p = threading.Thread(target=train, args=(
+                        copy.copy(self.args), wid, model, self.T, self.global_reward, optimizer, model_critic,
+                        critic_optimizer, lr_scheduler, lr_scheduler_critic, predictor, thread_budget,
+                        normalizer.worker_copy(), grad_lock), daemon=True)
+                else:
+                    p = Process(target=train, args=(
+                        self.args, wid, model, self.T, self.global_reward, optimizer, model_critic,
+                        critic_optimizer, lr_scheduler, lr_scheduler_critic, predictor, thread_budget, normalizer))
                 p.start()
                 self.worker_pool.append(p)
                 time.sleep(1)
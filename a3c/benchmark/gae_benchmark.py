@@ -0,0 +1,97 @@
+import argparse
+import logging
+import sys
+import timeit
+
+import torch
+
+from a3c.util.util import compute_returns_and_advantages
+from experiments.util.logger_util import enable_logging
+
+
+def compute_returns_and_advantages_loop(rewards: list, values: list, terminals: list, discount: float, tau: float,
+                                        gae: bool = True) -> tuple:
+    """
+    reference implementation with a reversed python loop over the rollout steps
+    :param rewards: list of reward tensors [n_envs, 1] for each step
+    :param values: list of value tensors [n_envs, 1] for each step including the bootstrap value
+    :param terminals: list of tensors [n_envs, 1], which are 0 if the step was terminal else 1
+    :param discount: discount factor
+    :param tau: bias-variance tradeoff for generalized advantage estimation
+    :param gae: use generalized advantage estimation
+    :return: returns, advantages [T, n_envs, 1]
+    """
+    rollout_steps = len(rewards)
+    n_envs = rewards[0].shape[0]
+
+    G = values[-1].detach()
+    advantages = torch.zeros((n_envs, 1))
+
+    ret = torch.zeros((rollout_steps, n_envs, 1))
+    adv = torch.zeros((rollout_steps, n_envs, 1))
+
+    # iterate over all time steps from most recent to the starting one
+    for i in reversed(range(rollout_steps)):
+        G = rewards[i] + discount * terminals[i] * G
+        if gae:
+            td_error = rewards[i] + discount * terminals[i] * values[i + 1] - values[i]
+            advantages = advantages * discount * tau * terminals[i] + td_error
+        else:
+            advantages = G - values[i].detach()
+
+        adv[i] = advantages.detach()
+        ret[i] = G.detach()
+
+    return ret, adv
+
+
+def get_rollout(rollout_steps: int, n_envs: int, terminal_prob: float = .05) -> tuple:
+    """
+    generate a random rollout
+    :param rollout_steps: number of steps
+    :param n_envs: number of environments
+    :param terminal_prob: probability of a terminal state in each step
+    :return: rewards, values, terminals as lists of tensors [n_envs, 1]
+    """
+    rewards = [torch.randn(n_envs, 1) for _ in range(rollout_steps)]
+    values = [torch.randn(n_envs, 1) for _ in range(rollout_steps + 1)]
+    terminals = [(torch.rand(n_envs, 1) > terminal_prob).float() for _ in range(rollout_steps)]
+    return rewards, values, terminals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark of vectorized and loop based GAE')
+    parser.add_argument('--rollout-steps', type=int, nargs="*", default=[5, 20, 50, 200, 1000],
+                        help='Rollout lengths to benchmark. (default: 5 20 50 200 1000)')
+    parser.add_argument('--n-envs', type=int, nargs="*", default=[1, 5, 16],
+                        help='Number of environments to benchmark. (default: 1 5 16)')
+    parser.add_argument('--repeats', type=int, default=1000,
+                        help='Number of calls for each setting. (default: 1000)')
+    args = parser.parse_args(sys.argv[1:])
+
+    enable_logging(logging_lvl=logging.INFO)
+    torch.set_num_threads(1)
+
+    for rollout_steps in args.rollout_steps:
+        for n_envs in args.n_envs:
+            rewards, values, terminals = get_rollout(rollout_steps, n_envs)
+            rewards_stacked, values_stacked, terminals_stacked = [torch.stack(x) for x in [rewards, values, terminals]]
+
+            for gae in [True, False]:
+                time_loop = timeit.timeit(
+                    lambda: compute_returns_and_advantages_loop(rewards, values, terminals, .99, .99, gae),
+                    number=args.repeats) / args.repeats
+                time_vectorized = timeit.timeit(
+                    lambda: compute_returns_and_advantages(rewards_stacked, values_stacked, terminals_stacked, .99,
+                                                           .99, gae), number=args.repeats) / args.repeats
+
+                logging.info(f"rollout_steps={rollout_steps}, n_envs={n_envs}, gae={gae} -- "
+                             f"loop={time_loop * 1e6:.1f}us, vectorized={time_vectorized * 1e6:.1f}us, "
+                             f"speedup={time_loop / time_vectorized:.2f}x")
+                if time_vectorized > time_loop:
+                    logging.warning(f"The vectorized computation is slower than the loop for "
+                                    f"rollout_steps={rollout_steps}, n_envs={n_envs}, gae={gae}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import logging
+import sys
+import tempfile
+import time
+
+import numpy as np
+import torch
+from tensorboardX import SummaryWriter
+
+from a3c.models.actor_critic_network import ActorCriticNetwork
+from a3c.util.flat_parameters import FlatParameters
+from a3c.util.training_statistics import AsyncSummaryWriter, TrainingStatistics
+from experiments.util.logger_util import enable_logging
+
+
+def log_to_tensorboard_numpy(writer: SummaryWriter, model: torch.nn.Module, optimizer: torch.optim.Optimizer,
+                             rewards: torch.Tensor, values: torch.Tensor, losses: list, iteration: int) -> None:
+    """
+    reference implementation, which copies all gradients, values and rewards to numpy and writes them inline
+    :param writer: tensorboard writer
+    :param model: shared model
+    :param optimizer: optimizer of the model
+    :param rewards: rewards of the rollout [T, n_envs, 1]
+    :param values: values of the rollout [T + 1, n_envs, 1]
+    :param losses: total, policy, value and entropy loss
+    :param iteration: global step
+    :return: None
+    """
+    grads = np.concatenate([p.grad.data.cpu().numpy().flatten() for p in model.parameters() if p.grad is not None])
+
+    writer.add_scalar("grad/mean", np.mean(grads), iteration)
+    writer.add_scalar("grad/l2", np.sqrt(np.mean(np.square(grads))), iteration)
+    writer.add_scalar("grad/max", np.max(np.abs(grads)), iteration)
+    writer.add_scalar("grad/var", np.var(grads), iteration)
+    for param_group in optimizer.param_groups:
+        writer.add_scalar("lr", param_group['lr'], iteration)
+
+    valuelist = [v.detach().numpy() for v in values]
+
+    writer.add_scalar("values/mean", np.mean(valuelist), iteration)
+    writer.add_scalar("values/min", np.min(valuelist), iteration)
+    writer.add_scalar("values/max", np.max(valuelist), iteration)
+    writer.add_scalar("reward/batch", np.mean(np.array([r.detach().numpy() for r in rewards])), iteration)
+    for tag, loss in zip(["loss", "loss/policy", "loss/value", "loss/entropy"], losses):
+        writer.add_scalar(tag, loss, iteration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark of the tensorboard logging cost of worker 0')
+    parser.add_argument('--n-inputs', type=int, default=6,
+                        help='Input dimension of the model. (default: 6)')
+    parser.add_argument('--rollout-steps', type=int, default=50,
+                        help='Number of steps of a rollout. (default: 50)')
+    parser.add_argument('--n-envs', type=int, default=1,
+                        help='Number of environments of a rollout. (default: 1)')
+    parser.add_argument('--n-updates', type=int, default=2000,
+                        help='Number of logged updates. (default: 2000)')
+    args = parser.parse_args(sys.argv[1:])
+
+    enable_logging(logging_lvl=logging.INFO)
+    torch.set_num_threads(1)
+
+    model = ActorCriticNetwork(n_inputs=args.n_inputs, n_actions=1)
+    model.flat_parameters = FlatParameters(model)
+    model.flat_parameters.init_grad()
+    model.flat_parameters.grad.normal_()
+    optimizer = torch.optim.Adam(model.parameters())
+
+    rewards = torch.randn(args.rollout_steps, args.n_envs, 1)
+    values = torch.randn(args.rollout_steps + 1, args.n_envs, 1)
+    losses = [torch.randn(()) for _ in range(4)]
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        writer = SummaryWriter(log_dir=log_dir)
+        start = time.perf_counter()
+        for i in range(args.n_updates):
+            log_to_tensorboard_numpy(writer, model, optimizer, rewards, values, [l.item() for l in losses], i)
+        numpy_cost = (time.perf_counter() - start) / args.n_updates
+        writer.close()
+
+        writer = AsyncSummaryWriter(log_dir=log_dir)
+        statistics = TrainingStatistics()
+        start = time.perf_counter()
+        for _ in range(args.n_updates):
+            statistics.update([model.flat_parameters.grad], values, rewards, losses)
+        update_cost = (time.perf_counter() - start) / args.n_updates
+
+        start = time.perf_counter()
+        for i in range(args.n_updates):
+            statistics.update([model.flat_parameters.grad], values, rewards, losses)
+            scalars = statistics.flush()
+            scalars["lr"] = optimizer.param_groups[0]['lr']
+            writer.write(scalars, i)
+        log_cost = (time.perf_counter() - start) / args.n_updates
+        writer.close()
+
+    logging.info(f"numpy logging={1e6 * numpy_cost:.1f}us -- torch statistics per update={1e6 * update_cost:.1f}us "
+                 f"-- torch statistics with flush per update={1e6 * log_cost:.1f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import logging
+import sys
+import time
+
+import torch
+
+from a3c.models.actor_critic_network import ActorCriticNetwork
+from a3c.models.actor_network import ActorNetwork
+from a3c.util.export_util import quantize_model, action_deviation
+from experiments.util.logger_util import enable_logging
+
+
+def run(model: torch.nn.Module, batch_size: int, n_iterations: int) -> tuple:
+    """
+    measure the latency and throughput of the forward pass
+    :param model: model to benchmark
+    :param batch_size: number of states in one forward pass
+    :param n_iterations: number of forward passes
+    :return: mean latency of one forward pass in microseconds, states per second
+    """
+    x = torch.randn(batch_size, model.n_inputs)
+
+    with torch.no_grad():
+        # warm up
+        for _ in range(10):
+            model(x)
+
+        start = time.perf_counter()
+        for _ in range(n_iterations):
+            model(x)
+        duration = time.perf_counter() - start
+
+    return 1e6 * duration / n_iterations, batch_size * n_iterations / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark of fp32 and dynamically int8 quantized models')
+    parser.add_argument('--state-dim', type=int, default=5,
+                        help='Dimension of the states, e.g. 5 for the cartpole and 6 for the qube. (default: 5)')
+    parser.add_argument('--batch-sizes', type=int, nargs="*", default=[1, 16, 256],
+                        help='Number of states in one forward pass. (default: 1 16 256)')
+    parser.add_argument('--n-iterations', type=int, default=2000,
+                        help='Number of forward passes for each setting. (default: 2000)')
+    parser.add_argument('--threads', type=int, default=1,
+                        help='Number of intra-op threads of pytorch. (default: 1)')
+    args = parser.parse_args(sys.argv[1:])
+
+    enable_logging(logging_lvl=logging.INFO)
+
+    torch.set_num_threads(args.threads)
+    torch.manual_seed(0)
+
+    for model, shared_model in [(ActorNetwork(args.state_dim, 1), False),
+                                (ActorCriticNetwork(args.state_dim, 1), True)]:
+        model.eval()
+        quantized = quantize_model(model)
+
+        mean_deviation, max_deviation = action_deviation(model, quantized, torch.randn(10000, args.state_dim),
+                                                         shared_model)
+        logging.info(f"{type(model).__name__} -- action deviation: mean={mean_deviation:.5f}, "
+                     f"max={max_deviation:.5f}")
+
+        for batch_size in args.batch_sizes:
+            latency, throughput = run(model, batch_size, args.n_iterations)
+            latency_int8, throughput_int8 = run(quantized, batch_size, args.n_iterations)
+            logging.info(f"{type(model).__name__} -- batch size={batch_size} -- "
+                         f"fp32: {latency:.1f}us, {throughput:.0f} states/sec -- "
+                         f"int8: {latency_int8:.1f}us, {throughput_int8:.0f} states/sec")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import copy
+import logging
+import sys
+import time
+
+import torch
+import torch.multiprocessing as mp
+
+from a3c.models.actor_critic_network import ActorCriticNetwork
+from a3c.optimizers.fused_shared_adam import FusedSharedAdam
+from a3c.optimizers.shared_adam import SharedAdam
+from a3c.util.flat_parameters import FlatParameters
+from a3c.util.util import get_local_model, sync_weights, sync_grads
+from experiments.util.logger_util import enable_logging
+
+
+def sync_grads_state_dict(model: torch.nn.Module, global_model: torch.nn.Module) -> None:
+    """
+    reference implementation, which points the global gradients to the local ones per parameter
+    :param model: local worker model
+    :param global_model: shared global model
+    :return: None
+    """
+    for param, global_param in zip(model.parameters(), global_model.parameters()):
+        if global_param.grad is not None:
+            return
+        global_param._grad = param.grad
+
+
+def get_global_model(n_inputs: int, flat: bool) -> torch.nn.Module:
+    """
+    create the shared global model
+    :param n_inputs: input dimension of the model
+    :param flat: use flat shared parameters
+    :return: global model
+    """
+    global_model = ActorCriticNetwork(n_inputs=n_inputs, n_actions=1)
+    if flat:
+        global_model.flat_parameters = FlatParameters(global_model, shared=True)
+    else:
+        global_model.share_memory()
+    return global_model
+
+
+def worker(global_model: torch.nn.Module, optimizer: torch.optim.Optimizer, flat: bool, n_updates: int,
+           barrier: mp.Barrier) -> None:
+    """
+    execute weight pull, gradient push and optimizer step without any environment interaction
+    :param global_model: shared global model
+    :param optimizer: shared optimizer of the global model
+    :param flat: use flat parameters for synchronization
+    :param n_updates: number of updates
+    :param barrier: barrier to start all workers at the same time
+    :return: None
+    """
+    torch.set_num_threads(1)
+
+    if flat:
+        model = get_local_model(global_model)
+    else:
+        model = copy.deepcopy(global_model)
+        for p in model.parameters():
+            p.grad = torch.zeros_like(p)
+
+    barrier.wait()
+
+    for _ in range(n_updates):
+        if flat:
+            sync_weights(model, global_model)
+            model.flat_parameters.grad.fill_(1e-3)
+            sync_grads(model, global_model)
+        else:
+            model.load_state_dict(global_model.state_dict())
+            for p in model.parameters():
+                p.grad.fill_(1e-3)
+            sync_grads_state_dict(model, global_model)
+        optimizer.step()
+
+
+def run(n_workers: int, n_inputs: int, flat: bool, n_updates: int, fused: bool = False) -> float:
+    """
+    measure the number of updates per second of all workers
+    :param n_workers: number of worker processes
+    :param n_inputs: input dimension of the model
+    :param flat: use flat parameters for synchronization
+    :param n_updates: number of updates of each worker
+    :param fused: use the fused optimizer, requires flat parameters
+    :return: updates per second
+    """
+    global_model = get_global_model(n_inputs, flat)
+    if fused:
+        optimizer = FusedSharedAdam(global_model.flat_parameters)
+    else:
+        optimizer = SharedAdam(global_model.parameters())
+    optimizer.share_memory()
+
+    barrier = mp.Barrier(n_workers + 1)
+    processes = [mp.Process(target=worker, args=(global_model, optimizer, flat, n_updates, barrier))
+                 for _ in range(n_workers)]
+    for p in processes:
+        p.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+    for p in processes:
+        p.join()
+
+    return n_workers * n_updates / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark of the weight and gradient synchronization of A3C')
+    parser.add_argument('--worker', type=int, nargs="*", default=[1, 2, 4, 8, 16, 32],
+                        help='Number of worker processes to benchmark. (default: 1 2 4 8 16 32)')
+    parser.add_argument('--n-inputs', type=int, default=10,
+                        help='Input dimension of the model. (default: 10)')
+    parser.add_argument('--n-updates', type=int, default=500,
+                        help='Number of updates of each worker. (default: 500)')
+    args = parser.parse_args(sys.argv[1:])
+
+    enable_logging(logging_lvl=logging.INFO)
+
+    for n_workers in args.worker:
+        updates_state_dict = run(n_workers, args.n_inputs, False, args.n_updates)
+        updates_flat = run(n_workers, args.n_inputs, True, args.n_updates)
+        updates_fused = run(n_workers, args.n_inputs, True, args.n_updates, fused=True)
+
+        logging.info(f"worker={n_workers} -- state_dict={updates_state_dict:.1f} updates/s, "
+                     f"flat={updates_flat:.1f} updates/s, flat+fused={updates_fused:.1f} updates/s, "
+                     f"speedup={updates_flat / updates_state_dict:.2f}x/{updates_fused / updates_state_dict:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
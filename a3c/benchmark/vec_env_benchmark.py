@@ -0,0 +1,119 @@
+import argparse
+import logging
+import sys
+import time
+
+import numpy as np
+import quanser_robots
+
+from a3c.util.util import make_env, make_vec_env
+from experiments.util.logger_util import enable_logging
+
+
+def run(vec_env: str, env_name: str, n_envs: int, n_steps: int, envs_per_process: int = 1,
+        policy_delay: float = 0.) -> float:
+    """
+    measure the steps per second of a vectorized environment with random actions
+    :param vec_env: type of vectorized environment
+    :param env_name: gym id
+    :param n_envs: number of environments
+    :param n_steps: number of vectorized steps
+    :param envs_per_process: number of envs per subprocess for shmem
+    :param policy_delay: seconds of simulated action selection before each step
+    :return: environment steps per second
+    """
+    env = make_vec_env(vec_env, [make_env(env_name, 1, i) for i in range(n_envs)], envs_per_process)
+    env.reset()
+
+    actions = np.stack([env.action_space.sample() for _ in range(n_envs)])
+
+    start = time.perf_counter()
+    for _ in range(n_steps):
+        time.sleep(policy_delay)
+        env.step(actions)
+    steps_per_sec = n_envs * n_steps / (time.perf_counter() - start)
+
+    env.close()
+    return steps_per_sec
+
+
+def run_double_buffered(vec_env: str, env_name: str, n_envs: int, n_steps: int, envs_per_process: int = 1,
+                        policy_delay: float = 0.) -> float:
+    """
+    measure the steps per second of two groups of envs, which are stepped alternately like with --async-envs,
+    the action selection of one group overlaps with the simulation of the other group
+    :param vec_env: type of vectorized environment
+    :param env_name: gym id
+    :param n_envs: number of environments of both groups
+    :param n_steps: number of vectorized steps
+    :param envs_per_process: number of envs per subprocess for shmem
+    :param policy_delay: seconds of simulated action selection for all envs, each group takes half of it
+    :return: environment steps per second
+    """
+    n_first = n_envs // 2
+    env_groups = [make_vec_env(vec_env, [make_env(env_name, 1, i) for i in ids], envs_per_process)
+                  for ids in [range(n_first), range(n_first, n_envs)]]
+
+    for env in env_groups:
+        env.reset()
+
+    actions = [np.stack([env.action_space.sample() for _ in range(env.num_envs)]) for env in env_groups]
+
+    start = time.perf_counter()
+    time.sleep(policy_delay / 2)
+    env_groups[0].step_async(actions[0])
+    for step in range(n_steps):
+        time.sleep(policy_delay / 2)
+        env_groups[1].step_async(actions[1])
+        env_groups[0].step_wait()
+        if step + 1 < n_steps:
+            time.sleep(policy_delay / 2)
+            env_groups[0].step_async(actions[0])
+        env_groups[1].step_wait()
+    steps_per_sec = n_envs * n_steps / (time.perf_counter() - start)
+
+    for env in env_groups:
+        env.close()
+    return steps_per_sec
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark of the vectorized environments')
+    parser.add_argument('--env-name', default='CartpoleStabShort-v0',
+                        help='Name of the gym environment to use. (default: CartpoleStabShort-v0)')
+    parser.add_argument('--n-envs', type=int, nargs="*", default=[1, 4, 8, 16],
+                        help='Number of environments to benchmark. (default: 1 4 8 16)')
+    parser.add_argument('--envs-per-process', type=int, nargs="*", default=[1, 2, 4],
+                        help='Number of environments per subprocess for shmem. (default: 1 2 4)')
+    parser.add_argument('--n-steps', type=int, default=2000,
+                        help='Number of vectorized steps for each setting. (default: 2000)')
+    parser.add_argument('--policy-delay', type=float, default=0.,
+                        help='Milliseconds of simulated action selection before each vectorized step. '
+                             'Async results are only reported for values > 0. (default: 0.)')
+    args = parser.parse_args(sys.argv[1:])
+
+    enable_logging(logging_lvl=logging.INFO)
+
+    policy_delay = args.policy_delay / 1000
+
+    for n_envs in args.n_envs:
+        results = [f"dummy={run('dummy', args.env_name, n_envs, args.n_steps, policy_delay=policy_delay):.0f}",
+                   f"subproc={run('subproc', args.env_name, n_envs, args.n_steps, policy_delay=policy_delay):.0f}"]
+        if policy_delay > 0 and n_envs > 1:
+            steps_per_sec = run_double_buffered('subproc', args.env_name, n_envs, args.n_steps,
+                                                policy_delay=policy_delay)
+            results.append(f"subproc/async={steps_per_sec:.0f}")
+        for envs_per_process in args.envs_per_process:
+            if envs_per_process <= n_envs:
+                steps_per_sec = run('shmem', args.env_name, n_envs, args.n_steps, envs_per_process, policy_delay)
+                results.append(f"shmem/{envs_per_process}={steps_per_sec:.0f}")
+                if policy_delay > 0 and 2 * envs_per_process <= n_envs:
+                    steps_per_sec = run_double_buffered('shmem', args.env_name, n_envs, args.n_steps,
+                                                        envs_per_process, policy_delay)
+                    results.append(f"shmem/{envs_per_process}/async={steps_per_sec:.0f}")
+
+        logging.info(f"n_envs={n_envs} -- steps/sec: " + ", ".join(results))
+
+
+if __name__ == '__main__':
+    main()
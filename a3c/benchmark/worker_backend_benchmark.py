@@ -0,0 +1,168 @@
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import quanser_robots
+import torch
+import torch.multiprocessing as mp
+
+from a3c.models.actor_critic_network import ActorCriticNetwork
+from a3c.util.flat_parameters import FlatParameters
+from a3c.util.global_counter import GlobalCounter
+from a3c.util.util import apply_grads, get_local_model, get_shared_optimizer, make_env, sync_weights
+from experiments.util.logger_util import enable_logging
+
+
+def worker(global_model: torch.nn.Module, optimizer: torch.optim.Optimizer, T: GlobalCounter, worker_id: int,
+           env_name: str, rollout_steps: int, barrier, stop, grad_lock=None) -> None:
+    """
+    simplified A3C worker, which steps the env with the sampled actions and updates the global model
+    with the shared optimizer after each rollout
+    :param global_model: shared global model
+    :param optimizer: shared optimizer of the global model
+    :param T: global step counter
+    :param worker_id: id of the worker
+    :param env_name: gym id of the environment
+    :param rollout_steps: number of steps of a rollout
+    :param barrier: barrier to start all workers at the same time
+    :param stop: event to stop the worker
+    :param grad_lock: lock of the thread workers, which share the gradient buffer of the global model
+    :return: None
+    """
+    torch.set_num_threads(1)
+
+    env = make_env(env_name, 1, worker_id)()
+    state = torch.from_numpy(env.reset()).float()
+
+    model = get_local_model(global_model)
+    barrier.wait()
+
+    while not stop.is_set():
+        sync_weights(model, global_model)
+
+        values = []
+        log_probs = []
+        for _ in range(rollout_steps):
+            value, mu, sigma = model(state)
+            dist = torch.distributions.Normal(mu, sigma)
+            action = dist.sample()
+
+            values.append(value)
+            log_probs.append(dist.log_prob(action).sum())
+
+            state, reward, done, _ = env.step(np.clip(action.numpy(), -1, 1))
+            if done:
+                state = env.reset()
+            state = torch.from_numpy(state).float()
+
+            T.increment(worker_id)
+
+        loss = torch.cat(values).pow(2).mean() - torch.stack(log_probs).mean()
+
+        model.flat_parameters.zero_grad()
+        loss.backward()
+        apply_grads(model, global_model, optimizer, grad_lock)
+
+
+def get_memory(pids: list) -> tuple:
+    """
+    sum the resident and proportional set size of the processes, the proportional set size
+    splits shared pages between the processes and does not count the shared memory of the workers multiple times
+    :param pids: process ids
+    :return: RSS, PSS in MB
+    """
+    rss, pss = 0, 0
+    for pid in pids:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, value = line.split(":")[:2]
+                if key == "Rss":
+                    rss += int(value.split()[0])
+                elif key == "Pss":
+                    pss += int(value.split()[0])
+
+    return rss / 1024, pss / 1024
+
+
+def run(backend: str, n_workers: int, env_name: str, rollout_steps: int, duration: float,
+        start_method: str = "fork") -> tuple:
+    """
+    measure startup time, steps per second and memory of the workers
+    :param backend: worker backend, supported: [process, thread]
+    :param n_workers: number of workers
+    :param env_name: gym id of the environment
+    :param rollout_steps: number of steps of a rollout
+    :param duration: seconds of the measurement
+    :param start_method: start method of the worker processes
+    :return: startup time in seconds, steps per second, RSS in MB, PSS in MB
+    """
+    env = make_env(env_name, 1, 0)()
+    global_model = ActorCriticNetwork(n_inputs=env.observation_space.shape[0], n_actions=env.action_space.shape[0])
+    global_model.flat_parameters = FlatParameters(global_model, shared=True)
+    optimizer = get_shared_optimizer(global_model, "adam", 1e-4)
+    T = GlobalCounter(n_workers)
+
+    if backend == "thread":
+        barrier, stop = threading.Barrier(n_workers + 1), threading.Event()
+        # the threads share the gradient buffer of the global model
+        global_model.flat_parameters.init_grad()
+        grad_lock = threading.Lock()
+        workers = [threading.Thread(target=worker, args=(global_model, optimizer, T, i, env_name, rollout_steps,
+                                                         barrier, stop, grad_lock)) for i in range(n_workers)]
+    else:
+        ctx = mp.get_context(start_method)
+        barrier, stop = ctx.Barrier(n_workers + 1), ctx.Event()
+        workers = [ctx.Process(target=worker, args=(global_model, optimizer, T, i, env_name, rollout_steps,
+                                                    barrier, stop)) for i in range(n_workers)]
+
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    barrier.wait()
+    startup = time.perf_counter() - start
+
+    start, start_T = time.perf_counter(), T.value
+    time.sleep(duration / 2)
+    pids = [os.getpid()] + ([w.pid for w in workers] if backend == "process" else [])
+    rss, pss = get_memory(pids)
+    time.sleep(duration / 2)
+    steps_per_sec = (T.value - start_T) / (time.perf_counter() - start)
+
+    stop.set()
+    for w in workers:
+        w.join()
+
+    return startup, steps_per_sec, rss, pss
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark of process and thread based A3C workers')
+    parser.add_argument('--worker', type=int, nargs="*", default=[1, 2, 4, 8, 16, 32],
+                        help='Number of workers to benchmark. (default: 1 2 4 8 16 32)')
+    parser.add_argument('--env-name', default='CartpoleStabShort-v0',
+                        help='Name of the gym environment to use. (default: CartpoleStabShort-v0)')
+    parser.add_argument('--rollout-steps', type=int, default=50,
+                        help='Number of steps of a rollout. (default: 50)')
+    parser.add_argument('--duration', type=float, default=10,
+                        help='Seconds of the measurement for each setting. (default: 10)')
+    parser.add_argument('--start-method', type=str, default='fork',
+                        help='Start method of the worker processes, supported: [fork, spawn, forkserver]. '
+                             '(default: fork)')
+    args = parser.parse_args(sys.argv[1:])
+
+    enable_logging(logging_lvl=logging.INFO)
+
+    for n_workers in args.worker:
+        for backend in ["process", "thread"]:
+            startup, steps_per_sec, rss, pss = run(backend, n_workers, args.env_name, args.rollout_steps,
+                                                   args.duration, args.start_method)
+            logging.info(f"worker={n_workers} -- {backend}: startup={startup:.2f}s -- "
+                         f"steps/sec={steps_per_sec:.0f} -- RSS={rss:.0f}MB -- PSS={pss:.0f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+@file: fused_shared_adam.py
+
+Definition of the Adam optimizer for shared usage, which updates all parameters with one set of vector operations.
+It is numerically equivalent to SharedAdam, but all statistics including the step counter are shared between workers.
+"""
+import math
+
+import torch
+
+from a3c.optimizers.fused_shared_optimizer import FusedSharedOptimizer
+from a3c.util.flat_parameters import FlatParameters
+
+
+class FusedSharedAdam(FusedSharedOptimizer):
+
+    def __init__(self, flat_parameters: FlatParameters, lr=1e-3, betas=(0.9, 0.999), eps=1e-8, weight_decay=0,
+                 amsgrad=False, lock=False):
+        defaults = dict(lr=lr, betas=betas, eps=eps, weight_decay=weight_decay, amsgrad=amsgrad)
+        state_names = ['exp_avg', 'exp_avg_sq'] + (['max_exp_avg_sq'] if amsgrad else [])
+        super(FusedSharedAdam, self).__init__(flat_parameters, defaults, state_names, lock)
+
+        # process local buffer for the denominator
+        self.denom = None
+
+    def _update(self, group: dict, params: torch.Tensor, grad: torch.Tensor) -> None:
+        exp_avg, exp_avg_sq = self.buffers['exp_avg'], self.buffers['exp_avg_sq']
+        beta1, beta2 = group['betas']
+
+        self.step_counter += 1
+        step = self.step_counter.item()
+
+        if group['weight_decay'] != 0:
+            grad.add_(group['weight_decay'], params)
+
+        if self.denom is None:
+            self.denom = torch.zeros_like(params)
+
+        # Decay the first and second moment running average coefficient
+        exp_avg.mul_(beta1).add_(1 - beta1, grad)
+        exp_avg_sq.mul_(beta2).addcmul_(1 - beta2, grad, grad)
+        if group['amsgrad']:
+            max_exp_avg_sq = self.buffers['max_exp_avg_sq']
+            # Maintains the maximum of all 2nd moment running avg. till now
+            torch.max(max_exp_avg_sq, exp_avg_sq, out=max_exp_avg_sq)
+            # Use the max. for normalizing running avg. of gradient
+            torch.sqrt(max_exp_avg_sq, out=self.denom).add_(group['eps'])
+        else:
+            torch.sqrt(exp_avg_sq, out=self.denom).add_(group['eps'])
+
+        bias_correction1 = 1 - beta1 ** step
+        bias_correction2 = 1 - beta2 ** step
+        step_size = group['lr'] * math.sqrt(bias_correction2) / bias_correction1
+
+        params.addcdiv_(-step_size, exp_avg, self.denom)
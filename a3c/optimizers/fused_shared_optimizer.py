@@ -0,0 +1,116 @@
+"""
+@file: fused_shared_optimizer.py
+
+Base class for shared optimizers, which update all parameters of a model with one set of vector operations.
+The parameters have to be views of one flat buffer, see a3c.util.flat_parameters.FlatParameters.
+All statistics are stored in flat buffers as well, the views of them for each parameter are used for the state_dict.
+"""
+import torch
+import torch.multiprocessing as mp
+
+from a3c.util.flat_parameters import FlatParameters
+
+
+class FusedSharedOptimizer(torch.optim.Optimizer):
+
+    def __init__(self, flat_parameters: FlatParameters, defaults: dict, state_names: list, lock: bool = False):
+        """
+        Constructor
+        :param flat_parameters: flat parameters of the model to optimize
+        :param defaults: default hyperparameters of the optimizer
+        :param state_names: names of the flat statistics buffers
+        :param lock: synchronize the steps of all workers with a lock
+        """
+        super(FusedSharedOptimizer, self).__init__(flat_parameters.params, defaults)
+
+        if len(self.param_groups) != 1:
+            raise ValueError("Fused optimizers only support one param group.")
+
+        self.flat_parameters = flat_parameters
+        self.state_names = state_names
+
+        # step counter, which is shared between all workers after calling share_memory()
+        self.step_counter = torch.zeros(1)
+        self.buffers = {name: torch.zeros_like(flat_parameters.data) for name in state_names}
+        self._set_state_views()
+
+        self.lock = mp.Lock() if lock else None
+
+    def _set_state_views(self) -> None:
+        """
+        use views of the flat statistics as state of each parameter, this keeps state_dict() compatible to the
+        per parameter optimizers
+        :return: None
+        """
+        offset = 0
+        for p in self.flat_parameters.params:
+            state = self.state[p]
+            state['step'] = self.step_counter
+            for name, buffer in self.buffers.items():
+                state[name] = buffer[offset:offset + p.numel()].view_as(p.data)
+            offset += p.numel()
+
+    def share_memory(self):
+        self.step_counter.share_memory_()
+        for buffer in self.buffers.values():
+            buffer.share_memory_()
+
+    def load_state_dict(self, state_dict: dict) -> None:
+        """
+        load the statistics of a state dict into the flat buffers
+        :param state_dict: optimizer state dict
+        :return: None
+        """
+        super(FusedSharedOptimizer, self).load_state_dict(state_dict)
+
+        # loading replaces the state with new tensors, copy them back into the flat buffers
+        offset = 0
+        for p in self.flat_parameters.params:
+            state = self.state[p]
+            for name, buffer in self.buffers.items():
+                buffer[offset:offset + p.numel()].copy_(state[name].view(-1))
+            self.step_counter.fill_(float(state['step']))
+            offset += p.numel()
+
+        self._set_state_views()
+
+    def zero_grad(self, set_to_none: bool = False) -> None:
+        """
+        reset all gradients to zero without removing the flat gradient views
+        :param set_to_none: unused, gradients are always kept
+        :return: None
+        """
+        if self.flat_parameters.grad is not None:
+            self.flat_parameters.zero_grad()
+
+    def step(self, closure=None):
+        """Performs a single optimization step.
+
+        Arguments:
+            closure (callable, optional): A closure that reevaluates the model
+                and returns the loss.
+        """
+        loss = None
+        if closure is not None:
+            loss = closure()
+
+        if self.flat_parameters.grad is None:
+            return loss
+
+        if self.lock is not None:
+            with self.lock:
+                self._update(self.param_groups[0], self.flat_parameters.data, self.flat_parameters.grad)
+        else:
+            self._update(self.param_groups[0], self.flat_parameters.data, self.flat_parameters.grad)
+
+        return loss
+
+    def _update(self, group: dict, params: torch.Tensor, grad: torch.Tensor) -> None:
+        """
+        update the flat parameters in place
+        :param group: param group with the hyperparameters
+        :param params: flat parameters
+        :param grad: flat gradients
+        :return: None
+        """
+        raise NotImplementedError
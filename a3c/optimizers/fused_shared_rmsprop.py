@@ -0,0 +1,50 @@
+"""
+@file: fused_shared_rmsprop.py
+
+Definition of the RMSprop optimizer for shared usage, which updates all parameters with one set of vector operations.
+It is numerically equivalent to SharedRMSProp.
+"""
+import torch
+
+from a3c.optimizers.fused_shared_optimizer import FusedSharedOptimizer
+from a3c.util.flat_parameters import FlatParameters
+
+
+class FusedSharedRMSProp(FusedSharedOptimizer):
+
+    def __init__(self, flat_parameters: FlatParameters, lr=7e-4, alpha=0.99, eps=0.1, weight_decay=0, momentum=0,
+                 centered=False, lock=False):
+        defaults = dict(lr=lr, alpha=alpha, eps=eps, weight_decay=weight_decay, momentum=momentum, centered=centered)
+        state_names = ['grad_avg', 'square_avg', 'momentum_buffer']
+        super(FusedSharedRMSProp, self).__init__(flat_parameters, defaults, state_names, lock)
+
+        # process local buffer for the denominator
+        self.avg = None
+
+    def _update(self, group: dict, params: torch.Tensor, grad: torch.Tensor) -> None:
+        square_avg = self.buffers['square_avg']
+        alpha = group['alpha']
+
+        self.step_counter += 1
+
+        if group['weight_decay'] != 0:
+            grad = grad.add(group['weight_decay'], params)
+
+        if self.avg is None:
+            self.avg = torch.zeros_like(params)
+
+        square_avg.mul_(alpha).addcmul_(1 - alpha, grad, grad)
+
+        if group['centered']:
+            grad_avg = self.buffers['grad_avg']
+            grad_avg.mul_(alpha).add_(1 - alpha, grad)
+            torch.addcmul(square_avg, -1, grad_avg, grad_avg, out=self.avg).sqrt_().add_(group['eps'])
+        else:
+            torch.sqrt(square_avg, out=self.avg).add_(group['eps'])
+
+        if group['momentum'] > 0:
+            buf = self.buffers['momentum_buffer']
+            buf.mul_(group['momentum']).addcdiv_(grad, self.avg)
+            params.add_(-group['lr'], buf)
+        else:
+            params.addcdiv_(-group['lr'], grad, self.avg)
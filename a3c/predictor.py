@@ -0,0 +1,112 @@
+import logging
+import queue
+
+import torch
+import torch.multiprocessing as mp
+from torch.multiprocessing import Value
+
+from a3c.util.thread_budget import ThreadBudget, apply_core_assignment
+from a3c.util.util import get_local_model, sync_weights
+
+
+class Predictor(object):
+
+    def __init__(self, n_workers: int, n_envs: int, state_dim: int, action_dim: int):
+        """
+        Shared memory interface between the training workers and the predictor processes (GA3C style).
+        Workers write their normalized observations into the shared observation buffer and request an action,
+        the predictor processes collect all pending requests, select the actions with one batched forward pass
+        and write them into the shared action buffer.
+        Example:
+            predictor = Predictor(n_workers=8, n_envs=1, state_dim=5, action_dim=1)
+            Process(target=predict, args=(args, 0, predictor, global_model)).start()
+            ...
+            # in worker process
+            action, version = predictor.predict(worker_id, observation)
+        :param n_workers: number of training workers
+        :param n_envs: number of environments of each worker
+        :param state_dim: dimension of the observations
+        :param action_dim: dimension of the actions
+        """
+        self.observations = torch.zeros(n_workers, n_envs, state_dim).share_memory_()
+        self.actions = torch.zeros(n_workers, n_envs, action_dim).share_memory_()
+
+        # number of global updates, when the weights for the last action of each worker were loaded
+        self.versions = torch.zeros(n_workers).share_memory_()
+
+        self.requests = mp.Queue()
+        self.ready = [mp.Semaphore(0) for _ in range(n_workers)]
+
+        # global counter of optimizer steps, which is used to compute the policy lag
+        self.n_updates = Value('i', 0)
+
+    def predict(self, worker_id: int, observation: torch.Tensor) -> tuple:
+        """
+        request actions for the given observations and wait for the predictor
+        :param worker_id: id of the requesting worker
+        :param observation: normalized observations [n_envs, state_dim]
+        :return: actions before clipping [n_envs, action_dim], number of global updates of the used weights
+        """
+        self.observations[worker_id].copy_(observation)
+        self.requests.put(worker_id)
+        self.ready[worker_id].acquire()
+        return self.actions[worker_id], self.versions[worker_id].item()
+
+    def count_update(self) -> None:
+        """
+        increment the global counter of optimizer steps
+        :return: None
+        """
+        with self.n_updates.get_lock():
+            self.n_updates.value += 1
+
+
+def predict(args, predictor_id: int, predictor: Predictor, global_model: torch.nn.Module,
+            thread_budget: ThreadBudget = None) -> None:
+    """
+    Start predictor process, which selects the actions for all workers with batched forward passes
+    :param args: console arguments
+    :param predictor_id: id of predictor to differentiate them and init different seeds
+    :param predictor: shared memory interface to the workers
+    :param global_model: global model/ for split models: actor
+    :param thread_budget: optional planned threads and cpu affinity of all processes
+    :return: None
+    """
+    logging.info(f"predictor {predictor_id} started.")
+    torch.manual_seed(args.seed + args.worker + 1 + predictor_id)
+
+    if thread_budget:
+        apply_core_assignment(thread_budget.predictor(predictor_id))
+
+    model = get_local_model(global_model, with_grads=False)
+    model.eval()
+
+    n_workers, n_envs, state_dim = predictor.observations.shape
+
+    while True:
+        # wait for the first request and collect all other pending ones
+        worker_ids = [predictor.requests.get()]
+        while len(worker_ids) < n_workers:
+            try:
+                worker_ids.append(predictor.requests.get_nowait())
+            except queue.Empty:
+                break
+
+        version = predictor.n_updates.value
+        sync_weights(model, global_model)
+
+        ids = torch.LongTensor(worker_ids)
+
+        with torch.no_grad():
+            observations = predictor.observations[ids].view(-1, state_dim)
+            if args.shared_model:
+                _, mu, std = model(observations)
+            else:
+                mu, std = model(observations)
+            actions = torch.distributions.Normal(mu, std).sample()
+
+        predictor.actions[ids] = actions.view(len(worker_ids), n_envs, -1)
+        predictor.versions[ids] = version
+
+        for worker_id in worker_ids:
+            predictor.ready[worker_id].release()
@@ -0,0 +1,52 @@
+import os
+import tempfile
+
+import torch
+
+from a3c.util.checkpoint_writer import CheckpointWriter, snapshot_state
+
+
+def test_snapshot_state():
+    shared = torch.zeros(3).share_memory_()
+    state = {'model': {'weight': shared}, 'optimizer': {'state': [shared]}, 'epoch': 10}
+
+    snapshot = snapshot_state(state)
+    shared.add_(1)
+
+    assert snapshot['epoch'] == 10
+    assert snapshot['model']['weight'].sum().item() == 0
+    assert snapshot['optimizer']['state'][0].sum().item() == 0
+
+
+def test_checkpoint_retention():
+    with tempfile.TemporaryDirectory() as directory:
+        writer = CheckpointWriter(keep_best=2)
+
+        def path(name):
+            return os.path.join(directory, f"{name}.pth.tar")
+
+        for i, score in enumerate([1., 3., 2., 0.5]):
+            writer.save({'epoch': i, 'weight': torch.full((2,), score)}, path(f"best_{i}"), score=score)
+        writer.save({'epoch': 4}, path("latest"))
+        writer.close()
+
+        # the two best checkpoints and the latest one without temporary files
+        assert sorted(os.listdir(directory)) == ["best_1.pth.tar", "best_2.pth.tar", "latest.pth.tar"]
+        assert torch.load(path("best_1"))['weight'][0].item() == 3.
+
+
+def test_checkpoint_latest_best():
+    with tempfile.TemporaryDirectory() as directory:
+        writer = CheckpointWriter(keep_best=1)
+
+        # a worse checkpoint is kept as long as it is the latest one
+        writer.save({'epoch': 0}, os.path.join(directory, "a.pth.tar"), score=2.)
+        writer.save({'epoch': 1}, os.path.join(directory, "b.pth.tar"), score=1.)
+        writer.close()
+        assert sorted(os.listdir(directory)) == ["a.pth.tar", "b.pth.tar"]
+
+
+if __name__ == '__main__':
+    test_snapshot_state()
+    test_checkpoint_retention()
+    test_checkpoint_latest_best()
@@ -0,0 +1,38 @@
+from argparse import Namespace
+
+import numpy as np
+import torch
+from baselines.common.vec_env.dummy_vec_env import DummyVecEnv
+
+from a3c.test.test_shared_memory_vec_env import make_counter_env
+from a3c.train_test import evaluate
+from a3c.util.normalizer.base_normalizer import BaseNormalizer
+
+
+class ConstantPolicy(torch.nn.Module):
+    """
+    policy with a constant mean action, which is larger than the maximum action
+    """
+
+    def forward(self, x):
+        mu = torch.full((x.shape[0], 1), 2.)
+        return mu, torch.ones_like(mu)
+
+
+def test_evaluate():
+    args = Namespace(test_runs=5, max_episode_length=4, max_action=.5, shared_model=False)
+    env = DummyVecEnv([make_counter_env(episode_length) for episode_length in [3, 4, 5]])
+
+    policy_inputs = []
+    rewards, eps_len = evaluate(args, ConstantPolicy(), BaseNormalizer(read_only=True), env, policy_inputs)
+
+    # episodes are distributed as 2, 2, 1 over the envs, the last env is truncated at the maximum episode length
+    np.testing.assert_array_equal(eps_len, [3, 4, 4, 3, 4])
+    # clipped actions of 0.5 per step
+    np.testing.assert_allclose(rewards, [1.5, 2, 2, 1.5, 2])
+    assert len(policy_inputs) == 8
+    assert policy_inputs[0].shape == (3, 2)
+
+
+if __name__ == '__main__':
+    test_evaluate()
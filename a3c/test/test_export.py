@@ -0,0 +1,103 @@
+import os
+import tempfile
+
+import numpy as np
+import torch
+
+from a3c.models.actor_critic_network import ActorCriticNetwork
+from a3c.models.actor_network import ActorNetwork
+from a3c.util.export_util import fold_normalizer, export_policy, quantize_model, action_deviation
+from a3c.util.normalizer.base_normalizer import BaseNormalizer
+from a3c.util.normalizer.mean_std_normalizer import MeanStdNormalizer
+from a3c.util.normalizer.min_max_normalizer import MinMaxNormalizer
+
+
+def test_fold_normalizer():
+    torch.manual_seed(0)
+
+    state_dim = 5
+
+    mean_std = MeanStdNormalizer((state_dim,), clip=2.)
+    for _ in range(10):
+        mean_std(torch.randn(8, state_dim) * 3 + 1)
+    mean_std.set_read_only()
+
+    min_max = MinMaxNormalizer(-np.arange(1., 6.), np.arange(1., 6.) * 2, read_only=True)
+
+    # large observations are clipped by the MeanStdNormalizer
+    x = torch.randn(16, state_dim).double() * 6
+
+    for model in [ActorNetwork(state_dim, 1), ActorCriticNetwork(state_dim, 1)]:
+        model.eval()
+        for normalizer in [mean_std, min_max, BaseNormalizer(read_only=True)]:
+            with torch.no_grad():
+                expected = model(normalizer(x))
+                folded = fold_normalizer(model, normalizer)(x)
+
+            for e, f in zip(expected, folded):
+                assert torch.allclose(e, f, atol=1e-4)
+
+    # the original model is not changed
+    model = ActorNetwork(state_dim, 1)
+    weight = model.body[0].weight.data.clone()
+    fold_normalizer(model, mean_std)
+    assert torch.equal(model.body[0].weight.data, weight)
+
+
+def test_export_policy():
+    if not hasattr(torch.jit, "save"):
+        # TorchScript is not available for pytorch < 1.0
+        return
+
+    torch.manual_seed(0)
+
+    state_dim = 4
+
+    normalizer = MeanStdNormalizer((state_dim,))
+    normalizer(torch.randn(32, state_dim) * 2)
+    normalizer.set_read_only()
+
+    x = torch.randn(8, state_dim) * 3
+
+    for model, shared_model in [(ActorNetwork(state_dim, 1), False), (ActorCriticNetwork(state_dim, 1), True)]:
+        with torch.no_grad():
+            mu = model(normalizer(x))[1 if shared_model else 0]
+        expected = torch.clamp(mu, -.5, .5)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "policy.pt")
+            export_policy(model, normalizer, state_dim, .5, path, shared_model=shared_model)
+            policy = torch.jit.load(path)
+
+        with torch.no_grad():
+            assert torch.allclose(policy(x.float()), expected, atol=1e-5)
+
+
+def test_quantize_model():
+    if not hasattr(torch, "quantization"):
+        # dynamic quantization is not available for pytorch < 1.3
+        return
+
+    torch.manual_seed(0)
+
+    state_dim = 6
+    states = torch.randn(64, state_dim)
+
+    for model, shared_model in [(ActorNetwork(state_dim, 1), False), (ActorCriticNetwork(state_dim, 1), True)]:
+        model.eval()
+        quantized = quantize_model(model)
+
+        # all linear layers of the copy are replaced, the original model is not changed
+        assert not any(type(m) == torch.nn.Linear for m in quantized.modules())
+        assert any(type(m) == torch.nn.Linear for m in model.modules())
+
+        mean_deviation, max_deviation = action_deviation(model, quantized, states, shared_model)
+        assert 0 < mean_deviation <= max_deviation < .5
+
+        assert action_deviation(model, model, states, shared_model) == (0, 0)
+
+
+if __name__ == '__main__':
+    test_fold_normalizer()
+    test_export_policy()
+    test_quantize_model()
@@ -0,0 +1,139 @@
+import threading
+
+import torch
+import torch.multiprocessing as mp
+
+from a3c.models.actor_critic_network import ActorCriticNetwork
+from a3c.optimizers.shared_adam import SharedAdam
+from a3c.util.flat_parameters import FlatParameters
+from a3c.util.util import apply_grads, get_local_model, sync_weights, sync_grads
+
+
+def get_global_model() -> ActorCriticNetwork:
+    global_model = ActorCriticNetwork(n_inputs=4, n_actions=1)
+    global_model.flat_parameters = FlatParameters(global_model, shared=True)
+    return global_model
+
+
+def test_flat_parameters():
+    torch.manual_seed(0)
+
+    model = ActorCriticNetwork(n_inputs=4, n_actions=1)
+    state_dict = {k: v.clone() for k, v in model.state_dict().items()}
+
+    flat_parameters = FlatParameters(model)
+
+    assert len(flat_parameters) == sum(p.numel() for p in model.parameters())
+
+    # flattening keeps all weights
+    for k, v in model.state_dict().items():
+        assert torch.equal(v, state_dict[k])
+
+    # parameters are views of the flat buffer
+    flat_parameters.data.zero_()
+    for p in model.parameters():
+        assert torch.all(p.data == 0)
+
+
+def test_sync():
+    torch.manual_seed(0)
+
+    global_model = get_global_model()
+    model = get_local_model(global_model)
+
+    x = torch.randn(10, 4)
+
+    # reference gradients without flat buffers
+    reference_model = ActorCriticNetwork(n_inputs=4, n_actions=1)
+    reference_model.load_state_dict(global_model.state_dict())
+    value, mu, _ = reference_model(x)
+    (value.pow(2).mean() + mu.mean()).backward()
+
+    global_model.flat_parameters.data.add_(1.)
+    sync_weights(model, global_model)
+    assert torch.equal(model.flat_parameters.data, global_model.flat_parameters.data)
+    global_model.flat_parameters.data.sub_(1.)
+    sync_weights(model, global_model)
+
+    # backward writes the gradients into the flat buffer, also after resetting it
+    for _ in range(2):
+        model.flat_parameters.zero_grad()
+        value, mu, _ = model(x)
+        (value.pow(2).mean() + mu.mean()).backward()
+
+    for p, p_ref in zip(model.parameters(), reference_model.parameters()):
+        grad_ref = p_ref.grad if p_ref.grad is not None else torch.zeros_like(p_ref)
+        assert torch.allclose(p.grad, grad_ref, atol=1e-6)
+
+    sync_grads(model, global_model)
+    for p, p_global in zip(model.parameters(), global_model.parameters()):
+        assert torch.equal(p.grad, p_global.grad)
+
+    # optimizer steps on the global model update the shared flat buffer
+    optimizer = SharedAdam(global_model.parameters(), lr=1e-2)
+    optimizer.share_memory()
+    before = global_model.flat_parameters.data.clone()
+    optimizer.step()
+    assert not torch.equal(before, global_model.flat_parameters.data)
+
+
+def _update_worker(global_model: ActorCriticNetwork) -> None:
+    model = get_local_model(global_model)
+    model.flat_parameters.grad.fill_(1.)
+    sync_grads(model, global_model)
+    for p in global_model.parameters():
+        p.data.sub_(p.grad)
+
+
+def test_shared_update():
+    torch.manual_seed(0)
+
+    global_model = get_global_model()
+    before = global_model.flat_parameters.data.clone()
+
+    p = mp.Process(target=_update_worker, args=(global_model,))
+    p.start()
+    p.join()
+
+    assert torch.allclose(global_model.flat_parameters.data, before - 1.)
+
+
+def _thread_worker(global_model: ActorCriticNetwork, optimizer: torch.optim.Optimizer, grad: torch.Tensor,
+                   n_steps: int, barrier: threading.Barrier, grad_lock: threading.Lock) -> None:
+    model = get_local_model(global_model)
+    barrier.wait()
+    for _ in range(n_steps):
+        model.flat_parameters.grad.copy_(grad)
+        apply_grads(model, global_model, optimizer, grad_lock)
+
+
+def test_thread_update():
+    torch.manual_seed(0)
+
+    global_model = get_global_model()
+    before = global_model.flat_parameters.data.clone()
+    optimizer = torch.optim.SGD(global_model.parameters(), lr=1.)
+
+    # thread workers share the gradient buffer of the global model, which is created before the threads are started
+    global_model.flat_parameters.init_grad()
+    grad_lock = threading.Lock()
+
+    n_steps = 200
+    grads = [torch.ones_like(before), 2 * torch.ones_like(before)]
+    barrier = threading.Barrier(len(grads))
+    threads = [threading.Thread(target=_thread_worker, args=(global_model, optimizer, grad, n_steps, barrier,
+                                                             grad_lock)) for grad in grads]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # same result as applying the gradients of both workers one after the other
+    assert torch.allclose(global_model.flat_parameters.data, before - n_steps * sum(grads))
+
+
+if __name__ == '__main__':
+    test_flat_parameters()
+    test_sync()
+    test_shared_update()
+    test_thread_update()
@@ -0,0 +1,70 @@
+import copy
+
+import torch
+
+from a3c.models.actor_network import ActorNetwork
+from a3c.optimizers.fused_shared_adam import FusedSharedAdam
+from a3c.optimizers.fused_shared_rmsprop import FusedSharedRMSProp
+from a3c.optimizers.shared_adam import SharedAdam
+from a3c.optimizers.shared_rmsprop import SharedRMSProp
+from a3c.util.flat_parameters import FlatParameters
+
+
+def check_equivalence(optimizer_class: type, fused_optimizer_class: type, **kwargs) -> None:
+    """
+    run several steps with the per parameter and the fused optimizer and compare the parameters
+    :param optimizer_class: per parameter optimizer
+    :param fused_optimizer_class: fused optimizer
+    :param kwargs: hyperparameters of both optimizers
+    :return: None
+    """
+    torch.manual_seed(0)
+
+    model = ActorNetwork(n_inputs=3, n_actions=1)
+    model_fused = copy.deepcopy(model)
+    flat_parameters = FlatParameters(model_fused)
+    flat_parameters.init_grad()
+
+    optimizer = optimizer_class(model.parameters(), lr=1e-2, **kwargs)
+    optimizer_fused = fused_optimizer_class(flat_parameters, lr=1e-2, lock=True, **kwargs)
+    optimizer.share_memory()
+    optimizer_fused.share_memory()
+
+    for _ in range(5):
+        x = torch.randn(8, 3)
+
+        optimizer.zero_grad()
+        mu, std = model(x)
+        (mu.pow(2).mean() + std.sum()).backward()
+        optimizer.step()
+
+        optimizer_fused.zero_grad()
+        mu, std = model_fused(x)
+        (mu.pow(2).mean() + std.sum()).backward()
+        optimizer_fused.step()
+
+    for p, p_fused in zip(model.parameters(), model_fused.parameters()):
+        assert torch.allclose(p, p_fused, atol=1e-7)
+
+    # restore the statistics from the state dict
+    optimizer_loaded = fused_optimizer_class(FlatParameters(copy.deepcopy(model_fused)), lr=1e-2, **kwargs)
+    optimizer_loaded.load_state_dict(optimizer_fused.state_dict())
+
+    assert optimizer_loaded.step_counter.item() == 5
+    for name, buffer in optimizer_fused.buffers.items():
+        assert torch.equal(buffer, optimizer_loaded.buffers[name])
+
+
+def test_fused_adam():
+    check_equivalence(SharedAdam, FusedSharedAdam)
+    check_equivalence(SharedAdam, FusedSharedAdam, amsgrad=True, weight_decay=1e-2)
+
+
+def test_fused_rmsprop():
+    check_equivalence(SharedRMSProp, FusedSharedRMSProp)
+    check_equivalence(SharedRMSProp, FusedSharedRMSProp, centered=True, momentum=.9, weight_decay=1e-2)
+
+
+if __name__ == '__main__':
+    test_fused_adam()
+    test_fused_rmsprop()
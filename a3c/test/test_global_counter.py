@@ -0,0 +1,52 @@
+import numpy as np
+import torch.multiprocessing as mp
+
+from a3c.util.global_counter import GlobalCounter, GlobalReward
+
+
+def count(T: GlobalCounter, global_reward: GlobalReward, worker_id: int, n_steps: int) -> None:
+    for _ in range(n_steps):
+        T.increment(worker_id, 2)
+    global_reward.update(worker_id, float(worker_id))
+
+
+def test_global_counter():
+    n_workers = 4
+    T = GlobalCounter(n_workers, value=10)
+    global_reward = GlobalReward(n_workers)
+
+    processes = [mp.Process(target=count, args=(T, global_reward, i, 1000)) for i in range(n_workers)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+
+    assert T.value == 10 + n_workers * 2000
+    np.testing.assert_allclose(global_reward.value, np.mean(range(n_workers)))
+
+    # loading a checkpoint sets the global values
+    T.value = 5
+    assert T.value == 5
+    T.increment(0)
+    assert T.value == 6
+
+
+def test_global_reward():
+    global_reward = GlobalReward(2, decay=.9)
+    assert global_reward.value == -np.inf
+
+    # the first episode initializes the running reward of a worker, uninitialized workers are ignored
+    global_reward.update(0, 1.)
+    assert global_reward.value == 1.
+
+    global_reward.update(0, 2.)
+    global_reward.update(1, 3.)
+    np.testing.assert_allclose(global_reward.value, ((.81 * 1. + .19 * 2.) + 3.) / 2)
+
+    global_reward.value = 7.
+    assert global_reward.value == 7.
+
+
+if __name__ == '__main__':
+    test_global_counter()
+    test_global_reward()
@@ -0,0 +1,125 @@
+import threading
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from a3c.util.normalizer.mean_std_normalizer import MeanStdNormalizer
+from a3c.util.normalizer.min_max_normalizer import MinMaxNormalizer
+from a3c.util.normalizer.shared_mean_std_normalizer import SharedMeanStdNormalizer
+
+
+def test_mean_std_normalizer():
+    torch.manual_seed(0)
+
+    normalizer = MeanStdNormalizer((3,), clip=100.)
+
+    batches = [torch.randn(5, 3) * 4 + 2 for _ in range(20)]
+    for x in batches:
+        normalizer(x)
+
+    # the batched updates are equivalent to the statistics of all observations
+    data = torch.cat(batches).double().numpy()
+    np.testing.assert_allclose(normalizer.mean.numpy(), data.mean(0), rtol=1e-4)
+    np.testing.assert_allclose(normalizer.var.numpy(), data.var(0), rtol=1e-4)
+
+    x = torch.randn(2, 3)
+    expected = (x.double().numpy() - data.mean(0)) / np.sqrt(data.var(0) + 1e-8)
+    np.testing.assert_allclose(normalizer(x, update=False).numpy(), expected, rtol=1e-3, atol=1e-5)
+    assert normalizer(x, update=False).dtype == torch.float32
+
+    # single observations update the statistics of all features as well
+    mean = normalizer.mean.clone()
+    normalizer(torch.ones(3, dtype=torch.float64))
+    assert not torch.equal(mean, normalizer.mean)
+
+
+def test_normalizer_state_dict():
+    torch.manual_seed(0)
+
+    normalizer = MeanStdNormalizer((4,))
+    for _ in range(10):
+        normalizer(torch.randn(8, 4))
+
+    loaded = MeanStdNormalizer((4,), read_only=True)
+    loaded.load_state_dict(normalizer.state_dict())
+
+    x = torch.randn(3, 4)
+    assert torch.equal(normalizer(x, update=False), loaded(x))
+
+    # read only normalizers do not change the statistics
+    assert torch.equal(loaded.count, normalizer.count)
+
+    min_max = MinMaxNormalizer(np.array([-1., 0.]), np.array([1., 4.]), read_only=True)
+    np.testing.assert_allclose(min_max(torch.Tensor([[0., 1.]])).numpy(), [[.5, .25]])
+
+    loaded_min_max = MinMaxNormalizer(np.zeros(2), np.ones(2), read_only=True)
+    loaded_min_max.load_state_dict(min_max.state_dict())
+    np.testing.assert_allclose(loaded_min_max(torch.Tensor([[0., 1.]])).numpy(), [[.5, .25]])
+
+
+def update_normalizer(normalizer: SharedMeanStdNormalizer, batches: torch.Tensor) -> None:
+    for x in batches:
+        normalizer(x)
+    normalizer.merge()
+
+
+def test_shared_mean_std_normalizer():
+    torch.manual_seed(0)
+
+    normalizer = SharedMeanStdNormalizer((3,), clip=100., merge_frequency=3)
+
+    data = torch.randn(4, 10, 5, 3) * 3 - 1
+
+    workers = [mp.Process(target=update_normalizer, args=(normalizer, batches)) for batches in data]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+
+    # the merged statistics of all workers are equivalent to the statistics of all observations
+    all_data = data.view(-1, 3).double().numpy()
+    normalizer.sync()
+
+    np.testing.assert_allclose(normalizer.mean.numpy(), all_data.mean(0), rtol=1e-4)
+    np.testing.assert_allclose(normalizer.var.numpy(), all_data.var(0), rtol=1e-4)
+
+    # the test worker only reads the shared statistics
+    normalizer.set_read_only()
+    count = normalizer.shared_count.clone()
+    normalizer(torch.randn(2, 3))
+    assert torch.equal(normalizer.shared_count, count)
+
+    loaded = SharedMeanStdNormalizer((3,), clip=100.)
+    loaded.load_state_dict(normalizer.state_dict())
+    loaded.sync()
+    assert torch.allclose(loaded.mean, normalizer.mean)
+
+
+def test_shared_mean_std_normalizer_threads():
+    torch.manual_seed(0)
+
+    normalizer = SharedMeanStdNormalizer((3,), clip=100., merge_frequency=3)
+
+    data = torch.randn(4, 10, 5, 3) * 3 - 1
+
+    # each worker thread accumulates its observations in its own copy
+    workers = [threading.Thread(target=update_normalizer, args=(normalizer.worker_copy(), batches))
+               for batches in data]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+
+    all_data = data.view(-1, 3).double().numpy()
+    normalizer.sync()
+
+    np.testing.assert_allclose(normalizer.mean.numpy(), all_data.mean(0), rtol=1e-4)
+    np.testing.assert_allclose(normalizer.var.numpy(), all_data.var(0), rtol=1e-4)
+
+
+if __name__ == '__main__':
+    test_mean_std_normalizer()
+    test_normalizer_state_dict()
+    test_shared_mean_std_normalizer()
+    test_shared_mean_std_normalizer_threads()
@@ -0,0 +1,48 @@
+import torch
+import torch.multiprocessing as mp
+from argparse import Namespace
+
+from a3c.models.actor_network import ActorNetwork
+from a3c.predictor import Predictor, predict
+from a3c.util.flat_parameters import FlatParameters
+
+
+def test_predictor():
+    torch.manual_seed(0)
+
+    n_workers = 3
+    n_envs = 2
+    state_dim = 4
+
+    global_model = ActorNetwork(n_inputs=state_dim, n_actions=1)
+    # almost deterministic policy
+    global_model.sigma.data.fill_(-30)
+    global_model.flat_parameters = FlatParameters(global_model, shared=True)
+
+    predictor = Predictor(n_workers, n_envs, state_dim, action_dim=1)
+
+    args = Namespace(seed=1, worker=n_workers, shared_model=False)
+    p = mp.Process(target=predict, args=(args, 0, predictor, global_model), daemon=True)
+    p.start()
+
+    try:
+        for n_updates in range(2):
+            for worker_id in range(n_workers):
+                observation = torch.randn(n_envs, state_dim)
+                action, version = predictor.predict(worker_id, observation)
+
+                with torch.no_grad():
+                    mu, _ = global_model(observation)
+
+                assert action.shape == (n_envs, 1)
+                assert torch.allclose(action, mu, atol=1e-5)
+                assert version == n_updates
+
+            predictor.count_update()
+    finally:
+        p.terminate()
+        p.join()
+
+
+if __name__ == '__main__':
+    test_predictor()
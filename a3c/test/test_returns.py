@@ -0,0 +1,64 @@
+import torch
+
+from a3c.benchmark.gae_benchmark import compute_returns_and_advantages_loop, get_rollout
+from a3c.util.util import compute_returns_and_advantages
+
+
+def test_gae():
+    torch.manual_seed(0)
+
+    rewards, values, terminals = get_rollout(rollout_steps=50, n_envs=5, terminal_prob=.1)
+
+    ret_loop, adv_loop = compute_returns_and_advantages_loop(rewards, values, terminals, .99, .95, gae=True)
+    ret, adv = compute_returns_and_advantages(torch.stack(rewards), torch.stack(values), torch.stack(terminals), .99,
+                                              .95, gae=True)
+
+    assert torch.allclose(ret, ret_loop, atol=1e-5)
+    assert torch.allclose(adv, adv_loop, atol=1e-5)
+
+
+def test_n_step_return():
+    torch.manual_seed(0)
+
+    rewards, values, terminals = get_rollout(rollout_steps=50, n_envs=5, terminal_prob=.1)
+
+    ret_loop, adv_loop = compute_returns_and_advantages_loop(rewards, values, terminals, .99, .95, gae=False)
+    ret, adv = compute_returns_and_advantages(torch.stack(rewards), torch.stack(values), torch.stack(terminals), .99,
+                                              .95, gae=False)
+
+    assert torch.allclose(ret, ret_loop, atol=1e-5)
+    assert torch.allclose(adv, adv_loop, atol=1e-5)
+
+
+def test_single_step():
+    torch.manual_seed(0)
+
+    rewards, values, terminals = get_rollout(rollout_steps=1, n_envs=3, terminal_prob=.5)
+
+    ret_loop, adv_loop = compute_returns_and_advantages_loop(rewards, values, terminals, .9, .9, gae=True)
+    ret, adv = compute_returns_and_advantages(torch.stack(rewards), torch.stack(values), torch.stack(terminals), .9,
+                                              .9, gae=True)
+
+    assert torch.allclose(ret, ret_loop, atol=1e-6)
+    assert torch.allclose(adv, adv_loop, atol=1e-6)
+
+
+def test_long_rollout():
+    torch.manual_seed(0)
+
+    rewards, values, terminals = get_rollout(rollout_steps=1000, n_envs=16, terminal_prob=.01)
+
+    for gae in [True, False]:
+        ret_loop, adv_loop = compute_returns_and_advantages_loop(rewards, values, terminals, .99, .95, gae=gae)
+        ret, adv = compute_returns_and_advantages(torch.stack(rewards), torch.stack(values), torch.stack(terminals),
+                                                  .99, .95, gae=gae)
+
+        assert torch.allclose(ret, ret_loop, atol=1e-4)
+        assert torch.allclose(adv, adv_loop, atol=1e-4)
+
+
+if __name__ == '__main__':
+    test_gae()
+    test_n_step_return()
+    test_single_step()
+    test_long_rollout()
@@ -0,0 +1,171 @@
+import numpy as np
+import torch
+
+from a3c.models.actor_critic_network import ActorCriticNetwork
+from a3c.util.rollout_storage import RolloutStorage
+from a3c.util.util import compute_returns_and_advantages
+
+
+def rollout_loss(model: torch.nn.Module, states: torch.Tensor, rewards: np.ndarray, dones: np.ndarray,
+                 storage: RolloutStorage = None) -> torch.Tensor:
+    """
+    compute the A2C loss of a fixed rollout either with python lists or with the given storage
+    :param model: linear model, which predicts value and mean action
+    :param states: states of the rollout including the last state [T + 1, n_envs, state_dim]
+    :param rewards: rewards of the rollout [T, n_envs]
+    :param dones: terminal flags of the rollout [T, n_envs]
+    :param storage: optional rollout storage
+    :return: loss
+    """
+    values, log_probs, entropies = [], [], []
+
+    if storage is not None:
+        storage.reset()
+
+    for step in range(rewards.shape[0]):
+        value, mu = model(states[step]).split(1, dim=-1)
+        dist = torch.distributions.Normal(mu, torch.ones_like(mu))
+        action = torch.zeros_like(mu)
+        log_prob = dist.log_prob(action)
+        entropy = dist.entropy()
+
+        if storage is not None:
+            storage.insert(step, value, log_prob, entropy, rewards[step], dones[step])
+        else:
+            values.append(value)
+            log_probs.append(log_prob)
+            entropies.append(entropy)
+
+    bootstrap = model(states[-1])[:, :1].detach()
+
+    if storage is not None:
+        storage.set_bootstrap(bootstrap)
+        values, log_probs, entropies = storage.values, storage.log_probs, storage.entropies
+        rewards, terminals = storage.rewards, storage.terminals
+    else:
+        values = torch.stack(values + [bootstrap])
+        log_probs = torch.stack(log_probs)
+        entropies = torch.stack(entropies)
+        terminals = torch.Tensor(1 - dones).unsqueeze(-1)
+        rewards = torch.Tensor(rewards).unsqueeze(-1)
+
+    ret, adv = compute_returns_and_advantages(rewards, values, terminals, .99, .95)
+
+    return -(log_probs * adv).mean() + .5 * (ret - values[:-1]).pow(2).mean() - .01 * entropies.mean()
+
+
+def test_rollout_storage():
+    torch.manual_seed(0)
+    np.random.seed(0)
+
+    rollout_steps = 10
+    n_envs = 3
+    state_dim = 4
+
+    model = torch.nn.Linear(state_dim, 2)
+    storage = RolloutStorage(rollout_steps, n_envs)
+
+    # reuse the storage for several rollouts
+    for _ in range(3):
+        states = torch.randn(rollout_steps + 1, n_envs, state_dim)
+        rewards = np.random.randn(rollout_steps, n_envs)
+        dones = np.random.rand(rollout_steps, n_envs) > .8
+
+        model.zero_grad()
+        loss = rollout_loss(model, states, rewards, dones)
+        loss.backward()
+        grads = [p.grad.clone() for p in model.parameters()]
+
+        model.zero_grad()
+        loss_storage = rollout_loss(model, states, rewards, dones, storage)
+        loss_storage.backward()
+        grads_storage = [p.grad.clone() for p in model.parameters()]
+
+        assert torch.allclose(loss, loss_storage, atol=1e-6)
+        for g, g_storage in zip(grads, grads_storage):
+            assert torch.allclose(g, g_storage, atol=1e-6)
+
+
+def test_batched_forward():
+    torch.manual_seed(0)
+    np.random.seed(0)
+
+    rollout_steps = 10
+    n_envs = 3
+    state_dim = 4
+    action_dim = 1
+
+    model = ActorCriticNetwork(state_dim, action_dim)
+    storage = RolloutStorage(rollout_steps, n_envs)
+    storage_batched = RolloutStorage(rollout_steps, n_envs, state_dim, action_dim)
+
+    for _ in range(2):
+        states = torch.randn(rollout_steps + 1, n_envs, state_dim)
+        actions = torch.randn(rollout_steps, n_envs, action_dim)
+        rewards = np.random.randn(rollout_steps, n_envs)
+        dones = np.random.rand(rollout_steps, n_envs) > .8
+
+        storage.reset()
+        storage_batched.reset()
+
+        for step in range(rollout_steps):
+            value, mu, std = model(states[step])
+            dist = torch.distributions.Normal(mu, std)
+            entropy = dist.entropy().sum(-1).unsqueeze(-1)
+            log_prob = dist.log_prob(actions[step]).sum(-1).unsqueeze(-1)
+            storage.insert(step, value, log_prob, entropy, rewards[step], dones[step])
+            storage_batched.insert_transition(step, states[step], actions[step], rewards[step], dones[step])
+
+        bootstrap = model(states[-1])[0].detach()
+        storage.set_bootstrap(bootstrap)
+        storage_batched.set_bootstrap(bootstrap)
+        storage_batched.evaluate_actions(model)
+
+        grads = []
+        for s in [storage, storage_batched]:
+            ret, adv = compute_returns_and_advantages(s.rewards, s.values, s.terminals, .99, .95)
+            loss = -(s.log_probs * adv).mean() + .5 * (ret - s.values[:-1]).pow(2).mean() - .01 * s.entropies.mean()
+
+            model.zero_grad()
+            loss.backward()
+            grads.append([p.grad.clone() for p in model.parameters()])
+
+        for g, g_batched in zip(*grads):
+            assert torch.allclose(g, g_batched, atol=1e-5)
+
+
+def test_insert_transition_groups():
+    np.random.seed(0)
+
+    rollout_steps = 5
+    n_envs = 5
+    state_dim = 3
+    action_dim = 2
+
+    storage = RolloutStorage(rollout_steps, n_envs, state_dim, action_dim)
+    storage_groups = RolloutStorage(rollout_steps, n_envs, state_dim, action_dim)
+
+    states = torch.randn(rollout_steps, n_envs, state_dim)
+    actions = torch.randn(rollout_steps, n_envs, action_dim)
+    rewards = np.random.randn(rollout_steps, n_envs)
+    dones = np.random.rand(rollout_steps, n_envs) > .5
+
+    groups = [slice(0, 2), slice(2, 5)]
+
+    for step in range(rollout_steps):
+        storage.insert_transition(step, states[step], actions[step], rewards[step], dones[step])
+        # write the groups in reversed order like the double buffered stepping
+        for envs in reversed(groups):
+            storage_groups.insert_transition(step, states[step, envs], actions[step, envs], rewards[step, envs],
+                                             dones[step, envs], envs=envs)
+
+    assert torch.equal(storage.observations, storage_groups.observations)
+    assert torch.equal(storage.actions, storage_groups.actions)
+    assert torch.equal(storage.rewards, storage_groups.rewards)
+    assert torch.equal(storage.terminals, storage_groups.terminals)
+
+
+if __name__ == '__main__':
+    test_rollout_storage()
+    test_batched_forward()
+    test_insert_transition_groups()
@@ -0,0 +1,176 @@
+import gym
+import numpy as np
+import torch
+from baselines.common.vec_env.dummy_vec_env import DummyVecEnv
+
+from a3c.util.shared_memory_vec_env import SharedMemoryVecEnv
+from a3c.util.thread_budget import CoreAssignment, apply_core_assignment
+from a3c.util.util import get_n_env_processes, reset_env
+
+
+class CounterEnv(gym.Env):
+    """
+    deterministic env, which counts the steps and returns the action as reward
+    """
+
+    def __init__(self, episode_length: int):
+        self.episode_length = episode_length
+        self.observation_space = gym.spaces.Box(low=-np.inf, high=np.inf, shape=(2,), dtype=np.float32)
+        self.action_space = gym.spaces.Box(low=-1, high=1, shape=(1,), dtype=np.float32)
+        self.t = 0
+
+    def reset(self):
+        self.t = 0
+        return np.array([self.t, self.episode_length], dtype=np.float32)
+
+    def step(self, action):
+        self.t += 1
+        observation = np.array([self.t, self.episode_length], dtype=np.float32)
+        return observation, float(action[0]), self.t >= self.episode_length, {}
+
+    def close(self):
+        pass
+
+
+def make_counter_env(episode_length: int) -> callable:
+    return lambda: CounterEnv(episode_length)
+
+
+class FailingEnv(CounterEnv):
+    """
+    env, which raises an exception in the given step
+    """
+
+    def __init__(self, episode_length: int, failing_step: int):
+        super().__init__(episode_length)
+        self.failing_step = failing_step
+
+    def step(self, action):
+        if self.t + 1 == self.failing_step:
+            raise RuntimeError("env failed")
+        return super().step(action)
+
+
+def test_shared_memory_vec_env():
+    np.random.seed(0)
+
+    env_fns = [make_counter_env(episode_length) for episode_length in [3, 4, 5, 7, 11]]
+
+    env = SharedMemoryVecEnv(env_fns, envs_per_process=2)
+    reference = DummyVecEnv(env_fns)
+
+    assert env.num_envs == 5
+    np.testing.assert_allclose(env.reset(), reference.reset())
+
+    try:
+        for _ in range(30):
+            actions = np.random.uniform(-1, 1, (5, 1))
+            observations, rewards, dones, _ = env.step(actions)
+            observations_ref, rewards_ref, dones_ref, _ = reference.step(actions)
+
+            np.testing.assert_allclose(observations, observations_ref)
+            np.testing.assert_allclose(rewards, rewards_ref, rtol=1e-6)
+            np.testing.assert_array_equal(dones, dones_ref)
+    finally:
+        env.close()
+        reference.close()
+
+
+def test_reset_env():
+    env_fns = [make_counter_env(10) for _ in range(5)]
+
+    env = SharedMemoryVecEnv(env_fns, envs_per_process=2)
+    reference = DummyVecEnv(env_fns)
+
+    env.reset()
+    reference.reset()
+
+    try:
+        actions = np.zeros((5, 1))
+        for _ in range(3):
+            env.step(actions)
+            reference.step(actions)
+
+        # only the reset env starts a new episode
+        for e in [env, reference]:
+            np.testing.assert_allclose(reset_env(e, 3), [0, 10])
+
+        observations, _, _, _ = env.step(actions)
+        observations_ref, _, _, _ = reference.step(actions)
+
+        np.testing.assert_allclose(observations[:, 0], [4, 4, 4, 1, 4])
+        np.testing.assert_allclose(observations_ref, observations)
+    finally:
+        env.close()
+        reference.close()
+
+
+def make_pinned_counter_env(episode_length: int) -> callable:
+    def _get_env():
+        apply_core_assignment(CoreAssignment(cores=[0], threads=1))
+        return CounterEnv(episode_length)
+
+    return _get_env
+
+
+def test_env_fns_run_in_subprocesses():
+    torch.set_num_threads(2)
+
+    # the core assignment of the env callables must not change the threads of the main process
+    env = SharedMemoryVecEnv([make_pinned_counter_env(5) for _ in range(2)])
+    try:
+        assert env.observation_space.shape == (2,)
+        assert torch.get_num_threads() == 2
+    finally:
+        env.close()
+
+
+class ThreadsEnv(CounterEnv):
+    """
+    env, which returns the number of intra-op threads of its process as observation
+    """
+
+    def reset(self):
+        return np.array([torch.get_num_threads(), 0], dtype=np.float32)
+
+
+def test_env_process_cores():
+    # one core assignment per env process, which is shared by the envs of the process
+    n_envs, envs_per_process = 5, 2
+    n_processes = get_n_env_processes("shmem", n_envs, envs_per_process)
+    assert n_processes == 3
+    cores = [CoreAssignment(cores=[0], threads=i + 1) for i in range(n_processes)]
+
+    env = SharedMemoryVecEnv([lambda: ThreadsEnv(10) for _ in range(n_envs)], envs_per_process=envs_per_process,
+                             cores=cores)
+    try:
+        np.testing.assert_allclose(env.reset()[:, 0], [1, 1, 2, 2, 3])
+    finally:
+        env.close()
+
+
+def test_env_process_failure():
+    env_fns = [make_counter_env(10), lambda: FailingEnv(10, 2), make_counter_env(10)]
+    env = SharedMemoryVecEnv(env_fns, envs_per_process=1)
+
+    try:
+        env.reset()
+        actions = np.zeros((3, 1))
+        env.step(actions)
+
+        # the parent raises instead of waiting forever for the dead env process
+        try:
+            env.step(actions)
+            assert False, "step of a failed env process did not raise"
+        except EOFError:
+            pass
+    finally:
+        env.close()
+
+
+if __name__ == '__main__':
+    test_shared_memory_vec_env()
+    test_reset_env()
+    test_env_fns_run_in_subprocesses()
+    test_env_process_cores()
+    test_env_process_failure()
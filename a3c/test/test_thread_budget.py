@@ -0,0 +1,43 @@
+from a3c.util.thread_budget import ThreadBudget
+
+
+def test_thread_budget():
+    # 16 physical cores with hyper-threading
+    physical_cores = [[i, i + 16] for i in range(16)]
+
+    budget = ThreadBudget(n_trainers=4, n_env_processes=0, n_predictors=1, physical_cores=physical_cores)
+
+    # test worker uses one logical cpu, the remaining 15 physical cores are split between trainers and predictor
+    assert len(budget.test().cores) == 1
+    assert sum(budget.trainer(i).threads for i in range(4)) + budget.predictor(0).threads == 15
+
+    cores = [budget.trainer(i).cores for i in range(4)] + [budget.predictor(0).cores, budget.test().cores]
+    all_cores = [cpu for c in cores for cpu in c]
+    assert len(all_cores) == len(set(all_cores))
+
+
+def test_thread_budget_env_processes():
+    physical_cores = [[i] for i in range(8)]
+
+    budget = ThreadBudget(n_trainers=1, n_env_processes=5, physical_cores=physical_cores)
+
+    assert budget.trainer(0).threads == 2
+    for rank in range(5):
+        assert budget.env(0, rank).threads == 1
+        assert not set(budget.env(0, rank).cores) & set(budget.trainer(0).cores)
+
+
+def test_thread_budget_oversubscribed():
+    physical_cores = [[i, i + 4] for i in range(4)]
+
+    budget = ThreadBudget(n_trainers=6, physical_cores=physical_cores)
+
+    # each process is pinned to one logical cpu, physical cores are used before hyper-threading siblings
+    assert all(budget.trainer(i).threads == 1 for i in range(6))
+    assert [budget.trainer(i).cores[0] for i in range(4)] == [0, 1, 2, 3]
+
+
+if __name__ == '__main__':
+    test_thread_budget()
+    test_thread_budget_env_processes()
+    test_thread_budget_oversubscribed()
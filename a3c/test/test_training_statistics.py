@@ -0,0 +1,43 @@
+import numpy as np
+import torch
+
+from a3c.util.training_statistics import TrainingStatistics
+
+
+def test_training_statistics():
+    torch.manual_seed(0)
+    statistics = TrainingStatistics(split_model=True)
+
+    updates = [([torch.randn(100), torch.randn(50)], torch.randn(6, 2, 1), torch.randn(5, 2, 1),
+                [torch.randn(()) for _ in range(4)]) for _ in range(3)]
+    for update in updates:
+        statistics.update(*update)
+    statistics.cost = 3e-6
+
+    scalars = statistics.flush()
+
+    for i, prefix in enumerate(["grad/actor/", "grad/critic/"]):
+        grads = np.concatenate([grads[i].numpy() for grads, _, _, _ in updates])
+        np.testing.assert_allclose(scalars[prefix + "mean"], np.mean(grads), atol=1e-6)
+        np.testing.assert_allclose(scalars[prefix + "l2"], np.sqrt(np.mean(np.square(grads))), rtol=1e-5)
+        np.testing.assert_allclose(scalars[prefix + "max"], np.max(np.abs(grads)), rtol=1e-6)
+        np.testing.assert_allclose(scalars[prefix + "var"], np.var(grads), rtol=1e-5)
+
+    values = np.concatenate([values.numpy().flatten() for _, values, _, _ in updates])
+    rewards = np.concatenate([rewards.numpy().flatten() for _, _, rewards, _ in updates])
+    np.testing.assert_allclose(scalars["values/mean"], np.mean(values), atol=1e-6)
+    np.testing.assert_allclose(scalars["values/max"], np.max(values), rtol=1e-6)
+    np.testing.assert_allclose(scalars["values/min"], np.min(values), rtol=1e-6)
+    np.testing.assert_allclose(scalars["reward/batch"], np.mean(rewards), atol=1e-6)
+    np.testing.assert_allclose(scalars["loss/entropy"], np.mean([losses[3].item() for _, _, _, losses in updates]),
+                               rtol=1e-5)
+    np.testing.assert_allclose(scalars["logging/cost_us"], 1.)
+
+    # the accumulators are reset after a flush
+    assert statistics.flush() == {}
+    statistics.update(*updates[0])
+    np.testing.assert_allclose(statistics.flush()["values/max"], updates[0][1].max().item())
+
+
+if __name__ == '__main__':
+    test_training_statistics()
@@ -1,5 +1,5 @@
-import copy
 import logging
+import threading
 import time
 from typing import Union
 
@@ -7,22 +7,31 @@ import gym
 import numpy as np
 import quanser_robots
 import torch
+from baselines.common.vec_env import VecEnv
 from baselines.common.vec_env.dummy_vec_env import DummyVecEnv
-from baselines.common.vec_env.subproc_vec_env import SubprocVecEnv
 from gym.wrappers.monitor import Monitor
 from tensorboardX import SummaryWriter
-from torch.multiprocessing import Value
 
 from a3c.models.actor_critic_network import ActorCriticNetwork
 from a3c.models.actor_network import ActorNetwork
 from a3c.models.critic_network import CriticNetwork
-from a3c.util.util import get_normalizer, make_env, sync_grads, log_to_tensorboard, get_optimizer, shape_reward
-from a3c.util.util import save_checkpoint
-
-
-def test(args, worker_id: int, global_model: torch.nn.Module, T: Value, global_reward: Value = None,
+from a3c.predictor import Predictor
+from a3c.util.normalizer.base_normalizer import BaseNormalizer
+from a3c.util.util import get_normalizer, make_env, apply_grads, get_optimizer, shape_reward, \
+    compute_returns_and_advantages, get_local_model, sync_weights, make_vec_env, reset_env, \
+    load_saved_normalizer, get_n_env_processes
+from a3c.util.checkpoint_writer import CheckpointWriter
+from a3c.util.export_util import fold_normalizer, quantize_model, action_deviation
+from a3c.util.global_counter import GlobalCounter, GlobalReward
+from a3c.util.rollout_storage import RolloutStorage
+from a3c.util.thread_budget import ThreadBudget, apply_core_assignment
+from a3c.util.training_statistics import AsyncSummaryWriter, TrainingStatistics
+
+
+def test(args, worker_id: int, global_model: torch.nn.Module, T: GlobalCounter, global_reward: GlobalReward = None,
          optimizer: torch.optim.Optimizer = None, global_model_critic: CriticNetwork = None,
-         optimizer_critic: torch.optim.Optimizer = None):
+         optimizer_critic: torch.optim.Optimizer = None, thread_budget: ThreadBudget = None,
+         normalizer: BaseNormalizer = None):
     """
     Start worker in _test mode, i.e. no training is done, only testing is used to validate current performance
     loosely based on https://github.com/ikostrikov/pytorch-a3c/blob/master/_test.py
@@ -34,12 +43,17 @@ def test(args, worker_id: int, global_model: torch.nn.Module, T: Value, global_r
     :param optimizer: optimizer for shared model/ for split models: actor model
     :param global_model_critic: optional global critic model for split networks
     :param optimizer_critic: optional critic optimizer for split networks
+    :param thread_budget: optional planned threads and cpu affinity of all processes
+    :param normalizer: optional normalizer, which is created from the args if not given
     :return: None
     """
 
     logging.info("test worker started.")
     torch.manual_seed(args.seed + worker_id)
 
+    if thread_budget:
+        apply_core_assignment(thread_budget.test())
+
     if "RR" in args.env_name:
         env = quanser_robots.GentlyTerminating(gym.make(args.env_name))
     else:
@@ -51,22 +65,40 @@ def test(args, worker_id: int, global_model: torch.nn.Module, T: Value, global_r
 
     env.seed(args.seed + worker_id)
 
-    normalizer = get_normalizer(args.normalizer, env)
+    if normalizer is None:
+        normalizer = get_normalizer(args.normalizer, env, args.normalizer_merge_frequency)
+        if args.path is not None:
+            load_saved_normalizer(normalizer, args.path)
+
+    # the test worker only uses the statistics of shared normalizers
+    if args.normalizer == "SharedMeanStd":
+        normalizer.set_read_only()
 
     # get an instance of the current global model state
-    model = copy.deepcopy(global_model)
+    model = get_local_model(global_model, with_grads=False)
     model.eval()
 
     model_critic = None
     if global_model_critic:
-        model_critic = copy.deepcopy(global_model_critic)
+        model_critic = get_local_model(global_model_critic, with_grads=False)
         model_critic.eval()
 
     state = torch.from_numpy(env.reset())
 
+    if args.eval_frequency > 0:
+        # ranks after the envs of all training workers
+        rank_offset = args.worker * max(args.n_envs, args.worker_envs)
+        eval_env = make_vec_env(args.vec_env, [make_env(args.env_name, args.seed, rank_offset + i)
+                                               for i in range(args.eval_envs)], args.envs_per_process)
+
     writer = SummaryWriter(comment='_test', log_dir='experiments/runs/')
+    checkpoint_writer = CheckpointWriter(args.keep_checkpoints, args.checkpoint_interval)
     start_time = time.time()
 
+    # measure the effective steps per second of all workers between two test runs
+    last_time = start_time
+    last_T = T.value
+
     t = 0
     episode_reward = 0
 
@@ -75,74 +107,120 @@ def test(args, worker_id: int, global_model: torch.nn.Module, T: Value, global_r
     best_global_reward = -np.inf
     best_test_reward = -np.inf
 
+    # global step of the next scheduled evaluation
+    next_eval_T = 0
+
     while True:
 
-        # Get params from shared global model
-        model.load_state_dict(global_model.state_dict())
+        if args.eval_frequency > 0 and not args.test:
+            # wait without using the cpu until the global counter reaches the next multiple of the frequency
+            while T.value < next_eval_T:
+                time.sleep(.1)
+            next_eval_T = (T.value // args.eval_frequency + 1) * args.eval_frequency
+
+        # Get params from shared global model, the evaluation uses this snapshot of the weights
+        eval_T = T.value
+        sync_weights(model, global_model)
         if not args.shared_model:
-            model_critic.load_state_dict(global_model_critic.state_dict())
+            sync_weights(model_critic, global_model_critic)
+        normalizer.sync()
+
+        if args.test:
+            # the frozen statistics are folded into the first layer, the policy takes the raw observations
+            policy, policy_normalizer = fold_normalizer(model, normalizer), BaseNormalizer(read_only=True)
+        else:
+            policy, policy_normalizer = model, normalizer
 
-        rewards = []
-        eps_len = []
+        if args.quantize:
+            reference, policy = policy, quantize_model(policy)
+            # inputs of the policy, which are replayed with the fp32 model after the evaluation
+            policy_inputs = []
 
-        sleep = True
+        if args.eval_frequency > 0:
+            # all test runs in parallel on the env pool without rendering
+            rewards, eps_len = evaluate(args, policy, policy_normalizer, eval_env,
+                                        policy_inputs if args.quantize else None)
+        else:
+            rewards = []
+            eps_len = []
 
-        # make 10 runs to get current avg performance
-        for i in range(args.test_runs):
-            while not done:
-                t += 1
+            sleep = True
 
-                if not args.no_render:
-                    if i == 0 and t % 1 == 0 and "RR" not in args.env_name:
-                        env.render()
-                        if args.monitor and sleep:  # add a small delay to do a screen capture of the test run if needed
-                            time.sleep(1)
-                            sleep = False
+            # make 10 runs to get current avg performance
+            for i in range(args.test_runs):
+                while not done:
+                    t += 1
 
-                # apply min/max scaling on the environment
+                    if not args.no_render:
+                        if i == 0 and t % 1 == 0 and "RR" not in args.env_name:
+                            env.render()
+                            # add a small delay to do a screen capture of the test run if needed
+                            if args.monitor and sleep:
+                                time.sleep(1)
+                                sleep = False
 
-                with torch.no_grad():
+                    # apply min/max scaling on the environment
 
-                    # select mean of normal dist as action --> Expectation
-                    if args.shared_model:
-                        _, mu, _ = model(normalizer(state))
-                    else:
-                        mu, _ = model(normalizer(state))
+                    with torch.no_grad():
 
-                    action = mu.detach()
+                        # batch of one state, the quantized linear layers require 2D inputs
+                        policy_input = policy_normalizer(state).view(1, -1)
+                        if args.quantize:
+                            policy_inputs.append(policy_input.float())
 
-                state, reward, done, _ = env.step(np.clip(action.numpy(), -args.max_action, args.max_action))
+                        # select mean of normal dist as action --> Expectation
+                        if args.shared_model:
+                            _, mu, _ = policy(policy_input)
+                        else:
+                            mu, _ = policy(policy_input)
 
-                done = done or t >= args.max_episode_length
-                episode_reward += reward
+                        action = mu[0].detach()
+
+                    state, reward, done, _ = env.step(np.clip(action.numpy(), -args.max_action, args.max_action))
 
-                if done:
-                    # reset current cumulated reward and episode counter as well as env
-                    rewards.append(episode_reward)
-                    episode_reward = 0
+                    done = done or t >= args.max_episode_length
+                    episode_reward += reward
 
-                    eps_len.append(t)
-                    t = 0
+                    if done:
+                        # reset current cumulated reward and episode counter as well as env
+                        rewards.append(episode_reward)
+                        episode_reward = 0
 
-                    state = env.reset()
+                        eps_len.append(t)
+                        t = 0
 
-                state = torch.from_numpy(state)
+                        state = env.reset()
 
-            # necessary to make more than one run
-            done = False
+                    state = torch.from_numpy(state)
+
+                # necessary to make more than one run
+                done = False
 
         time_print = time.strftime("%Hh %Mm %Ss", time.gmtime(time.time() - start_time))
 
+        current_time, current_T = time.time(), T.value
+        steps_per_sec = (current_T - last_T) / (current_time - last_time)
+        last_time, last_T = current_time, current_T
+        writer.add_scalar("steps_per_second", steps_per_sec, int(current_T))
+
         std_reward = np.std(rewards)
         rewards = np.mean(rewards)
 
         new_best = rewards > best_test_reward
-        writer.add_scalar("reward/test", rewards, int(T.value))
-        writer.add_scalar("episode/length", np.mean(eps_len), int(T.value))
-
-        log_string = f"Time: {time_print}, T={T.value} -- n_runs={args.test_runs} -- mean total reward={rewards:.5f} " \
+        writer.add_scalar("reward/test", rewards, eval_T)
+        writer.add_scalar("episode/length", np.mean(eps_len), eval_T)
+
+        if args.quantize:
+            mean_deviation, max_deviation = action_deviation(reference, policy, torch.cat(policy_inputs),
+                                                             args.shared_model)
+            logging.debug(f"int8 action deviation over {len(policy_inputs)} states -- mean={mean_deviation:.5f} "
+                          f"-- max={max_deviation:.5f}")
+            writer.add_scalar("quantization/mean_action_deviation", mean_deviation, eval_T)
+            writer.add_scalar("quantization/max_action_deviation", max_deviation, eval_T)
+
+        log_string = f"Time: {time_print}, T={eval_T} -- n_runs={args.test_runs} -- mean total reward={rewards:.5f} " \
             f" +/- {std_reward:.5f} -- mean episode length={np.mean(eps_len):.5f}" \
-            f" +/- {np.std(eps_len):.5f} -- global reward={global_reward.value:.5f}"
+            f" +/- {np.std(eps_len):.5f} -- global reward={global_reward.value:.5f} -- steps/sec={steps_per_sec:.1f}"
 
         if new_best:
             # highlight messages if progress was done
@@ -150,21 +228,28 @@ def test(args, worker_id: int, global_model: torch.nn.Module, T: Value, global_r
 
             best_global_reward = global_reward.value if global_reward.value > best_global_reward else best_global_reward
             best_test_reward = rewards if rewards > best_test_reward else best_test_reward
+        else:
+            # use by default only debug messages if no progress was reached
+            logging.debug(log_string)
+
+        # save new best models and periodic checkpoints for crash recovery in the background
+        if new_best or checkpoint_writer.is_due():
             model_type = 'shared' if args.shared_model else 'split'
+            checkpoint_type = f"test-{rewards:.5f}" if new_best else "latest"
 
-            save_checkpoint({
-                'epoch': T.value,
+            checkpoint_writer.save({
+                'epoch': eval_T,
                 'model': model.state_dict(),
                 'model_critic': model_critic.state_dict() if model_critic is not None else None,
                 'global_reward': global_reward.value,
                 # only save optimizers if shared ones are used
                 'optimizer': optimizer.state_dict() if optimizer else None,
                 'optimizer_critic': optimizer_critic.state_dict() if optimizer_critic else None,
+                'normalizer': normalizer.state_dict(),
             },
-                path=f"./experiments/checkpoints/model_{model_type}_T-{T.value}_global-{global_reward.value:.5f}_test-{rewards:.5f}.pth.tar")
-        else:
-            # use by default only debug messages if no progress was reached
-            logging.debug(log_string)
+                path=f"./experiments/checkpoints/model_{model_type}_T-{eval_T}_global-{global_reward.value:.5f}_"
+                     f"{checkpoint_type}.pth.tar",
+                score=rewards if new_best else None)
 
         global_iter += 1
 
@@ -172,11 +257,96 @@ def test(args, worker_id: int, global_model: torch.nn.Module, T: Value, global_r
         if args.test:
             break
 
+    checkpoint_writer.close()
 
-def train(args, worker_id: int, global_model: Union[ActorNetwork, ActorCriticNetwork], T: Value, global_reward: Value,
-          optimizer: torch.optim.Optimizer = None, global_model_critic: CriticNetwork = None,
-          optimizer_critic: torch.optim.Optimizer = None, lr_scheduler: torch.optim.lr_scheduler = None,
-          lr_scheduler_critic: torch.optim.lr_scheduler = None):
+
+def evaluate(args, policy: torch.nn.Module, normalizer: BaseNormalizer, env: VecEnv, policy_inputs: list = None) \
+        -> tuple:
+    """
+    run args.test_runs episodes with the mean actions of the policy in parallel on a vectorized environment
+    :param args: console arguments
+    :param policy: actor or shared model for inference
+    :param normalizer: normalizer for the inputs of the policy
+    :param env: vectorized environment from make_vec_env()
+    :param policy_inputs: optional list, which records all inputs of the policy
+    :return: rewards and lengths of the finished episodes
+    """
+    n_envs = env.num_envs
+
+    # number of episodes, which are still counted for each env
+    remaining = np.full(n_envs, args.test_runs // n_envs)
+    remaining[:args.test_runs % n_envs] += 1
+
+    rewards = []
+    eps_len = []
+
+    state = env.reset()
+    episode_reward = np.zeros(n_envs)
+    t = np.zeros(n_envs, dtype=np.int64)
+
+    while remaining.sum() > 0:
+        with torch.no_grad():
+            policy_input = normalizer(torch.from_numpy(state))
+            if policy_inputs is not None:
+                policy_inputs.append(policy_input.float())
+
+            if args.shared_model:
+                _, mu, _ = policy(policy_input)
+            else:
+                mu, _ = policy(policy_input)
+
+        state, reward, dones, _ = env.step(np.clip(mu.numpy(), -args.max_action, args.max_action))
+
+        t += 1
+        episode_reward += reward
+
+        # the vectorized envs reset themselves at terminal states, but not at the maximum episode length
+        truncated = (t >= args.max_episode_length) & ~dones
+        for i in np.flatnonzero(dones | truncated):
+            if remaining[i] > 0:
+                rewards.append(episode_reward[i])
+                eps_len.append(t[i])
+                remaining[i] -= 1
+
+            if truncated[i]:
+                state[i] = reset_env(env, i)
+
+            episode_reward[i] = 0
+            t[i] = 0
+
+    return rewards, eps_len
+
+
+def start_env_group(args, model: torch.nn.Module, normalizer: BaseNormalizer, env: VecEnv,
+                    state: torch.Tensor) -> tuple:
+    """
+    select the actions for a group of envs without gradients and start the env step asynchronously,
+    the results have to be collected with env.step_wait()
+    :param args: console arguments
+    :param model: local model/ for split models: actor
+    :param normalizer: normalizer of the observations
+    :param env: vectorized environment of the group
+    :param state: current states of the group [n_envs, state_dim]
+    :return: normalized observations [n_envs, state_dim], actions before clipping [n_envs, action_dim]
+    """
+    observation = normalizer(state)
+    with torch.no_grad():
+        if args.shared_model:
+            _, mu, std = model(observation)
+        else:
+            mu, std = model(observation)
+        unclipped_action = torch.distributions.Normal(mu, std).sample()
+
+    env.step_async(np.clip(unclipped_action.numpy(), -args.max_action, args.max_action))
+    return observation, unclipped_action
+
+
+def train(args, worker_id: int, global_model: Union[ActorNetwork, ActorCriticNetwork], T: GlobalCounter,
+          global_reward: GlobalReward, optimizer: torch.optim.Optimizer = None,
+          global_model_critic: CriticNetwork = None, optimizer_critic: torch.optim.Optimizer = None,
+          lr_scheduler: torch.optim.lr_scheduler = None, lr_scheduler_critic: torch.optim.lr_scheduler = None,
+          predictor: Predictor = None, thread_budget: ThreadBudget = None, normalizer: BaseNormalizer = None,
+          grad_lock: threading.Lock = None):
     """
     Start worker in training mode, i.e. training the shared model with backprop
     loosely based on https://github.com/ikostrikov/pytorch-a3c/blob/master/train.py
@@ -191,32 +361,73 @@ def train(args, worker_id: int, global_model: Union[ActorNetwork, ActorCriticNet
     :param lr_scheduler: optional learning rate scheduler instance for shared model
     / for fixed model: actor learning rate scheduler
     :param lr_scheduler_critic: optional learning rate scheduler instance for critic model
+    :param predictor: optional interface to the predictor processes, which select the actions for all workers,
+    requires batched forward
+    :param thread_budget: optional planned threads and cpu affinity of all processes
+    :param normalizer: optional normalizer, which is created from the args if not given
+    :param grad_lock: lock of the thread workers, which share the gradient buffers of the global models
     :return: None
     """
     torch.manual_seed(args.seed + worker_id)
 
+    if thread_budget:
+        apply_core_assignment(thread_budget.trainer(worker_id))
+
     if args.worker == 1:
         logging.info(f"Running A2C with {args.n_envs} environments.")
-        if "RR" not in args.env_name:
-            env = SubprocVecEnv([make_env(args.env_name, args.seed, i, args.log_dir) for i in range(args.n_envs)])
+    else:
+        logging.info(f"Running A3C: training worker {worker_id} started with {args.worker_envs} environments.")
+        args.n_envs = args.worker_envs
+
+    # A2C and A3C workers with multiple envs use a vectorized backend, which resets the envs automatically
+    vectorized = "RR" not in args.env_name and (args.worker == 1 or args.worker_envs > 1)
+
+    if vectorized:
+        if args.async_envs:
+            # two groups of envs, which are stepped alternately
+            n_first = args.n_envs // 2
+            group_envs = [slice(0, n_first), slice(n_first, args.n_envs)]
         else:
-            env = DummyVecEnv([make_env(args.env_name, args.seed, worker_id, args.log_dir)])
+            group_envs = [slice(0, args.n_envs)]
+
+        # the dummy backend creates the envs in this process, which must not be pinned to the env cores
+        use_env_cores = thread_budget is not None and args.vec_env != "dummy"
+        env_groups = []
+        # env processes of the previous groups
+        n_env_processes = 0
+        for envs in group_envs:
+            ranks = range(args.n_envs)[envs]
+            n_processes = get_n_env_processes(args.vec_env, len(ranks), args.envs_per_process)
+            cores = [thread_budget.env(worker_id, n_env_processes + j) for j in range(n_processes)] \
+                if use_env_cores else None
+            n_env_processes += n_processes
+
+            # the processes of subproc run one env each and are pinned by the env callables,
+            # the processes of shmem run several envs and are pinned once before the envs are created
+            pin_envs = cores is not None and args.vec_env == "subproc"
+            env_fns = [make_env(args.env_name, args.seed, worker_id * args.n_envs + i, args.log_dir,
+                                cores=cores[j] if pin_envs else None) for j, i in enumerate(ranks)]
+            env_groups.append(make_vec_env(args.vec_env, env_fns, args.envs_per_process,
+                                           cores=cores if args.vec_env == "shmem" else None))
+        env = env_groups[0]
     else:
-        logging.info(f"Running A3C: training worker {worker_id} started.")
         env = DummyVecEnv([make_env(args.env_name, args.seed, worker_id, args.log_dir)])
         # avoid any issues if this is not 1
         args.n_envs = 1
 
-    normalizer = get_normalizer(args.normalizer, env)
+    if normalizer is None:
+        normalizer = get_normalizer(args.normalizer, env, args.normalizer_merge_frequency)
+        if args.path is not None:
+            load_saved_normalizer(normalizer, args.path)
 
     # init local NN instance for worker thread
-    model = copy.deepcopy(global_model)
+    model = get_local_model(global_model)
     model.train()
 
     model_critic = None
 
     if global_model_critic:
-        model_critic = copy.deepcopy(global_model_critic)
+        model_critic = get_local_model(global_model_critic)
         model_critic.train()
 
     # if no shared optimizer is provided use individual one
@@ -228,139 +439,191 @@ def train(args, worker_id: int, global_model: Union[ActorNetwork, ActorCriticNet
             if optimizer_critic:
                 lr_scheduler_critic = torch.optim.lr_scheduler.ExponentialLR(optimizer_critic, gamma=0.99)
 
-    state = torch.Tensor(env.reset())
+    if args.async_envs:
+        state = torch.Tensor(np.concatenate([env_group.reset() for env_group in env_groups]))
+        # normalized observations and selected actions of the running step of each group
+        observations = [None, None]
+        actions = [None, None]
+    else:
+        state = torch.Tensor(env.reset())
 
     t = np.zeros(args.n_envs)
     global_iter = 0
+    # global step of the last learning rate schedule check
+    last_lr_T = T.value
     episode_reward = np.zeros(args.n_envs)
 
+    # container for computing loss, which is reused for all rollouts
+    if args.batched_forward:
+        storage = RolloutStorage(args.rollout_steps, args.n_envs, env.observation_space.shape[0],
+                                 env.action_space.shape[0])
+    else:
+        storage = RolloutStorage(args.rollout_steps, args.n_envs)
+
     if worker_id == 0:
-        writer = SummaryWriter(log_dir='experiments/runs/')
+        # statistics are accumulated for each update and written in the background
+        writer = AsyncSummaryWriter(log_dir='experiments/runs/')
+        statistics = TrainingStatistics(split_model=not args.shared_model)
+        last_log_T = T.value
 
     while True:
         # Get state of the global model
-        model.load_state_dict(global_model.state_dict())
+        sync_weights(model, global_model)
         if not args.shared_model:
-            model_critic.load_state_dict(global_model_critic.state_dict())
+            sync_weights(model_critic, global_model_critic)
+
+        storage.reset()
 
-        # containers for computing loss
-        values = []
-        log_probs = []
-        rewards = []
-        entropies = []
-        # container to check whether a terminal state was reached from one of the envs
-        terminals = []
+        # sum of the global update counters of the predictor weights, which were used for the actions of this rollout
+        policy_versions = 0
 
         # reward_sum = 0
         for step in range(args.rollout_steps):
-            t += 1
-
-            if args.shared_model:
-                value, mu, std = model(normalizer(state))
+            if args.async_envs:
+                # double buffering: the actions of one group are selected while the other group is simulated
+                if step == 0:
+                    observations[0], actions[0] = start_env_group(args, model, normalizer, env_groups[0],
+                                                                  state[group_envs[0]])
+                observations[1], actions[1] = start_env_group(args, model, normalizer, env_groups[1],
+                                                              state[group_envs[1]])
+
+                for g, envs in enumerate(group_envs):
+                    next_state, reward, dones, _ = env_groups[g].step_wait()
+
+                    t[envs] += 1
+                    reward = shape_reward(args, reward)
+                    episode_reward[envs] += reward
+                    truncated = np.logical_and(t[envs] >= args.max_episode_length, np.logical_not(dones))
+                    dones = np.logical_or(dones, truncated)
+
+                    storage.insert_transition(step, observations[g], actions[g], reward, dones, envs=envs)
+
+                    for i in np.flatnonzero(dones) + envs.start:
+                        global_reward.update(worker_id, episode_reward[i])
+
+                        episode_reward[i] = 0
+                        t[i] = 0
+                        if truncated[i - envs.start]:
+                            next_state[i - envs.start] = reset_env(env_groups[g], i - envs.start)
+
+                    state[envs] = torch.Tensor(next_state)
+
+                    if g == 0 and step + 1 < args.rollout_steps:
+                        # the first group runs its next step while the second group is still simulated
+                        observations[0], actions[0] = start_env_group(args, model, normalizer, env_groups[0],
+                                                                      state[envs])
             else:
-                mu, std = model(normalizer(state))
-                value = model_critic(normalizer(state))
+                t += 1
 
-            dist = torch.distributions.Normal(mu, std)
+                if args.batched_forward:
+                    # only select the action, the statistics for the loss are computed after the rollout
+                    observation = normalizer(state)
+                    if predictor is not None:
+                        unclipped_action, version = predictor.predict(worker_id, observation)
+                        policy_versions += version
+                    else:
+                        with torch.no_grad():
+                            if args.shared_model:
+                                _, mu, std = model(observation)
+                            else:
+                                mu, std = model(observation)
+                            unclipped_action = torch.distributions.Normal(mu, std).sample()
+                else:
+                    # normalize once, actor and critic use the same observation
+                    observation = normalizer(state)
+                    if args.shared_model:
+                        value, mu, std = model(observation)
+                    else:
+                        mu, std = model(observation)
+                        value = model_critic(observation)
 
-            # ------------------------------------------
-            # # select action
-            action = dist.sample()
+                    dist = torch.distributions.Normal(mu, std)
 
-            # ------------------------------------------
-            # Compute statistics for loss
-            entropy = dist.entropy().sum(-1).unsqueeze(-1)
-            log_prob = dist.log_prob(action).sum(-1).unsqueeze(-1)
+                    # ------------------------------------------
+                    # # select action
+                    unclipped_action = dist.sample()
 
-            # make selected move
-            action = np.clip(action.detach().numpy(), -args.max_action, args.max_action)
-            state, reward, dones, _ = env.step(action[0] if not args.worker == 1 or "RR" in args.env_name else action)
+                    # ------------------------------------------
+                    # Compute statistics for loss
+                    entropy = dist.entropy().sum(-1).unsqueeze(-1)
+                    log_prob = dist.log_prob(unclipped_action).sum(-1).unsqueeze(-1)
 
-            reward = shape_reward(args, reward)
+                # make selected move
+                action = np.clip(unclipped_action.numpy(), -args.max_action, args.max_action)
+                state, reward, dones, _ = env.step(action if vectorized else action[0])
 
-            episode_reward += reward
+                reward = shape_reward(args, reward)
 
-            # probably don't set terminal state if max_episode length
-            dones = np.logical_or(dones, t >= args.max_episode_length)
+                episode_reward += reward
 
-            values.append(value)
-            log_probs.append(log_prob)
-            rewards.append(torch.Tensor(reward).unsqueeze(-1))
-            entropies.append(entropy)
-            terminals.append(torch.Tensor(1 - dones).unsqueeze(-1))
+                # episodes, which are not reset by the vectorized env
+                truncated = np.logical_and(t >= args.max_episode_length, np.logical_not(dones))
 
-            for i, done in enumerate(dones):
-                if done:
-                    # keep track of the avg overall global reward
-                    with global_reward.get_lock():
-                        if global_reward.value == -np.inf:
-                            global_reward.value = episode_reward[i]
-                        else:
-                            global_reward.value = .99 * global_reward.value + .01 * episode_reward[i]
-                    if worker_id == 0 and T.value % args.log_frequency == 0:
-                        writer.add_scalar("reward/global", global_reward.value, T.value)
+                # probably don't set terminal state if max_episode length
+                dones = np.logical_or(dones, truncated)
+
+                if args.batched_forward:
+                    storage.insert_transition(step, observation, unclipped_action, reward, dones)
+                else:
+                    storage.insert(step, value, log_prob, entropy, reward, dones)
+
+                for i, done in enumerate(dones):
+                    if done:
+                        global_reward.update(worker_id, episode_reward[i])
 
-                    episode_reward[i] = 0
-                    t[i] = 0
-                    if args.worker != 1 or "RR" in args.env_name:
-                        env.reset()
+                        episode_reward[i] = 0
+                        t[i] = 0
+                        if not vectorized:
+                            env.reset()
+                        elif truncated[i]:
+                            state[i] = reset_env(env, i)
 
-            with T.get_lock():
-                # this is one for a3c and n for A2C (actually the lock is not needed for A2C)
-                T.value += args.n_envs
+                state = torch.Tensor(state)
 
-            if lr_scheduler and worker_id == 0 and T.value % args.lr_scheduler_step and global_iter != 0:
-                lr_scheduler.step(T.value / args.lr_scheduler_step)
+            # number of envs of this worker, one for plain A3C
+            T.increment(worker_id, args.n_envs)
 
-                if lr_scheduler_critic:
-                    lr_scheduler_critic.step(T.value / args.lr_scheduler_step)
+            if lr_scheduler and worker_id == 0:
+                # decay the learning rate when the global counter passed a multiple of the scheduler step
+                current_T = T.value
+                if current_T // args.lr_scheduler_step > last_lr_T // args.lr_scheduler_step:
+                    lr_scheduler.step(current_T // args.lr_scheduler_step)
 
-            state = torch.Tensor(state)
+                    if lr_scheduler_critic:
+                        lr_scheduler_critic.step(current_T // args.lr_scheduler_step)
+                last_lr_T = current_T
 
+        # the statistics are updated with this state in the first step of the next rollout
+        observation = normalizer(state, update=False)
         if args.shared_model:
-            v, _, _ = model(normalizer(state))
+            v, _, _ = model(observation)
             G = v.detach()
         else:
-            G = model_critic(normalizer(state)).detach()
+            G = model_critic(observation).detach()
 
-        values.append(G)
+        storage.set_bootstrap(G)
 
-        # compute loss and backprop
-        advantages = torch.zeros((args.n_envs, 1))
-
-        ret = torch.zeros((args.rollout_steps, args.n_envs, 1))
-        adv = torch.zeros((args.rollout_steps, args.n_envs, 1))
-
-        # iterate over all time steps from most recent to the starting one
-        for i in reversed(range(args.rollout_steps)):
-            # G can be seen essentially as the return over the course of the rollout
-            G = rewards[i] + args.discount * terminals[i] * G
-            if not args.no_gae:
-                # Generalized Advantage Estimation
-                td_error = rewards[i] + args.discount * terminals[i] * values[i + 1] - values[i]
-                # terminals here to "reset" advantages to 0, because reset ist called internally in the env
-                # and new trajectory started
-                advantages = advantages * args.discount * args.tau * terminals[i] + td_error
-            else:
-                advantages = G - values[i].detach()
+        if args.batched_forward:
+            storage.evaluate_actions(model, model_critic)
 
-            adv[i] = advantages.detach()
-            ret[i] = G.detach()
+        # compute loss and backprop
+        ret, adv = compute_returns_and_advantages(storage.rewards, storage.values, storage.terminals, args.discount,
+                                                  args.tau, gae=not args.no_gae)
 
-        policy_loss = -(torch.stack(log_probs) * adv).mean()
+        policy_loss = -(storage.log_probs * adv).mean()
         # minus 1 in order to remove the last element, which is only necessary for next timestep value
-        value_loss = .5 * (ret - torch.stack(values[:-1])).pow(2).mean()
-        entropy_loss = torch.stack(entropies).mean()
+        value_loss = .5 * (ret - storage.values[:-1]).pow(2).mean()
+        entropy_loss = storage.entropies.mean()
 
         # zero grads to reset the gradients
-        optimizer.zero_grad()
+        model.flat_parameters.zero_grad()
 
         if args.shared_model:
             # combined loss for shared architecture
             total_loss = policy_loss + args.value_loss_weight * value_loss - args.entropy_loss_weight * entropy_loss
             total_loss.backward()
         else:
-            optimizer_critic.zero_grad()
+            model_critic.flat_parameters.zero_grad()
 
             value_loss.backward()
             (policy_loss - args.entropy_loss_weight * entropy_loss).backward()
@@ -369,16 +632,42 @@ def train(args, worker_id: int, global_model: Union[ActorNetwork, ActorCriticNet
             total_loss = policy_loss + args.value_loss_weight * value_loss - args.entropy_loss_weight * entropy_loss
 
         torch.nn.utils.clip_grad_norm_(model.parameters(), args.max_grad_norm)
-        sync_grads(model, global_model)
-        optimizer.step()
+        apply_grads(model, global_model, optimizer, grad_lock)
 
         if not args.shared_model:
             torch.nn.utils.clip_grad_norm_(model_critic.parameters(), args.max_grad_norm)
-            sync_grads(model_critic, global_model_critic)
-            optimizer_critic.step()
+            apply_grads(model_critic, global_model_critic, optimizer_critic, grad_lock)
+
+        if predictor is not None:
+            # number of global updates between the weights of the predictors and this update
+            policy_lag = predictor.n_updates.value - policy_versions / args.rollout_steps
+            predictor.count_update()
 
         global_iter += 1
 
-        if worker_id == 0 and T.value % args.log_frequency == 0:
-            log_to_tensorboard(writer, model, optimizer, rewards, values, total_loss, policy_loss, value_loss,
-                               entropy_loss, T.value, model_critic=model_critic, optimizer_critic=optimizer_critic)
+        if worker_id == 0:
+            log_start = time.perf_counter()
+
+            grads = [model.flat_parameters.grad]
+            if not args.shared_model:
+                grads.append(model_critic.flat_parameters.grad)
+            statistics.update(grads, storage.values, storage.rewards,
+                              [total_loss, policy_loss, value_loss, entropy_loss])
+
+            # write the statistics of all updates since the last log when the global counter passed a multiple of
+            # the log frequency
+            current_T = T.value
+            if current_T // args.log_frequency > last_log_T // args.log_frequency:
+                scalars = statistics.flush()
+                if args.shared_model:
+                    scalars["lr"] = optimizer.param_groups[0]['lr']
+                else:
+                    scalars["lr/actor"] = optimizer.param_groups[0]['lr']
+                    scalars["lr/critic"] = optimizer_critic.param_groups[0]['lr']
+                scalars["reward/global"] = global_reward.value
+                if predictor is not None:
+                    scalars["policy_lag"] = policy_lag
+                writer.write(scalars, current_T)
+                last_log_T = current_T
+
+            statistics.cost += time.perf_counter() - log_start
@@ -0,0 +1,122 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+import torch
+
+from a3c.util.util import save_checkpoint
+
+
+def snapshot_state(state):
+    """
+    copy all tensors of a (nested) checkpoint dict, e.g. out of the shared memory of the global models and optimizers,
+    so the snapshot is not changed by the workers while it is serialized
+    :param state: dict, list, tuple, tensor or other value
+    :return: copy with cloned tensors
+    """
+    if torch.is_tensor(state):
+        return state.detach().clone()
+    elif isinstance(state, dict):
+        return type(state)((key, snapshot_state(value)) for key, value in state.items())
+    elif isinstance(state, (list, tuple)):
+        return type(state)(snapshot_state(value) for value in state)
+    return state
+
+
+class CheckpointWriter(object):
+
+    def __init__(self, keep_best: int = 5, interval: float = 0, max_pending: int = 2):
+        """
+        Serializes checkpoints in a background thread, each file is written to a temporary file first and renamed
+        afterwards, so a crash never leaves a partially written checkpoint.
+        Only the keep_best checkpoints with the highest test reward and the latest checkpoint are kept on disk.
+        Example:
+            writer = CheckpointWriter(keep_best=5, interval=600)
+            writer.save(state, path, score=test_reward)
+            if writer.is_due():
+                writer.save(state, latest_path)
+            writer.close()
+        :param keep_best: number of checkpoints with the highest scores to keep
+        :param interval: seconds between periodic checkpoints for crash recovery, 0 disables them
+        :param max_pending: number of snapshots in the queue before save() blocks
+        """
+        self.keep_best = keep_best
+        self.interval = interval
+
+        # (score, path) of the kept checkpoints with a score, sorted by descending score
+        self.best = []
+        self.latest = None
+        self.last_save = time.time()
+
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def save(self, state: dict, path: str, score: float = None) -> None:
+        """
+        copy the tensors of the state and hand it to the writer thread
+        :param state: dict of checkpoint info, see save_checkpoint()
+        :param path: path to save the file to
+        :param score: test reward of the checkpoint, checkpoints without score are only kept as latest checkpoint
+        :return: None
+        """
+        self.last_save = time.time()
+        self.queue.put((snapshot_state(state), path, score))
+
+    def is_due(self) -> bool:
+        """
+        :return: the interval for a periodic checkpoint has passed since the last save
+        """
+        return self.interval > 0 and time.time() - self.last_save >= self.interval
+
+    def close(self) -> None:
+        """
+        write all pending checkpoints and stop the writer thread
+        :return: None
+        """
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+
+            state, path, score = item
+            try:
+                self._write(state, path)
+                self._retain(path, score)
+            except Exception:
+                logging.exception(f"Saving checkpoint {path} failed.")
+
+    def _write(self, state: dict, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        save_checkpoint(state, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _retain(self, path: str, score: float = None) -> None:
+        """
+        remove all checkpoints, which are neither within the best scores nor the latest checkpoint
+        :param path: path of the new checkpoint
+        :param score: score of the new checkpoint
+        :return: None
+        """
+        removed = []
+
+        if score is not None:
+            self.best.append((score, path))
+            self.best.sort(key=lambda item: item[0], reverse=True)
+            removed += [p for _, p in self.best[self.keep_best:]]
+            self.best = self.best[:self.keep_best]
+
+        if self.latest is not None:
+            removed.append(self.latest)
+        self.latest = path
+
+        kept = {p for _, p in self.best} | {self.latest}
+        for p in set(removed) - kept:
+            if os.path.exists(p):
+                os.remove(p)
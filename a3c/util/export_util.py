@@ -0,0 +1,169 @@
+import copy
+
+import torch
+
+from a3c.util.normalizer.base_normalizer import BaseNormalizer
+from a3c.util.normalizer.mean_std_normalizer import MeanStdNormalizer
+from a3c.util.normalizer.min_max_normalizer import MinMaxNormalizer
+
+
+class ClampedInputModel(torch.nn.Module):
+
+    def __init__(self, model: torch.nn.Module, low: torch.Tensor = None, high: torch.Tensor = None):
+        """
+        Wrapper, which clamps the raw observations feature-wise before the forward pass of the model.
+        This keeps the clipping of a folded MeanStdNormalizer, which cannot be expressed with the first linear layer.
+        :param model: model with the folded normalization
+        :param low: optional lower bounds of the raw observations [state_dim]
+        :param high: optional upper bounds of the raw observations [state_dim]
+        """
+        super(ClampedInputModel, self).__init__()
+        self.model = model
+
+        if low is not None:
+            self.register_buffer("low", low.float())
+            self.register_buffer("high", high.float())
+        else:
+            self.low = None
+            self.high = None
+
+    def forward(self, x: torch.Tensor):
+        x = x.float()
+        if self.low is not None:
+            x = torch.max(torch.min(x, self.high), self.low)
+        return self.model(x)
+
+
+def fold_normalizer(model: torch.nn.Module, normalizer: BaseNormalizer) -> torch.nn.Module:
+    """
+    fold the frozen affine normalization of the observations into the first linear layer of a copy of the model,
+    the returned model takes raw observations and gives the same outputs as model(normalizer(x)).
+    Example:
+        policy = fold_normalizer(model, normalizer)
+        _, mu, _ = policy(torch.from_numpy(state))
+    :param model: actor, critic or shared model, the first layer has to be model.body[0]
+    :param normalizer: normalizer with the frozen statistics
+    :return: copy of the model in eval mode, which expects raw observations
+    """
+    folded = copy.deepcopy(model)
+    folded.eval()
+
+    # the copy is only used for inference and does not need the flat buffers of the worker models
+    if hasattr(folded, "flat_parameters"):
+        del folded.flat_parameters
+
+    low, high = None, None
+
+    if isinstance(normalizer, MeanStdNormalizer):
+        # (x - mean) / std = x * scale + shift
+        normalizer.sync()
+        scale = 1. / normalizer.std
+        shift = -normalizer.mean * scale
+        # clip((x - mean) / std, -c, c) is equal to clipping x to mean -/+ c * std before the normalization
+        low = normalizer.mean - normalizer.clip * normalizer.std
+        high = normalizer.mean + normalizer.clip * normalizer.std
+    elif isinstance(normalizer, MinMaxNormalizer):
+        # (x - min) * scale = x * scale + shift
+        scale = normalizer.scale
+        shift = -normalizer.min_state * scale
+    else:
+        return folded
+
+    layer = folded.body[0]
+    weight = layer.weight.data.double()
+
+    # W (x * scale + shift) + b = (W * scale) x + (W shift + b)
+    layer.bias.data = (layer.bias.data.double() + weight.matmul(shift)).float()
+    layer.weight.data = (weight * scale).float()
+
+    return ClampedInputModel(folded, low, high)
+
+
+def quantize_model(model: torch.nn.Module) -> torch.nn.Module:
+    """
+    post-training dynamic int8 quantization of all linear layers of a copy of the model,
+    the weights are quantized once and the activations are quantized dynamically in each forward pass
+    :param model: model for inference, e.g. from fold_normalizer()
+    :return: quantized copy of the model
+    """
+    if not hasattr(torch, "quantization") or not hasattr(torch.quantization, "quantize_dynamic"):
+        raise RuntimeError("Dynamic quantization requires pytorch >= 1.3.")
+
+    model = copy.deepcopy(model)
+    model.eval()
+    # the flat buffers of the worker models are not used for inference
+    if hasattr(model, "flat_parameters"):
+        del model.flat_parameters
+
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def action_deviation(reference: torch.nn.Module, model: torch.nn.Module, states: torch.Tensor,
+                     shared_model: bool = False) -> tuple:
+    """
+    replay states with both models and compare the mean actions, e.g. to check the accuracy of a quantized model
+    :param reference: reference model, e.g. the fp32 model
+    :param model: model to check, which expects the same inputs as the reference
+    :param states: recorded states [n_states, state_dim]
+    :param shared_model: the models are shared actor critic models, which return value, mu, sigma
+    :return: mean and maximum absolute deviation of the mean actions
+    """
+    with torch.no_grad():
+        mu_reference = reference(states)[1 if shared_model else 0]
+        mu = model(states)[1 if shared_model else 0]
+
+    deviation = (mu - mu_reference).abs()
+    return deviation.mean().item(), deviation.max().item()
+
+
+class MeanActionPolicy(torch.nn.Module):
+
+    def __init__(self, model: torch.nn.Module, max_action: float, shared_model: bool = False):
+        """
+        Deterministic policy for deployment, which returns the clipped mean action of the model
+        :param model: actor or shared model, e.g. from fold_normalizer()
+        :param max_action: absolute bound of the actions
+        :param shared_model: the model is a shared actor critic model, which returns value, mu, sigma
+        """
+        super(MeanActionPolicy, self).__init__()
+        self.model = model
+        self.max_action = max_action
+        self.shared_model = shared_model
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        if self.shared_model:
+            _, mu, _ = self.model(x)
+        else:
+            mu, _ = self.model(x)
+        return torch.clamp(mu, -self.max_action, self.max_action)
+
+
+def export_policy(model: torch.nn.Module, normalizer: BaseNormalizer, state_dim: int, max_action: float, path: str,
+                  shared_model: bool = False, quantize: bool = False) -> torch.nn.Module:
+    """
+    trace the clipped mean action of the model with the folded normalizer and save it as TorchScript module,
+    which can be loaded without the model classes with torch.jit.load(path)
+    :param model: actor or shared model
+    :param normalizer: normalizer with the frozen statistics
+    :param state_dim: dimension of the observations
+    :param max_action: absolute bound of the actions
+    :param path: file to save the traced policy to
+    :param shared_model: the model is a shared actor critic model
+    :param quantize: quantize the linear layers dynamically to int8
+    :return: traced policy
+    """
+    if not hasattr(torch.jit, "save"):
+        raise RuntimeError("Exporting TorchScript policies requires pytorch >= 1.0.")
+
+    model = fold_normalizer(model, normalizer)
+    if quantize:
+        model = quantize_model(model)
+
+    policy = MeanActionPolicy(model, max_action, shared_model)
+    policy.eval()
+
+    with torch.no_grad():
+        traced = torch.jit.trace(policy, torch.zeros(1, state_dim))
+
+    torch.jit.save(traced, path)
+    return traced
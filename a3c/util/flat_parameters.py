@@ -0,0 +1,58 @@
+import torch
+from torch.nn import Module
+
+
+class FlatParameters(object):
+
+    def __init__(self, module: Module, shared: bool = False):
+        """
+        Moves all parameters of a module into one contiguous buffer, the parameters of the module become views of it.
+        This allows to copy all weights or gradients of a model with a single vector operation.
+        The gradient buffer is never shared between processes, it has to be created in each process with init_grad().
+        Example:
+            global_model.flat_parameters = FlatParameters(global_model, shared=True)
+            ...
+            # in each worker process
+            model.flat_parameters = FlatParameters(model)
+            model.flat_parameters.init_grad()
+            global_model.flat_parameters.init_grad()
+        :param module: module, whose parameters are flattened
+        :param shared: move the buffer to shared memory
+        """
+        self.params = list(module.parameters())
+
+        self.data = torch.zeros(sum(p.numel() for p in self.params))
+        if shared:
+            self.data.share_memory_()
+
+        offset = 0
+        for p in self.params:
+            view = self.data[offset:offset + p.numel()].view_as(p.data)
+            view.copy_(p.data)
+            p.data = view
+            offset += p.numel()
+
+        self.grad = None
+
+    def init_grad(self) -> None:
+        """
+        create the process local flat gradient buffer and use views of it as gradients of all parameters
+        :return: None
+        """
+        self.grad = torch.zeros_like(self.data)
+
+        offset = 0
+        for p in self.params:
+            p.grad = self.grad[offset:offset + p.numel()].view_as(p.data)
+            offset += p.numel()
+
+    def zero_grad(self) -> None:
+        """
+        reset all gradients to zero
+        :return: None
+        """
+        self.grad.zero_()
+
+    def __len__(self):
+        return self.data.numel()
+
@@ -0,0 +1,103 @@
+import numpy as np
+import torch.multiprocessing as mp
+
+
+class GlobalCounter(object):
+
+    def __init__(self, n_workers: int, value: int = 0):
+        """
+        Global step counter without a lock, each worker only increments its own slot of a shared array
+        and the global value is the sum of all slots.
+        Reading the value while other workers increment their slots may miss their latest steps,
+        which is sufficient for logging, learning rate schedules and checkpoint names.
+        The instance has to be created before the worker processes are started.
+        Example:
+            T = GlobalCounter(n_workers=8)
+            T.increment(worker_id, n_envs)
+            if T.value >= max_steps: ...
+        :param n_workers: number of workers, which increment the counter
+        :param value: initial value, e.g. the step of a loaded checkpoint
+        """
+        # slot 0 holds the initial value, slot i + 1 the steps of worker i
+        self.slots = mp.RawArray('q', n_workers + 1)
+        self.counts = np.frombuffer(self.slots, dtype=np.int64)
+        self.counts[0] = value
+
+    def increment(self, worker_id: int, n: int = 1) -> None:
+        """
+        add steps to the slot of the worker, only the worker itself is allowed to write its slot
+        :param worker_id: id of the worker
+        :param n: number of steps
+        :return: None
+        """
+        self.counts[worker_id + 1] += n
+
+    @property
+    def value(self) -> int:
+        return int(self.counts.sum())
+
+    @value.setter
+    def value(self, value: int) -> None:
+        # keep the steps of the workers and only move the initial value
+        self.counts[0] = value - self.counts[1:].sum()
+
+    def __getstate__(self):
+        return {"slots": self.slots}
+
+    def __setstate__(self, state):
+        self.slots = state["slots"]
+        self.counts = np.frombuffer(self.slots, dtype=np.int64)
+
+
+class GlobalReward(object):
+
+    def __init__(self, n_workers: int, decay: float = .99):
+        """
+        Global running reward without a lock, each worker keeps an exponential moving average of its episode rewards
+        in its own slot of a shared array and the global value is the mean of all initialized slots.
+        The decay of each worker is decay ** n_workers, so the average covers as many episodes of all workers
+        as a single running reward with the given decay.
+        The instance has to be created before the worker processes are started.
+        Example:
+            global_reward = GlobalReward(n_workers=8)
+            global_reward.update(worker_id, episode_reward)
+            logging.info(f"global reward={global_reward.value}")
+        :param n_workers: number of workers, which update the reward
+        :param decay: decay of the running reward over the episodes of all workers
+        """
+        self.decay = decay ** n_workers
+
+        # -inf marks the slots of workers, which did not finish an episode yet
+        self.slots = mp.RawArray('d', n_workers)
+        self.rewards = np.frombuffer(self.slots, dtype=np.float64)
+        self.rewards.fill(-np.inf)
+
+    def update(self, worker_id: int, episode_reward: float) -> None:
+        """
+        update the running reward of the worker, only the worker itself is allowed to write its slot
+        :param worker_id: id of the worker
+        :param episode_reward: cumulative reward of the finished episode
+        :return: None
+        """
+        if self.rewards[worker_id] == -np.inf:
+            self.rewards[worker_id] = episode_reward
+        else:
+            self.rewards[worker_id] = self.decay * self.rewards[worker_id] + (1 - self.decay) * episode_reward
+
+    @property
+    def value(self) -> float:
+        rewards = self.rewards[self.rewards != -np.inf]
+        return float(rewards.mean()) if len(rewards) > 0 else -np.inf
+
+    @value.setter
+    def value(self, value: float) -> None:
+        # e.g. continue with the running reward of a loaded checkpoint in all slots
+        self.rewards.fill(value)
+
+    def __getstate__(self):
+        return {"slots": self.slots, "decay": self.decay}
+
+    def __setstate__(self, state):
+        self.slots = state["slots"]
+        self.decay = state["decay"]
+        self.rewards = np.frombuffer(self.slots, dtype=np.float64)
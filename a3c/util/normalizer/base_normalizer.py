@@ -3,13 +3,14 @@
 # Permission given to modify the code as long as you keep this        #
 # declaration at the top                                              #
 #######################################################################
+import copy
 
 
 class BaseNormalizer(object):
     def __init__(self, read_only):
         self.read_only = read_only
 
-    def __call__(self, x):
+    def __call__(self, x, update=True):
         return x
 
     def set_read_only(self):
@@ -18,6 +19,13 @@ class BaseNormalizer(object):
     def unset_read_only(self):
         self.read_only = False
 
+    def sync(self):
+        return
+
+    def worker_copy(self):
+        # independent copy for a worker thread, worker processes get their copy when they are started
+        return copy.deepcopy(self)
+
     def state_dict(self):
         return None
 
@@ -4,26 +4,93 @@
 # declaration at the top                                              #
 #######################################################################
 
-import numpy as np
-from baselines.common.running_mean_std import RunningMeanStd
+import torch
 
 from a3c.util.normalizer.base_normalizer import BaseNormalizer
-import torch
 
 
-class MeanStdNormalizer(BaseNormalizer):
-    def __init__(self, read_only=False, clip=10.0, epsilon=1e-8):
+def combine_moments(count: torch.Tensor, mean: torch.Tensor, m2: torch.Tensor, batch_count: torch.Tensor,
+                    batch_mean: torch.Tensor, batch_m2: torch.Tensor) -> tuple:
+    """
+    combine count, mean and sum of squared differences of two sets of observations (parallel variance, Chan et al.)
+    :param count: number of observations of the first set
+    :param mean: mean of the first set
+    :param m2: sum of squared differences from the mean of the first set
+    :param batch_count: number of observations of the second set
+    :param batch_mean: mean of the second set
+    :param batch_m2: sum of squared differences from the mean of the second set
+    :return: count, mean, m2 of the combined set
+    """
+    delta = batch_mean - mean
+    total_count = count + batch_count
+    return total_count, mean + delta * batch_count / total_count, \
+        m2 + batch_m2 + delta.pow(2) * count * batch_count / total_count
 
+
+class MeanStdNormalizer(BaseNormalizer):
+    def __init__(self, shape: tuple, read_only: bool = False, clip: float = 10.0, epsilon: float = 1e-8):
+        """
+        Normalizes observations with running mean and standard deviation.
+        The statistics are kept in preallocated double tensors and updated in place with a batched Welford update,
+        which is equivalent to baselines' RunningMeanStd.
+        :param shape: shape of one observation
+        :param read_only: do not update the statistics
+        :param clip: absolute bound of the normalized observations
+        :param epsilon: numerical stability constant for the standard deviation
+        """
         super().__init__(read_only)
-        self.rms = None
         self.clip = clip
         self.epsilon = epsilon
 
-    def __call__(self, x):
-        x = np.asarray(x)
-        if self.rms is None:
-            self.rms = RunningMeanStd(shape=(1,) + x.shape[1:])
-        if not self.read_only:
-            self.rms.update(x)
-        return torch.from_numpy(np.clip((x - self.rms.mean) / np.sqrt(self.rms.var + self.epsilon),
-                                        -self.clip, self.clip))
+        self.mean = torch.zeros(shape, dtype=torch.float64)
+        self.var = torch.ones(shape, dtype=torch.float64)
+        # small initial count like RunningMeanStd, which weights the initial mean and variance
+        self.count = torch.full((1,), 1e-4, dtype=torch.float64)
+        self.std = torch.ones(shape, dtype=torch.float64)
+
+    def update(self, x: torch.Tensor) -> None:
+        """
+        update the running statistics with a batch of observations
+        :param x: observations [batch_size, *shape] or [*shape]
+        :return: None
+        """
+        x = x.double().view(-1, *self.mean.shape)
+        batch_count = x.shape[0]
+        batch_mean = x.mean(0)
+        batch_m2 = x.var(0, unbiased=False) * batch_count
+
+        count, mean, m2 = combine_moments(self.count, self.mean, self.var * self.count, batch_count, batch_mean,
+                                          batch_m2)
+
+        self.mean.copy_(mean)
+        torch.div(m2, count, out=self.var)
+        self.count.copy_(count)
+        torch.sqrt(self.var + self.epsilon, out=self.std)
+
+    def __call__(self, x: torch.Tensor, update: bool = True) -> torch.Tensor:
+        """
+        normalize the observations and update the statistics
+        :param x: observations [batch_size, *shape] or [*shape]
+        :param update: update the statistics with x, e.g. disabled for bootstrapping states,
+        which are normalized again in the next step
+        :return: normalized observations with the dtype of x
+        """
+        if update and not self.read_only:
+            self.update(x)
+        return ((x - self.mean.to(x.dtype)) / self.std.to(x.dtype)).clamp_(-self.clip, self.clip)
+
+    def state_dict(self) -> dict:
+        return {'mean': self.mean.clone(), 'var': self.var.clone(), 'count': self.count.clone()}
+
+    def load_state_dict(self, state_dict: dict) -> None:
+        """
+        copy the statistics of a checkpoint into the buffers
+        :param state_dict: normalizer state dict
+        :return: None
+        """
+        if state_dict is None:
+            return
+        self.mean.copy_(state_dict['mean'])
+        self.var.copy_(state_dict['var'])
+        self.count.copy_(state_dict['count'])
+        torch.sqrt(self.var + self.epsilon, out=self.std)
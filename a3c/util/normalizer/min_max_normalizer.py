@@ -1,10 +1,7 @@
+import numpy as np
 import torch
 
 from a3c.util.normalizer.base_normalizer import BaseNormalizer
-import numpy as np
-
-min_state = None
-max_state = None
 
 
 class MinMaxNormalizer(BaseNormalizer):
@@ -16,9 +13,20 @@ class MinMaxNormalizer(BaseNormalizer):
         :param max_state: Representation of the maximum values for all feature of a state
         """
         super().__init__(read_only)
-        self.min_state = min_state
-        self.max_state = max_state
+        self.min_state = torch.from_numpy(np.asarray(min_state, dtype=np.float64))
+        self.max_state = torch.from_numpy(np.asarray(max_state, dtype=np.float64))
+        # precomputed inverse range, the normalization is one subtraction and one multiplication
+        self.scale = 1. / (self.max_state - self.min_state)
+
+    def __call__(self, x: torch.Tensor, update: bool = True) -> torch.Tensor:
+        return (x - self.min_state.to(x.dtype)) * self.scale.to(x.dtype)
+
+    def state_dict(self) -> dict:
+        return {'min_state': self.min_state.clone(), 'max_state': self.max_state.clone()}
 
-    def __call__(self, x):
-        x = np.asarray(x)
-        return torch.from_numpy((x - self.min_state) / (self.max_state - self.min_state))
+    def load_state_dict(self, state_dict: dict) -> None:
+        if state_dict is None:
+            return
+        self.min_state.copy_(state_dict['min_state'])
+        self.max_state.copy_(state_dict['max_state'])
+        self.scale.copy_(1. / (self.max_state - self.min_state))
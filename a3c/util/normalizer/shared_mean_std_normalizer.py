@@ -0,0 +1,121 @@
+import copy
+
+import torch
+import torch.multiprocessing as mp
+
+from a3c.util.normalizer.mean_std_normalizer import MeanStdNormalizer, combine_moments
+
+
+class SharedMeanStdNormalizer(MeanStdNormalizer):
+    def __init__(self, shape: tuple, read_only: bool = False, clip: float = 10.0, epsilon: float = 1e-8,
+                 merge_frequency: int = 10):
+        """
+        Normalizes observations with running mean and standard deviation, which are shared by all workers.
+        Count, mean and sum of squared differences (M2) of all workers live in shared memory.
+        Each worker accumulates its observations locally and merges them into the shared statistics every
+        merge_frequency updates under a lock, afterwards it normalizes with a local copy of the shared statistics.
+        The instance has to be created before the worker processes are started.
+        Example:
+            normalizer = SharedMeanStdNormalizer(env.observation_space.shape, merge_frequency=10)
+            Process(target=train, args=(..., normalizer)).start()
+            ...
+            # in the test worker
+            normalizer.set_read_only()
+            normalizer.sync()
+        :param shape: shape of one observation
+        :param read_only: do not update the statistics
+        :param clip: absolute bound of the normalized observations
+        :param epsilon: numerical stability constant for the standard deviation
+        :param merge_frequency: number of local updates before they are merged into the shared statistics
+        """
+        super().__init__(shape, read_only, clip, epsilon)
+        self.merge_frequency = merge_frequency
+
+        self.shared_count = self.count.clone().share_memory_()
+        self.shared_mean = self.mean.clone().share_memory_()
+        self.shared_m2 = (self.var * self.count).share_memory_()
+        self.lock = mp.Lock()
+
+        # statistics of the local observations since the last merge
+        self.batch_count = torch.zeros(1, dtype=torch.float64)
+        self.batch_mean = torch.zeros(shape, dtype=torch.float64)
+        self.batch_m2 = torch.zeros(shape, dtype=torch.float64)
+        self.n_updates = 0
+
+    def update(self, x: torch.Tensor) -> None:
+        """
+        accumulate a batch of observations locally and merge them into the shared statistics periodically
+        :param x: observations [batch_size, *shape] or [*shape]
+        :return: None
+        """
+        x = x.double().view(-1, *self.mean.shape)
+        batch_count = x.shape[0]
+
+        count, mean, m2 = combine_moments(self.batch_count, self.batch_mean, self.batch_m2, batch_count, x.mean(0),
+                                          x.var(0, unbiased=False) * batch_count)
+        self.batch_count.copy_(count)
+        self.batch_mean.copy_(mean)
+        self.batch_m2.copy_(m2)
+
+        self.n_updates += 1
+        if self.n_updates % self.merge_frequency == 0:
+            self.merge()
+
+    def merge(self) -> None:
+        """
+        merge the local observations into the shared statistics and load the result
+        :return: None
+        """
+        with self.lock:
+            count, mean, m2 = combine_moments(self.shared_count, self.shared_mean, self.shared_m2, self.batch_count,
+                                              self.batch_mean, self.batch_m2)
+            self.shared_count.copy_(count)
+            self.shared_mean.copy_(mean)
+            self.shared_m2.copy_(m2)
+
+        self.batch_count.zero_()
+        self.batch_mean.zero_()
+        self.batch_m2.zero_()
+
+        self._load(count, mean, m2)
+
+    def sync(self) -> None:
+        """
+        load the current shared statistics without merging, e.g. for the read only test worker
+        :return: None
+        """
+        with self.lock:
+            count, mean, m2 = self.shared_count.clone(), self.shared_mean.clone(), self.shared_m2.clone()
+        self._load(count, mean, m2)
+
+    def _load(self, count: torch.Tensor, mean: torch.Tensor, m2: torch.Tensor) -> None:
+        self.count.copy_(count)
+        self.mean.copy_(mean)
+        torch.div(m2, count, out=self.var)
+        torch.sqrt(self.var + self.epsilon, out=self.std)
+
+    def worker_copy(self) -> "SharedMeanStdNormalizer":
+        """
+        copy for a worker thread with its own local statistics, which shares the statistics of all workers and the lock
+        :return: normalizer copy
+        """
+        shared = [self.shared_count, self.shared_mean, self.shared_m2, self.lock]
+        return copy.deepcopy(self, {id(x): x for x in shared})
+
+    def state_dict(self) -> dict:
+        self.sync()
+        return super().state_dict()
+
+    def load_state_dict(self, state_dict: dict) -> None:
+        """
+        copy the statistics of a checkpoint into the shared and local buffers
+        :param state_dict: normalizer state dict
+        :return: None
+        """
+        if state_dict is None:
+            return
+        super().load_state_dict(state_dict)
+        with self.lock:
+            self.shared_count.copy_(self.count)
+            self.shared_mean.copy_(self.mean)
+            self.shared_m2.copy_(self.var * self.count)
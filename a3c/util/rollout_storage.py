@@ -0,0 +1,117 @@
+import numpy as np
+import torch
+
+
+class RolloutStorage(object):
+
+    def __init__(self, rollout_steps: int, n_envs: int, state_dim: int = None, action_dim: int = None):
+        """
+        Preallocated container for the statistics of one rollout, which is reused for all updates of a worker.
+        All buffers have the shape [rollout_steps, n_envs, 1], values contain one additional step for bootstrapping.
+        Rewards and terminal masks are written into the buffers through numpy views,
+        values, log probabilities and entropies are written with slice assignment to keep the autograd graph.
+        Example:
+            storage = RolloutStorage(rollout_steps=50, n_envs=5)
+            for step in range(50):
+                ...
+                storage.insert(step, value, log_prob, entropy, reward, dones)
+            storage.set_bootstrap(value)
+            ...
+            storage.reset()
+        :param rollout_steps: number of steps of each rollout
+        :param n_envs: number of environments, which are executed in parallel
+        :param state_dim: optional dimension of the observations
+        :param action_dim: optional dimension of the actions
+        """
+        self.rollout_steps = rollout_steps
+        self.n_envs = n_envs
+
+        self.values = torch.zeros(rollout_steps + 1, n_envs, 1)
+        self.log_probs = torch.zeros(rollout_steps, n_envs, 1)
+        self.entropies = torch.zeros(rollout_steps, n_envs, 1)
+        self.rewards = torch.zeros(rollout_steps, n_envs, 1)
+        # 0 if a terminal state was reached from one of the envs else 1
+        self.terminals = torch.ones(rollout_steps, n_envs, 1)
+
+        self.observations = torch.zeros(rollout_steps, n_envs, state_dim) if state_dim else None
+        self.actions = torch.zeros(rollout_steps, n_envs, action_dim) if action_dim else None
+
+        # numpy views share the memory of the tensors and allow to write the env outputs without new tensors
+        self._rewards = self.rewards.numpy()[..., 0]
+        self._terminals = self.terminals.numpy()[..., 0]
+
+    def insert(self, step: int, value: torch.Tensor, log_prob: torch.Tensor, entropy: torch.Tensor,
+               reward: np.ndarray, dones: np.ndarray) -> None:
+        """
+        write the statistics of one step into the buffers
+        :param step: index of the step in the current rollout
+        :param value: value estimate of the current state [n_envs, 1]
+        :param log_prob: log probability of the selected action [n_envs, 1]
+        :param entropy: entropy of the action distribution [n_envs, 1]
+        :param reward: reward of the step [n_envs]
+        :param dones: terminal flags of the step [n_envs]
+        :return: None
+        """
+        self.values[step] = value
+        self.log_probs[step] = log_prob
+        self.entropies[step] = entropy
+        self._rewards[step] = reward
+        np.subtract(1., dones, out=self._terminals[step])
+
+    def insert_transition(self, step: int, observation: torch.Tensor, action: torch.Tensor, reward: np.ndarray,
+                          dones: np.ndarray, envs: slice = slice(None)) -> None:
+        """
+        write the normalized observation and the selected action of one step into the buffers,
+        values, log probabilities and entropies are computed later on with evaluate_actions()
+        :param step: index of the step in the current rollout
+        :param observation: normalized observation [n_envs, state_dim]
+        :param action: selected action before clipping [n_envs, action_dim]
+        :param reward: reward of the step [n_envs]
+        :param dones: terminal flags of the step [n_envs]
+        :param envs: optional slice of the envs, which are written, e.g. one group of envs for async stepping
+        :return: None
+        """
+        self.observations[step, envs].copy_(observation)
+        self.actions[step, envs].copy_(action)
+        self._rewards[step, envs] = reward
+        np.subtract(1., dones, out=self._terminals[step, envs])
+
+    def evaluate_actions(self, model: torch.nn.Module, model_critic: torch.nn.Module = None) -> None:
+        """
+        compute values, log probabilities and entropies of the whole rollout with one batched forward pass
+        over the stored observations and actions
+        :param model: shared model/ for split models: actor
+        :param model_critic: optional critic for split models
+        :return: None
+        """
+        observations = self.observations.view(self.rollout_steps * self.n_envs, -1)
+        actions = self.actions.view(self.rollout_steps * self.n_envs, -1)
+
+        if model_critic is None:
+            value, mu, std = model(observations)
+        else:
+            mu, std = model(observations)
+            value = model_critic(observations)
+
+        dist = torch.distributions.Normal(mu, std)
+
+        self.values[:-1] = value.view(self.rollout_steps, self.n_envs, 1)
+        self.log_probs[:] = dist.log_prob(actions).sum(-1).view(self.rollout_steps, self.n_envs, 1)
+        self.entropies[:] = dist.entropy().sum(-1).view(self.rollout_steps, self.n_envs, 1)
+
+    def set_bootstrap(self, value: torch.Tensor) -> None:
+        """
+        set the value estimate of the state after the last step of the rollout
+        :param value: value estimate [n_envs, 1]
+        :return: None
+        """
+        self.values[-1] = value.detach()
+
+    def reset(self) -> None:
+        """
+        detach all buffers from the autograd graph of the last rollout, this has to be called before each rollout
+        :return: None
+        """
+        self.values.detach_()
+        self.log_probs.detach_()
+        self.entropies.detach_()
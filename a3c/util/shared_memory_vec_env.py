@@ -0,0 +1,197 @@
+import multiprocessing as mp
+
+import numpy as np
+from baselines.common.vec_env import VecEnv
+
+from a3c.util.thread_budget import CoreAssignment, apply_core_assignment
+
+# commands, which are sent from the main process to the env processes
+_STEP = 0
+_RESET = 1
+_CLOSE = 2
+_RESET_ENV = 3
+
+
+def _worker(env_fns: list, env_ids: list, command, env_index, start, finished, observations: np.ndarray,
+            actions: np.ndarray, rewards: np.ndarray, dones: np.ndarray, cores: CoreAssignment = None) -> None:
+    """
+    env process, which steps all its envs when the main process signals new actions
+    :param env_fns: callables to create the envs of this process
+    :param env_ids: indices of the envs of this process in the shared arrays
+    :param command: shared command value
+    :param env_index: shared index of the env, which is reset by a single env reset command
+    :param start: semaphore, which signals new commands of the main process
+    :param finished: semaphore, which signals the main process that this process is done
+    :param observations: shared observations [n_envs, state_dim]
+    :param actions: shared actions [n_envs, action_dim]
+    :param rewards: shared rewards [n_envs]
+    :param dones: shared terminal flags [n_envs]
+    :param cores: optional cpus and threads of this process, which are shared by all its envs
+    :return: None
+    """
+    apply_core_assignment(cores)
+    envs = [env_fn() for env_fn in env_fns]
+
+    try:
+        while True:
+            start.acquire()
+
+            if command.value == _CLOSE:
+                break
+
+            for i, env in zip(env_ids, envs):
+                if command.value == _RESET or command.value == _RESET_ENV and i == env_index.value:
+                    observations[i] = env.reset()
+                elif command.value == _RESET_ENV:
+                    continue
+                else:
+                    observation, reward, done, _ = env.step(actions[i])
+                    if done:
+                        observation = env.reset()
+                    observations[i] = observation
+                    rewards[i] = reward
+                    dones[i] = done
+
+            finished.release()
+    finally:
+        for env in envs:
+            env.close()
+
+
+def _get_spaces(env_fn: callable, remote) -> None:
+    """
+    probe process, which creates one env and sends its observation and action space to the main process
+    :param env_fn: callable to create the env
+    :param remote: connection to the main process
+    :return: None
+    """
+    env = env_fn()
+    remote.send((env.observation_space, env.action_space))
+    remote.close()
+    env.close()
+
+
+class SharedMemoryVecEnv(VecEnv):
+
+    def __init__(self, env_fns: list, envs_per_process: int = 1, cores: list = None):
+        """
+        Vectorized environment, which runs the envs in subprocesses like SubprocVecEnv,
+        but exchanges observations, actions, rewards and terminal flags through shared memory instead of pipes.
+        Each subprocess can run several envs, all envs are reset automatically at the end of an episode.
+        The infos of the envs are not transferred, step() returns empty dicts.
+        The env processes are forked, because make_env() returns local callables.
+        Example:
+            env = SharedMemoryVecEnv([make_env(args.env_name, args.seed, i) for i in range(8)], envs_per_process=2)
+        :param env_fns: callables to create the envs, e.g. from make_env()
+        :param envs_per_process: number of envs, which are run in one subprocess
+        :param cores: optional CoreAssignment of each subprocess, the env callables must not pin the process
+        """
+        self.closed = False
+        ctx = mp.get_context("fork")
+
+        # the shapes of the shared arrays are determined with one env in a subprocess, the env callables must not
+        # run in this process, because they can change the cpu affinity and open the monitor files of the envs
+        remote, work_remote = ctx.Pipe(duplex=False)
+        p = ctx.Process(target=_get_spaces, args=(env_fns[0], work_remote), daemon=True)
+        p.start()
+        work_remote.close()
+        try:
+            observation_space, action_space = remote.recv()
+        except EOFError:
+            raise EOFError("The env process, which determines the observation and action space, failed.")
+        finally:
+            p.join()
+
+        n_envs = len(env_fns)
+        state_dim = int(np.prod(observation_space.shape))
+        action_dim = int(np.prod(action_space.shape))
+
+        VecEnv.__init__(self, n_envs, observation_space, action_space)
+
+        self._observations = np.frombuffer(ctx.RawArray('d', n_envs * state_dim)).reshape(n_envs, state_dim)
+        self._actions = np.frombuffer(ctx.RawArray('d', n_envs * action_dim)).reshape(n_envs, action_dim)
+        self._rewards = np.frombuffer(ctx.RawArray('d', n_envs))
+        self._dones = np.frombuffer(ctx.RawArray('b', n_envs), dtype=np.int8)
+
+        self.command = ctx.RawValue('i', _STEP)
+        self.env_index = ctx.RawValue('i', 0)
+        self.envs_per_process = envs_per_process
+        self.finished = ctx.Semaphore(0)
+        self.start_semaphores = []
+        self.processes = []
+
+        for rank, offset in enumerate(range(0, n_envs, envs_per_process)):
+            env_ids = list(range(offset, min(offset + envs_per_process, n_envs)))
+            start = ctx.Semaphore(0)
+            p = ctx.Process(target=_worker, args=(
+                [env_fns[i] for i in env_ids], env_ids, self.command, self.env_index, start, self.finished,
+                self._observations, self._actions, self._rewards, self._dones,
+                cores[rank] if cores is not None else None))
+            p.daemon = True
+            p.start()
+            self.start_semaphores.append(start)
+            self.processes.append(p)
+
+    def _run(self, command: int) -> None:
+        """
+        execute a command in all env processes and wait until all are finished
+        :param command: command to execute
+        :return: None
+        """
+        self.command.value = command
+        for start in self.start_semaphores:
+            start.release()
+        self._wait(len(self.start_semaphores))
+
+    def _wait(self, n: int) -> None:
+        """
+        wait until n env processes finished their command
+        :param n: number of env processes
+        :return: None
+        """
+        for _ in range(n):
+            # check regularly, if an env process died, e.g. after an exception of an env, instead of blocking forever
+            while not self.finished.acquire(timeout=1.):
+                for p in self.processes:
+                    if not p.is_alive():
+                        raise EOFError(f"Env process {p.pid} died with exit code {p.exitcode}.")
+
+    def reset(self) -> np.ndarray:
+        self._run(_RESET)
+        return self._observations.copy()
+
+    def reset_env(self, index: int) -> np.ndarray:
+        """
+        reset a single env, e.g. after its episode was truncated
+        :param index: index of the env
+        :return: observation of the env after the reset
+        """
+        self.command.value = _RESET_ENV
+        self.env_index.value = index
+        self.start_semaphores[index // self.envs_per_process].release()
+        self._wait(1)
+        return self._observations[index].copy()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._actions[:] = np.reshape(actions, self._actions.shape)
+        self.command.value = _STEP
+        for start in self.start_semaphores:
+            start.release()
+
+    def step_wait(self) -> tuple:
+        self._wait(len(self.start_semaphores))
+        return self._observations.copy(), self._rewards.copy(), self._dones.astype(np.bool_), \
+            [{} for _ in range(self.num_envs)]
+
+    def close_extras(self) -> None:
+        self.command.value = _CLOSE
+        for start in self.start_semaphores:
+            start.release()
+        for p in self.processes:
+            p.join()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.close_extras()
+        self.closed = True
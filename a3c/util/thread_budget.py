@@ -0,0 +1,129 @@
+import glob
+import logging
+import os
+from collections import OrderedDict, namedtuple
+
+import torch
+
+# logical cpus a process is pinned to and the number of intra-op threads it uses
+CoreAssignment = namedtuple("CoreAssignment", ["cores", "threads"])
+
+
+def get_physical_cores() -> list:
+    """
+    group the logical cpus available to this process by their physical core based on the sysfs cpu topology
+    :return: list of lists of logical cpu ids, one list per physical core
+    """
+    if hasattr(os, "sched_getaffinity"):
+        available = sorted(os.sched_getaffinity(0))
+    else:
+        available = list(range(os.cpu_count()))
+
+    physical_cores = OrderedDict()
+    for cpu in available:
+        siblings = glob.glob(f"/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list")
+        if siblings:
+            with open(siblings[0]) as f:
+                key = f.read().strip()
+        else:
+            # no topology information, treat each logical cpu as physical core
+            key = str(cpu)
+        physical_cores.setdefault(key, []).append(cpu)
+
+    return list(physical_cores.values())
+
+
+class ThreadBudget(object):
+
+    def __init__(self, n_trainers: int, n_env_processes: int = 0, n_predictors: int = 0, physical_cores: list = None):
+        """
+        Plans intra-op threads and cpu affinity for all processes of A3C/A2C to avoid oversubscription.
+        Environment subprocesses and the test worker are single threaded and get one logical cpu each,
+        the remaining physical cores are split evenly between trainers and predictors,
+        which use one intra-op thread per assigned physical core.
+        If there are not enough cores, processes share them round-robin with one thread each.
+        Example:
+            budget = ThreadBudget(n_trainers=16)
+            # in the process of worker 3
+            apply_core_assignment(budget.trainer(3))
+        :param n_trainers: number of training workers
+        :param n_env_processes: number of environment subprocesses of each trainer (SubprocVecEnv)
+        :param n_predictors: number of predictor processes
+        :param physical_cores: optional list of lists of logical cpu ids per physical core, default is this machine
+        """
+        self.physical_cores = physical_cores if physical_cores is not None else get_physical_cores()
+        # spread over the physical cores first, hyper-threading siblings are used last
+        max_siblings = max(len(core) for core in self.physical_cores)
+        logical_cpus = [core[i] for i in range(max_siblings) for core in self.physical_cores if i < len(core)]
+
+        n_light = 1 + n_trainers * n_env_processes
+        n_heavy = n_trainers + n_predictors
+
+        # light processes take logical cpus from the last physical cores, siblings first
+        light_cpus = []
+        n_light_cores = 0
+        for core in reversed(self.physical_cores):
+            if len(light_cpus) >= n_light:
+                break
+            light_cpus += core[:n_light - len(light_cpus)]
+            n_light_cores += 1
+        heavy_cores = self.physical_cores[:len(self.physical_cores) - n_light_cores]
+
+        if len(light_cpus) >= n_light and len(heavy_cores) >= n_heavy:
+            cores_per_process = len(heavy_cores) // max(n_heavy, 1)
+            heavy = [heavy_cores[i * cores_per_process:(i + 1) * cores_per_process] for i in range(n_heavy)]
+            # remaining physical cores go to the first processes
+            for i, core in enumerate(heavy_cores[n_heavy * cores_per_process:]):
+                heavy[i].append(core)
+
+            heavy = [CoreAssignment([cpu for core in cores for cpu in core], len(cores)) for cores in heavy]
+            light = [CoreAssignment([cpu], 1) for cpu in light_cpus]
+        else:
+            # oversubscribed, share all logical cpus round-robin
+            heavy = [CoreAssignment([logical_cpus[i % len(logical_cpus)]], 1) for i in range(n_heavy)]
+            light = [CoreAssignment([logical_cpus[(n_heavy + i) % len(logical_cpus)]], 1) for i in range(n_light)]
+
+        self.assignments = OrderedDict()
+        self.assignments["test"] = light[0]
+        for i in range(n_trainers):
+            self.assignments[f"trainer_{i}"] = heavy[i]
+            for j in range(n_env_processes):
+                self.assignments[f"env_{i}_{j}"] = light[1 + i * n_env_processes + j]
+        for i in range(n_predictors):
+            self.assignments[f"predictor_{i}"] = heavy[n_trainers + i]
+
+    def trainer(self, worker_id: int) -> CoreAssignment:
+        return self.assignments[f"trainer_{worker_id}"]
+
+    def env(self, worker_id: int, rank: int) -> CoreAssignment:
+        return self.assignments[f"env_{worker_id}_{rank}"]
+
+    def predictor(self, predictor_id: int) -> CoreAssignment:
+        return self.assignments[f"predictor_{predictor_id}"]
+
+    def test(self) -> CoreAssignment:
+        return self.assignments["test"]
+
+    def log(self) -> None:
+        """
+        log the planned assignments
+        :return: None
+        """
+        logging.info(f"Thread budget for {sum(len(c) for c in self.physical_cores)} logical cpus on "
+                     f"{len(self.physical_cores)} physical cores:")
+        for name, assignment in self.assignments.items():
+            logging.info(f"{name}: cpus={assignment.cores}, threads={assignment.threads}")
+
+
+def apply_core_assignment(assignment: CoreAssignment) -> None:
+    """
+    set the intra-op threads and the cpu affinity of the current process
+    :param assignment: planned cpus and threads, does nothing for None
+    :return: None
+    """
+    if assignment is None:
+        return
+
+    torch.set_num_threads(assignment.threads)
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, assignment.cores)
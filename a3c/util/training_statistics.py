@@ -0,0 +1,167 @@
+import logging
+import queue
+import threading
+
+import torch
+from tensorboardX import SummaryWriter
+
+
+class AsyncSummaryWriter(object):
+
+    def __init__(self, max_pending: int = 1000, **kwargs):
+        """
+        Tensorboard writer, which creates and writes the summaries in a background thread.
+        Logging only puts the scalars into a queue and never blocks the caller, if the queue is full the scalars are
+        dropped.
+        Example:
+            writer = AsyncSummaryWriter(log_dir='experiments/runs/')
+            writer.add_scalar("reward/global", reward, T)
+            writer.write({"loss": loss, "lr": lr}, T)
+        :param max_pending: maximum number of queued writes
+        :param kwargs: arguments of the tensorboardX SummaryWriter
+        """
+        self.writer = SummaryWriter(**kwargs)
+        self.n_dropped = 0
+
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def add_scalar(self, tag: str, value: float, step: int) -> None:
+        self.write({tag: value}, step)
+
+    def write(self, scalars: dict, step: int) -> None:
+        """
+        queue scalars for the background thread
+        :param scalars: dict of tag and value
+        :param step: global step of the scalars
+        :return: None
+        """
+        try:
+            self.queue.put_nowait((scalars, step))
+        except queue.Full:
+            self.n_dropped += 1
+
+    def close(self) -> None:
+        """
+        write all pending scalars and close the summary writer
+        :return: None
+        """
+        self.queue.put(None)
+        self.thread.join()
+        self.writer.close()
+        if self.n_dropped > 0:
+            logging.warning(f"Dropped {self.n_dropped} tensorboard writes.")
+
+    def _run(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+
+            scalars, step = item
+            for tag, value in scalars.items():
+                self.writer.add_scalar(tag, value, step)
+
+
+class TrainingStatistics(object):
+
+    def __init__(self, split_model: bool = False):
+        """
+        Accumulates gradient, value, reward and loss statistics of several updates with torch reductions.
+        Each update only adds sums, sums of squares, maxima and minima of the flat gradients and the rollout to
+        preallocated accumulators without copies to numpy. flush() returns the statistics pooled over all updates
+        since the last flush.
+        Example:
+            statistics.update([model.flat_parameters.grad], storage.values, storage.rewards, [loss, ...])
+            ...
+            writer.write(statistics.flush(), T)
+        :param split_model: statistics of separate actor and critic gradients
+        """
+        self.grad_prefixes = ["grad/actor/", "grad/critic/"] if split_model else ["grad/"]
+        self.loss_tags = ["loss", "loss/policy", "loss/value", "loss/entropy"]
+        n_grads = len(self.grad_prefixes)
+
+        # [sum, sum of squares] of each gradient, sum of values, sum of rewards, losses
+        self.sums = torch.zeros(2 * n_grads + 2 + len(self.loss_tags))
+        # [max, -min] of each gradient, max of values, -min of values
+        self.maxima = torch.zeros(2 * n_grads + 2)
+
+        # number of elements of the sums
+        self.n_grad_elements = [0] * n_grads
+        self.n_values = 0
+        self.n_rewards = 0
+        self.n_updates = 0
+
+        # seconds the caller spent on logging since the last flush
+        self.cost = 0.
+
+    def update(self, grads: list, values: torch.Tensor, rewards: torch.Tensor, losses: list) -> None:
+        """
+        accumulate the statistics of one update
+        :param grads: flat gradients, [actor, critic] for split models
+        :param values: values of the rollout [T + 1, n_envs, 1]
+        :param rewards: rewards of the rollout [T, n_envs, 1]
+        :param losses: total, policy, value and entropy loss
+        :return: None
+        """
+        values = values.view(-1)
+        rewards = rewards.view(-1)
+
+        with torch.no_grad():
+            sums = []
+            maxima = []
+            for i, grad in enumerate(grads):
+                sums += [grad.sum(), grad.dot(grad)]
+                maxima += [grad.max(), -grad.min()]
+                self.n_grad_elements[i] += grad.numel()
+
+            sums += [values.sum(), rewards.sum()] + losses
+            maxima += [values.max(), -values.min()]
+
+            if self.n_updates == 0:
+                torch.stack(sums, out=self.sums)
+                torch.stack(maxima, out=self.maxima)
+            else:
+                self.sums.add_(torch.stack(sums))
+                torch.max(self.maxima, torch.stack(maxima), out=self.maxima)
+
+        self.n_values += values.numel()
+        self.n_rewards += rewards.numel()
+        self.n_updates += 1
+
+    def flush(self) -> dict:
+        """
+        reduce the accumulated statistics and reset them
+        :return: dict of tag and value, contains the mean logging cost per update in "logging/cost_us"
+        """
+        if self.n_updates == 0:
+            return {}
+
+        sums = self.sums.tolist()
+        maxima = self.maxima.tolist()
+        scalars = {}
+
+        for i, prefix in enumerate(self.grad_prefixes):
+            mean = sums[2 * i] / self.n_grad_elements[i]
+            mean_square = sums[2 * i + 1] / self.n_grad_elements[i]
+            scalars[prefix + "mean"] = mean
+            scalars[prefix + "l2"] = mean_square ** .5
+            scalars[prefix + "max"] = max(maxima[2 * i], maxima[2 * i + 1])
+            scalars[prefix + "var"] = max(mean_square - mean ** 2, 0.)
+
+        n_grads = len(self.grad_prefixes)
+        scalars["values/mean"] = sums[2 * n_grads] / self.n_values
+        scalars["values/max"] = maxima[2 * n_grads]
+        scalars["values/min"] = -maxima[2 * n_grads + 1]
+        scalars["reward/batch"] = sums[2 * n_grads + 1] / self.n_rewards
+        for i, tag in enumerate(self.loss_tags):
+            scalars[tag] = sums[2 * n_grads + 2 + i] / self.n_updates
+        scalars["logging/cost_us"] = 1e6 * self.cost / self.n_updates
+
+        self.n_grad_elements = [0] * n_grads
+        self.n_values = 0
+        self.n_rewards = 0
+        self.n_updates = 0
+        self.cost = 0.
+        return scalars
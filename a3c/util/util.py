@@ -1,42 +1,100 @@
 import argparse
+import copy
+import math
 import os
 
 from baselines import bench
-from tensorboardX import SummaryWriter
-from torch.multiprocessing import Value
+from baselines.common.vec_env import VecEnv
+from baselines.common.vec_env.dummy_vec_env import DummyVecEnv
+from baselines.common.vec_env.subproc_vec_env import SubprocVecEnv
 
 import numpy as np
 import gym
 import torch
 
-from typing import Tuple, Union, List
+from typing import Tuple, Union
 
 from torch.nn import Module
 
 from a3c.models.actor_critic_network import ActorCriticNetwork
 from a3c.models.actor_network import ActorNetwork
 from a3c.models.critic_network import CriticNetwork
+from a3c.optimizers.fused_shared_adam import FusedSharedAdam
+from a3c.optimizers.fused_shared_rmsprop import FusedSharedRMSProp
 from a3c.optimizers.shared_adam import SharedAdam
 from a3c.optimizers.shared_rmsprop import SharedRMSProp
+from a3c.util.flat_parameters import FlatParameters
+from a3c.util.global_counter import GlobalCounter, GlobalReward
+from a3c.util.shared_memory_vec_env import SharedMemoryVecEnv
+from a3c.util.thread_budget import CoreAssignment, apply_core_assignment
 from a3c.util.normalizer.base_normalizer import BaseNormalizer
 from a3c.util.normalizer.mean_std_normalizer import MeanStdNormalizer
+from a3c.util.normalizer.shared_mean_std_normalizer import SharedMeanStdNormalizer
 from numpy import inf
 
 from a3c.util.normalizer.min_max_normalizer import MinMaxNormalizer
 
 
-def sync_grads(model: ActorCriticNetwork, global_model: ActorCriticNetwork) -> None:
+def get_local_model(global_model: Module, with_grads: bool = True) -> Module:
+    """
+    create a local worker copy of the global model with flat parameters and gradients.
+    Gradients of the global model are backed by a process local flat buffer as well,
+    they are set with sync_grads() before each optimizer step. The buffer is only created once per process,
+    thread workers share the buffer, which is created before the threads are started, see apply_grads().
+    :param global_model: shared global model
+    :param with_grads: create the flat gradient buffers, not required for testing
+    :return: local worker model
+    """
+    model = copy.deepcopy(global_model)
+    model.flat_parameters = FlatParameters(model)
+
+    if with_grads:
+        model.flat_parameters.init_grad()
+        if global_model.flat_parameters.grad is None:
+            global_model.flat_parameters.init_grad()
+
+    return model
+
+
+def sync_weights(model: Module, global_model: Module) -> None:
+    """
+    This method copies the current weights of the global network to the local worker network.
+    :param model: local worker model
+    :param global_model: shared global model
+    :return: None
+    """
+    model.flat_parameters.data.copy_(global_model.flat_parameters.data)
+
+
+def sync_grads(model: Module, global_model: Module) -> None:
     """
     This method synchronizes the grads of the local network with the global network.
-    :return:
     :param model: local worker model
     :param global_model: shared global model
-    :return:
+    :return: None
+    """
+    global_model.flat_parameters.grad.copy_(model.flat_parameters.grad)
+
+
+def apply_grads(model: Module, global_model: Module, optimizer: torch.optim.Optimizer, lock=None) -> None:
+    """
+    This method synchronizes the grads of the local network with the global network and updates the global network.
+    Thread workers share the gradient buffer of the global model, therefore they have to hold a common lock
+    from copying their grads until the end of the optimizer step.
+    :param model: local worker model
+    :param global_model: shared global model
+    :param optimizer: optimizer of the global model
+    :param lock: optional lock, which is shared by all thread workers
+    :return: None
     """
-    for param, global_param in zip(model.parameters(), global_model.parameters()):
-        if global_param.grad is not None:
-            return
-        global_param._grad = param.grad  #
+    if lock is None:
+        sync_grads(model, global_model)
+        optimizer.step()
+        return
+
+    with lock:
+        sync_grads(model, global_model)
+        optimizer.step()
 
 
 def save_checkpoint(state: dict, path='./experiments/checkpoint.pth.tar') -> None:
@@ -49,7 +107,8 @@ def save_checkpoint(state: dict, path='./experiments/checkpoint.pth.tar') -> Non
         'model_critic': model_critic.state_dict(),
         'global_reward': global_reward.value,
         'optimizer': optimizer.state_dict(),
-        'optimizer_critic': optimizer_critic.state_dict()
+        'optimizer_critic': optimizer_critic.state_dict(),
+        'normalizer': normalizer.state_dict()
     }
     :param state: dict of checkpoint info
     :param path: path to save the file to
@@ -79,7 +138,8 @@ def load_saved_optimizer(optimizer: torch.optim.Optimizer, path: str, optimizer_
         print(f"=> no optimizer checkpoint found at '{path}'")
 
 
-def load_saved_model(model: Module, path: str, T: Value, global_reward: Value, model_critic: Module = None) -> None:
+def load_saved_model(model: Module, path: str, T: GlobalCounter, global_reward: GlobalReward,
+                     model_critic: Module = None) -> None:
     """
     load saved model from file
     :param model: model to load params for
@@ -103,8 +163,23 @@ def load_saved_model(model: Module, path: str, T: Value, global_reward: Value, m
         print(f"=> no model checkpoint found at '{path}'")
 
 
-def get_model(env: gym.Env, shared: bool = False, path: str = None, T: Value = None,
-              global_reward: Value = None) -> Union[Tuple[Module, Module], Module]:
+def load_saved_normalizer(normalizer: BaseNormalizer, path: str) -> None:
+    """
+    load normalizer statistics
+    :param normalizer: normalizer to load the statistics for
+    :param path: path to load the statistics from
+    :return: None
+    """
+    if os.path.isfile(path):
+        checkpoint = torch.load(path)
+        # checkpoints of older versions do not contain normalizer statistics
+        normalizer.load_state_dict(checkpoint.get('normalizer'))
+    else:
+        print(f"=> no normalizer checkpoint found at '{path}'")
+
+
+def get_model(env: gym.Env, shared: bool = False, path: str = None, T: GlobalCounter = None,
+              global_reward: GlobalReward = None) -> Union[Tuple[Module, Module], Module]:
     """
     return either one shared model or two separate networks
     :param env: gym environment to determine in- and outputs
@@ -116,7 +191,8 @@ def get_model(env: gym.Env, shared: bool = False, path: str = None, T: Value = N
     """
     if shared:
         shared_model = ActorCriticNetwork(n_inputs=env.observation_space.shape[0], n_actions=env.action_space.shape[0])
-        shared_model.share_memory()
+        # all parameters are views of one flat buffer in shared memory
+        shared_model.flat_parameters = FlatParameters(shared_model, shared=True)
 
         # load model if path specified
         if path is not None:
@@ -127,8 +203,9 @@ def get_model(env: gym.Env, shared: bool = False, path: str = None, T: Value = N
         shared_model_critic = CriticNetwork(n_inputs=env.observation_space.shape[0])
         shared_model_actor = ActorNetwork(n_inputs=env.observation_space.shape[0], n_actions=env.action_space.shape[0])
 
-        shared_model_critic.share_memory()
-        shared_model_actor.share_memory()
+        # all parameters are views of one flat buffer in shared memory
+        shared_model_critic.flat_parameters = FlatParameters(shared_model_critic, shared=True)
+        shared_model_actor.flat_parameters = FlatParameters(shared_model_actor, shared=True)
 
         # load model if path specified
         if path is not None:
@@ -166,7 +243,8 @@ def get_optimizer(optimizer_name: str, model: torch.nn.Module, lr: float, model_
 
 
 def get_shared_optimizer(model: Module, optimizer_name: str, lr: float, path=None, model_critic: Module = None,
-                         optimizer_name_critic: str = None, lr_critic: float = None) \
+                         optimizer_name_critic: str = None, lr_critic: float = None, fused: bool = False,
+                         lock: bool = False) \
         -> Union[torch.optim.Optimizer, Tuple[torch.optim.Optimizer, torch.optim.Optimizer]]:
     """
     get optimizer for given model and optional second critic model with shared statistics
@@ -177,31 +255,19 @@ def get_shared_optimizer(model: Module, optimizer_name: str, lr: float, path=Non
     :param model_critic: possible separate critic model to load if non shared network is used
     :param optimizer_name_critic: optimizer for separate critic model
     :param lr_critic: learning rate for separate critic model
+    :param fused: use optimizers, which update the flat parameters of the models with one set of vector operations
+    :param lock: synchronize the steps of the fused optimizers between all workers
     :return: Optimizer instance or tuple of two optimizers
     """
 
-    if optimizer_name == 'rmsprop':
-        optimizer = SharedRMSProp(model.parameters(), lr=lr)
-
-    elif optimizer_name == 'adam':
-        optimizer = SharedAdam(model.parameters(), lr=lr)
-
-    else:
-        raise ValueError("Selected optimizer is not supported as shared optimizer.")
-
+    optimizer = _get_shared_optimizer(model, optimizer_name, lr, fused, lock)
     optimizer.share_memory()
 
     optimizer_critic = None
 
     if model_critic:
-        if optimizer_name_critic == 'rmsprop':
-            optimizer_critic = SharedRMSProp(model_critic.parameters(), lr=lr_critic)
-
-        elif optimizer_name_critic == 'adam':
-            optimizer_critic = SharedAdam(model_critic.parameters(), lr=lr_critic)
-
-        else:
-            raise ValueError("Selected optimizer is not supported as shared optimizer.")
+        optimizer_critic = _get_shared_optimizer(model_critic, optimizer_name_critic, lr_critic, fused, lock)
+        optimizer_critic.share_memory()
 
     if path is not None:
         load_saved_optimizer(optimizer, path, optimizer_critic)
@@ -212,10 +278,37 @@ def get_shared_optimizer(model: Module, optimizer_name: str, lr: float, path=Non
     return optimizer
 
 
-def get_normalizer(normalizer_type: str, env: gym.Env) -> BaseNormalizer:
+def _get_shared_optimizer(model: Module, optimizer_name: str, lr: float, fused: bool, lock: bool) \
+        -> torch.optim.Optimizer:
+    """
+    create optimizer with shared statistics for one model
+    :param model: model to create optimizer for
+    :param optimizer_name: which optimizer to use
+    :param lr: learning rate for optimizer
+    :param fused: use fused optimizer for the flat parameters of the model
+    :param lock: synchronize the steps of the fused optimizer between all workers
+    :return: Optimizer instance
+    """
+    if optimizer_name == 'rmsprop':
+        if fused:
+            return FusedSharedRMSProp(model.flat_parameters, lr=lr, lock=lock)
+        return SharedRMSProp(model.parameters(), lr=lr)
+
+    elif optimizer_name == 'adam':
+        if fused:
+            return FusedSharedAdam(model.flat_parameters, lr=lr, lock=lock)
+        return SharedAdam(model.parameters(), lr=lr)
+
+    raise ValueError("Selected optimizer is not supported as shared optimizer.")
+
+
+def get_normalizer(normalizer_type: str, env: gym.Env, merge_frequency: int = 10) -> BaseNormalizer:
     """
     returns normalizer instance based on specified type
     :param normalizer_type: string of normalizer instance
+    :param env: environment to determine the observation shape and bounds
+    :param merge_frequency: number of local updates before they are merged into the shared statistics,
+    only used for SharedMeanStd
     :return: BaseNormalizer instance
     """
     if normalizer_type == "MinMax":
@@ -230,7 +323,10 @@ def get_normalizer(normalizer_type: str, env: gym.Env) -> BaseNormalizer:
         normalizer = MinMaxNormalizer(low, high, False)
 
     elif normalizer_type == "MeanStd":
-        normalizer = MeanStdNormalizer()
+        normalizer = MeanStdNormalizer(env.observation_space.shape)
+
+    elif normalizer_type == "SharedMeanStd":
+        normalizer = SharedMeanStdNormalizer(env.observation_space.shape, merge_frequency=merge_frequency)
 
     else:
         # this does nothing
@@ -239,7 +335,7 @@ def get_normalizer(normalizer_type: str, env: gym.Env) -> BaseNormalizer:
     return normalizer
 
 
-def make_env(env_id: str, seed: int, rank: int, log_dir=None) -> callable:
+def make_env(env_id: str, seed: int, rank: int, log_dir=None, cores: CoreAssignment = None) -> callable:
     """
     returns callable to create gym environment or monitor
     from https://github.com/ShangtongZhang/DeepRL/blob/master/deep_rl/component/envs.py
@@ -247,10 +343,13 @@ def make_env(env_id: str, seed: int, rank: int, log_dir=None) -> callable:
     :param seed: seed for env
     :param rank: rank if multiple env are used
     :param log_dir: default log for env, results in returning a monitor instance
+    :param cores: optional cpus and threads of the process, which creates the env, only use for subprocesses
     :return: callable
     """
 
     def _get_env():
+        apply_core_assignment(cores)
+
         env = gym.make(env_id)
         env.seed(seed + rank)
 
@@ -262,70 +361,118 @@ def make_env(env_id: str, seed: int, rank: int, log_dir=None) -> callable:
     return _get_env
 
 
-def log_to_tensorboard(writer: SummaryWriter, model: Module, optimizer: torch.optim.Optimizer,
-                       rewards: List[torch.Tensor], values: List[torch.Tensor], loss: float, policy_loss: float,
-                       value_loss: float, entropy_loss: float, iteration: int, model_critic: Module = None,
-                       optimizer_critic: torch.optim.Optimizer = None) -> None:
-    """
-    log training info to tensorboard
-    :param writer: tensorboard writer
-    :param model: current global model/ for split model: actor model
-    :param optimizer: current optimizer/ for split model: actor optimizer
-    :param rewards: list of tensor rewards of last test run
-    :param values: list of tensor values of last test run
-    :param loss: combined loss value
-    :param policy_loss: policy loss value
-    :param value_loss: value loss value
-    :param entropy_loss: entropy loss value
-    :param iteration: current iteration to log for (best use global counter T)
-    :param model_critic: optional critic model for split architecture
-    :param optimizer_critic: optional critic optimizer for split architecture
-    :return: None
+def make_vec_env(vec_env: str, env_fns: list, envs_per_process: int = 1, cores: list = None) -> VecEnv:
+    """
+    returns vectorized environment for the given env callables
+    :param vec_env: type of vectorized environment, supported: [subproc, shmem, dummy]
+    :param env_fns: callables to create the envs, e.g. from make_env()
+    :param envs_per_process: number of envs per subprocess, only used for shmem
+    :param cores: optional CoreAssignment of each env subprocess, only used for shmem,
+    the subprocesses of subproc are pinned by the env callables
+    :return: VecEnv instance
+    """
+    if vec_env == "subproc":
+        return SubprocVecEnv(env_fns)
+    elif vec_env == "shmem":
+        return SharedMemoryVecEnv(env_fns, envs_per_process=envs_per_process, cores=cores)
+    elif vec_env == "dummy":
+        return DummyVecEnv(env_fns)
+
+    raise ValueError(f"Selected vectorized environment {vec_env} is not supported.")
+
+
+def get_n_env_processes(vec_env: str, n_envs: int, envs_per_process: int = 1) -> int:
+    """
+    returns the number of env subprocesses of a vectorized environment
+    :param vec_env: type of vectorized environment, supported: [subproc, shmem, dummy]
+    :param n_envs: number of envs
+    :param envs_per_process: number of envs per subprocess, only used for shmem
+    :return: number of subprocesses
+    """
+    if vec_env == "subproc":
+        return n_envs
+    elif vec_env == "shmem":
+        return math.ceil(n_envs / envs_per_process)
+    elif vec_env == "dummy":
+        return 0
+
+    raise ValueError(f"Selected vectorized environment {vec_env} is not supported.")
+
+
+def reset_env(env: VecEnv, index: int) -> np.ndarray:
     """
-    if not model_critic:
-        grads = np.concatenate([p.grad.data.cpu().numpy().flatten()
-                                for p in model.parameters()
-                                if p.grad is not None])
-
-        writer.add_scalar("grad/mean", np.mean(grads), iteration)
-        writer.add_scalar("grad/l2", np.sqrt(np.mean(np.square(grads))), iteration)
-        writer.add_scalar("grad/max", np.max(np.abs(grads)), iteration)
-        writer.add_scalar("grad/var", np.var(grads), iteration)
-        for param_group in optimizer.param_groups:
-            writer.add_scalar("lr", param_group['lr'], iteration)
+    reset a single env of a vectorized environment, the vectorized envs only reset automatically at terminal states,
+    but not if an episode is truncated at the maximum episode length
+    :param env: vectorized environment from make_vec_env()
+    :param index: index of the env
+    :return: observation of the env after the reset
+    """
+    if isinstance(env, SharedMemoryVecEnv):
+        return env.reset_env(index)
+    elif isinstance(env, DummyVecEnv):
+        return env.envs[index].reset()
+    elif isinstance(env, SubprocVecEnv):
+        # uses the private pipes and the 'reset' command of the env workers of baselines 0.1.5,
+        # a reset during a pending step_async() would be received by the next step_wait() as step result
+        assert not env.waiting, "Single envs of a SubprocVecEnv can only be reset without a pending step_async()."
+        env.remotes[index].send(('reset', None))
+        return env.remotes[index].recv()
+
+    raise ValueError(f"Resetting single envs of {type(env).__name__} is not supported.")
+
+
+def discounted_cumsum(x: torch.Tensor, discounts: torch.Tensor, bootstrap: torch.Tensor = None) -> torch.Tensor:
+    """
+    reverse discounted scan over the time dimension, which computes
+    y[t] = x[t] + discounts[t] * y[t + 1] with y[T] = bootstrap
+    Each step is a single fused multiply-add of all envs into a preallocated tensor, the cost is O(T * n_envs).
+    :param x: values to accumulate [T, n_envs, 1]
+    :param discounts: discount for each step, which is 0 for terminal states [T, n_envs, 1]
+    :param bootstrap: optional value after the last step [n_envs, 1]
+    :return: discounted cumulative sum [T, n_envs, 1]
+    """
+    T = x.shape[0]
+    y = torch.empty_like(x)
+
+    if bootstrap is None:
+        y[-1] = x[-1]
     else:
-        grads_critic = np.concatenate([p.grad.data.cpu().numpy().flatten()
-                                       for p in model_critic.parameters()
-                                       if p.grad is not None])
-
-        grads_actor = np.concatenate([p.grad.data.cpu().numpy().flatten()
-                                      for p in model.parameters()
-                                      if p.grad is not None])
-
-        writer.add_scalar("grad/actor/mean", np.mean(grads_actor), iteration)
-        writer.add_scalar("grad/actor/l2", np.sqrt(np.mean(np.square(grads_actor))), iteration)
-        writer.add_scalar("grad/actor/max", np.max(np.abs(grads_actor)), iteration)
-        writer.add_scalar("grad/actor/var", np.var(grads_actor), iteration)
-
-        writer.add_scalar("grad/critic/mean", np.mean(grads_critic), iteration)
-        writer.add_scalar("grad/critic/l2", np.sqrt(np.mean(np.square(grads_critic))), iteration)
-        writer.add_scalar("grad/critic/max", np.max(np.abs(grads_critic)), iteration)
-        writer.add_scalar("grad/critic/var", np.var(grads_critic), iteration)
-        for param_group in optimizer.param_groups:
-            writer.add_scalar("lr/actor", param_group['lr'], iteration)
-        for param_group in optimizer_critic.param_groups:
-            writer.add_scalar("lr/critic", param_group['lr'], iteration)
-
-    valuelist = [v.detach().numpy() for v in values]
-
-    writer.add_scalar("values/mean", np.mean(valuelist), iteration)
-    writer.add_scalar("values/min", np.min(valuelist), iteration)
-    writer.add_scalar("values/max", np.max(valuelist), iteration)
-    writer.add_scalar("reward/batch", np.mean(np.array([r.detach().numpy() for r in rewards])), iteration)
-    writer.add_scalar("loss", loss, iteration)
-    writer.add_scalar("loss/policy", policy_loss, iteration)
-    writer.add_scalar("loss/value", value_loss, iteration)
-    writer.add_scalar("loss/entropy", entropy_loss, iteration)
+        torch.addcmul(x[-1], discounts[-1], bootstrap, out=y[-1])
+
+    for t in reversed(range(T - 1)):
+        torch.addcmul(x[t], discounts[t], y[t + 1], out=y[t])
+
+    return y
+
+
+def compute_returns_and_advantages(rewards: torch.Tensor, values: torch.Tensor, terminals: torch.Tensor,
+                                   discount: float, tau: float, gae: bool = True) \
+        -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    compute n-step returns and advantages for a rollout
+    :param rewards: rewards of the rollout [T, n_envs, 1]
+    :param values: value estimates including the bootstrap value of the last state [T + 1, n_envs, 1]
+    :param terminals: 0 if the step was terminal else 1 [T, n_envs, 1]
+    :param discount: discount factor
+    :param tau: bias-variance tradeoff for generalized advantage estimation
+    :param gae: use generalized advantage estimation
+    :return: returns, advantages, both detached [T, n_envs, 1]
+    """
+    values = values.detach()
+
+    # returns can be seen as G = rewards[i] + discount * terminals[i] * G for the course of the rollout
+    returns = discounted_cumsum(rewards, discount * terminals, values[-1])
+
+    if gae:
+        # Generalized Advantage Estimation,
+        # terminals are used to "reset" advantages to 0, because reset is called internally in the env
+        # and a new trajectory started
+        td_error = rewards + discount * terminals * values[1:] - values[:-1]
+        advantages = discounted_cumsum(td_error, discount * tau * terminals)
+    else:
+        advantages = returns - values[:-1]
+
+    return returns, advantages
 
 
 def shape_reward(args, reward: np.ndarray):
@@ -382,6 +529,16 @@ def parse_args(args: list) -> argparse.Namespace:
                         help='Adjusts the bias-variance tradeoff for GAE. (default: 0.99)')
     parser.add_argument('--entropy-loss-weight', type=float, default=1e-4,
                         help='Entropy term coefficient. (default: 1e-4)')
+    parser.add_argument('--batched-forward', default=False, action='store_true',
+                        help='Select actions without gradients and compute values, log probabilities and entropies '
+                             'with one batched forward pass after each rollout. (default: False)')
+    parser.add_argument('--predictors', type=int, default=0,
+                        help='Number of predictor processes, which select the actions for all workers with batched '
+                             'forward passes. 0 selects the actions in each worker. Implies --batched-forward. '
+                             '(default: 0)')
+    parser.add_argument('--thread-budget', default=False, action='store_true',
+                        help='Assign intra-op threads and cpu affinity to all worker, environment and test processes '
+                             'based on the cpu topology. Not supported for --worker-backend thread. (default: False)')
     parser.add_argument('--max-grad-norm', type=float, default=1,
                         help='Maximum gradient norm. (default: 1)')
     parser.add_argument('--seed', type=int, default=1,
@@ -391,22 +548,68 @@ def parse_args(args: list) -> argparse.Namespace:
                              'For >1 A3C is used with the specified number of workers. (default: 1)')
     parser.add_argument('--n-envs', type=int, default=5,
                         help='Number of environment for A2C (--worker 1) in one batch. (default: 5)')
+    parser.add_argument('--vec-env', type=str, default="subproc",
+                        help='Type of vectorized environment for A2C, supported: [subproc, shmem, dummy]. '
+                             '(default: subproc)')
+    parser.add_argument('--envs-per-process', type=int, default=1,
+                        help='Number of environments in each subprocess of the shmem vectorized environment. '
+                             '(default: 1)')
+    parser.add_argument('--worker-envs', type=int, default=1,
+                        help='Number of environments of each A3C worker, more than 1 runs each worker with its own '
+                             'vectorized environment of the type --vec-env. Not used for A2C. (default: 1)')
+    parser.add_argument('--worker-backend', type=str, default='process',
+                        help='Run the A3C training workers as processes or as threads of the main process, which '
+                             'share the global model directly, supported: [process, thread]. (default: process)')
+    parser.add_argument('--async-envs', default=False, action='store_true',
+                        help='Split the environments of each worker into two groups and select the actions of one '
+                             'group while the other group is simulated. Implies --batched-forward, requires at least 2 '
+                             'environments per worker and is not supported with predictors. (default: False)')
     parser.add_argument('--max-episode-length', type=int, default=5000,
                         help='Maximum length of an episode. (default: 5000)')
     parser.add_argument('--no-shared-optimizer', default=False, action='store_true',
                         help='Use optimizer with shared statistics. (default: False)')
     parser.add_argument('--optimizer', type=str, default="adam",
                         help='Type of optimizer, supported: [rmsprop, adam]. (default: adam)')
+    parser.add_argument('--fused-optimizer', default=False, action='store_true',
+                        help='Use shared optimizers, which update all parameters of a model with one set of vector '
+                             'operations. (default: False)')
+    parser.add_argument('--optimizer-lock', default=False, action='store_true',
+                        help='Synchronize the steps of the fused shared optimizers between all workers with a lock. '
+                             '(default: False)')
     parser.add_argument('--lr-scheduler', type=str, default=None,
                         help='Type of learning rate scheduler to use, supported: [None, exponential]. (default: None)')
     parser.add_argument('--lr-scheduler-step', type=int, default=50000,
                         help='Number of steps before lr decay with gamma .99, (default: 50000)')
     parser.add_argument('--normalizer', type=str, default=None,
-                        help='Type of normalizer, supported: [None, MeanStd, MinMax]. (default: None)')
+                        help='Type of normalizer, supported: [None, MeanStd, SharedMeanStd, MinMax]. SharedMeanStd '
+                             'shares the statistics between all workers. (default: None)')
+    parser.add_argument('--normalizer-merge-frequency', type=int, default=10,
+                        help='Number of steps after which each worker merges its observations into the shared '
+                             'statistics of the SharedMeanStd normalizer. (default: 10)')
     parser.add_argument('--test', default=False, action='store_true',
                         help='Start run without training and evaluate for number of --test-runs (default: False)')
+    parser.add_argument('--export', type=str, default=None,
+                        help='Save the clipped mean action of the model loaded from --path with the folded normalizer '
+                             'as TorchScript policy to the given file instead of training, which can be run with '
+                             'a3c_deploy_runner.py. (default: None)')
+    parser.add_argument('--quantize', default=False, action='store_true',
+                        help='Evaluate and export the model with dynamically int8 quantized linear layers and log the '
+                             'deviation of the actions from the fp32 model. (default: False)')
     parser.add_argument('--test-runs', type=int, default=10,
                         help='Number of test evaluation runs during training or in test mode (default: 10)')
+    parser.add_argument('--eval-frequency', type=int, default=0,
+                        help='Evaluate a snapshot of the global model every X global steps with all test runs in '
+                             'parallel on --eval-envs environments without rendering, 0 evaluates continuously '
+                             'with a single environment. (default: 0)')
+    parser.add_argument('--eval-envs', type=int, default=4,
+                        help='Number of environments of the vectorized evaluation, only used with '
+                             '--eval-frequency. (default: 4)')
+    parser.add_argument('--keep-checkpoints', type=int, default=5,
+                        help='Number of checkpoints with the best test rewards, which are kept besides the latest '
+                             'checkpoint. (default: 5)')
+    parser.add_argument('--checkpoint-interval', type=float, default=0,
+                        help='Seconds between periodic checkpoints for crash recovery, 0 only saves new best '
+                             'models. (default: 0)')
     parser.add_argument('--path', type=str, default=None,
                         help='Weight location for the models to load. (default: None)')
     parser.add_argument('--log-dir', type=str, default=None,
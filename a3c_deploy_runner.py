@@ -0,0 +1,111 @@
+import argparse
+import logging
+import sys
+import time
+
+import gym
+import numpy as np
+import quanser_robots
+import torch
+
+from experiments.util.logger_util import enable_logging
+
+
+def log_latency_histogram(latencies: np.ndarray, budget: float, n_bins: int = 10) -> None:
+    """
+    log percentiles and a text histogram of the per step latencies
+    :param latencies: latencies of all steps in seconds
+    :param budget: time budget of one control step in seconds
+    :param n_bins: number of histogram bins
+    :return: None
+    """
+    latencies = latencies * 1e6
+    budget = budget * 1e6
+
+    p50, p90, p99, p999 = np.percentile(latencies, [50, 90, 99, 99.9])
+    logging.info(f"Latency [us] over {len(latencies)} steps -- mean={latencies.mean():.1f} -- p50={p50:.1f} -- "
+                 f"p90={p90:.1f} -- p99={p99:.1f} -- p99.9={p999:.1f} -- max={latencies.max():.1f}")
+    logging.info(f"Steps over the budget of {budget:.0f}us: {np.sum(latencies > budget)}")
+
+    counts, edges = np.histogram(latencies, bins=n_bins)
+    for count, low, high in zip(counts, edges[:-1], edges[1:]):
+        bar = "#" * int(np.ceil(50 * count / counts.max()))
+        logging.info(f"{low:9.1f} - {high:9.1f}us | {count:7d} {bar}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='low latency runner for exported A3C policies')
+    parser.add_argument('--policy', type=str, required=True,
+                        help='TorchScript policy exported with a3c_runner.py --export.')
+    parser.add_argument('--env-name', default='CartpoleStabShort-v0',
+                        help='Name of the gym environment to use. (default: CartpoleStabShort-v0)')
+    parser.add_argument('--episodes', type=int, default=1,
+                        help='Number of episodes to run. (default: 1)')
+    parser.add_argument('--max-episode-length', type=int, default=5000,
+                        help='Maximum length of an episode. (default: 5000)')
+    parser.add_argument('--control-frequency', type=float, default=500,
+                        help='Control frequency in Hz, which defines the latency budget of one step. (default: 500)')
+    parser.add_argument('--warmup-steps', type=int, default=100,
+                        help='Number of forward passes before the measurement. (default: 100)')
+    parser.add_argument('--threads', type=int, default=1,
+                        help='Number of intra-op threads of pytorch. (default: 1)')
+    parser.add_argument('--seed', type=int, default=1,
+                        help='Seed of the environment. (default: 1)')
+    parser.add_argument('--no-render', default=False, action='store_true',
+                        help='Do not render the simulation. (default: False)')
+    args = parser.parse_args(sys.argv[1:])
+
+    enable_logging(logging_lvl=logging.INFO)
+
+    torch.set_num_threads(args.threads)
+
+    if "RR" in args.env_name:
+        env = quanser_robots.GentlyTerminating(gym.make(args.env_name))
+    else:
+        env = gym.make(args.env_name)
+    env.seed(args.seed)
+
+    policy = torch.jit.load(args.policy)
+    policy.eval()
+
+    # preallocated input and output, the observations and actions are written in place
+    observation = torch.zeros(1, env.observation_space.shape[0])
+    observation_np = observation.numpy()
+    action = np.zeros(env.action_space.shape[0])
+
+    latencies = np.zeros(args.episodes * args.max_episode_length)
+    n_steps = 0
+
+    with torch.no_grad():
+        for _ in range(args.warmup_steps):
+            policy(observation)
+
+        for episode in range(args.episodes):
+            state = env.reset()
+            episode_reward = 0
+
+            for t in range(args.max_episode_length):
+                start = time.perf_counter()
+                observation_np[0] = state
+                action[:] = policy(observation)[0].numpy()
+                latencies[n_steps] = time.perf_counter() - start
+                n_steps += 1
+
+                state, reward, done, _ = env.step(action)
+                episode_reward += reward
+
+                if not args.no_render and "RR" not in args.env_name:
+                    env.render()
+
+                if done:
+                    break
+
+            logging.info(f"Episode {episode}: reward={episode_reward:.5f} -- length={t + 1}")
+
+    env.close()
+
+    log_latency_histogram(latencies[:n_steps], 1. / args.control_frequency)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import csv
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+
+class _NullPhase(object):
+    """
+    Context manager which does nothing, returned for all phases of a disabled timer.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase(object):
+    """
+    Context manager which measures the wall-clock time of one named phase.
+    """
+
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name: str):
+        self.timer = timer
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.timer.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class PhaseTimer(object):
+
+    def __init__(self, enabled: bool = False):
+        """
+        Lightweight instrumentation of named timers and counters, which are aggregated per iteration.
+        If the timer is disabled all calls return immediately.
+        Example:
+            timer = PhaseTimer(enabled=True)
+            with timer.phase("optimize_policy"):
+                ...
+            timer.count("objective_evaluations", 10)
+            timer.end_iteration()
+            timer.save("./experiments/logs/run_timing")
+        :param enabled: enables the measurements
+        """
+        self.enabled = enabled
+
+        # measurements of the current iteration
+        self.times = OrderedDict()
+        self.calls = OrderedDict()
+        self.counters = OrderedDict()
+
+        # records of all finished iterations
+        self.trace = []
+        self.iteration_start = time.perf_counter()
+
+    def phase(self, name: str):
+        """
+        returns a context manager which adds its wall-clock time to the phase with the given name
+        :param name: name of the phase
+        :return: context manager
+        """
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """
+        add a time measurement to a phase
+        :param name: name of the phase
+        :param seconds: measured time in seconds
+        :return: None
+        """
+        self.times[name] = self.times.get(name, 0.) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def count(self, name: str, n: int = 1) -> None:
+        """
+        increment a named counter
+        :param name: name of the counter
+        :param n: increment
+        :return: None
+        """
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def end_iteration(self) -> None:
+        """
+        log a summary line of the current iteration, add it to the trace and reset all timers and counters
+        :return: None
+        """
+        if not self.enabled:
+            return
+
+        record = OrderedDict()
+        record["iteration"] = len(self.trace)
+        record["total"] = time.perf_counter() - self.iteration_start
+        for name, seconds in self.times.items():
+            record[f"{name}/time"] = seconds
+            record[f"{name}/calls"] = self.calls[name]
+        record.update(self.counters)
+
+        self.trace.append(record)
+
+        summary = [f"total={record['total']:.3f}s"]
+        if self.times:
+            summary.append(", ".join(f"{name}={t:.3f}s ({self.calls[name]}x)" for name, t in self.times.items()))
+        if self.counters:
+            summary.append(", ".join(f"{name}={n}" for name, n in self.counters.items()))
+        logging.info(f"Timing iteration {record['iteration']}: " + " -- ".join(summary))
+
+        self.times = OrderedDict()
+        self.calls = OrderedDict()
+        self.counters = OrderedDict()
+        self.iteration_start = time.perf_counter()
+
+    def save(self, path_prefix: str) -> None:
+        """
+        export the trace of all finished iterations as "<path_prefix>.json" and "<path_prefix>.csv"
+        :param path_prefix: path of the exported files without file extension
+        :return: None
+        """
+        if not self.enabled:
+            return
+
+        directory = os.path.dirname(path_prefix)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        with open(f"{path_prefix}.json", "w") as f:
+            json.dump(self.trace, f, indent=2)
+
+        # the columns are the union of all phases and counters which occurred in any iteration
+        columns = []
+        for record in self.trace:
+            columns += [key for key in record.keys() if key not in columns]
+
+        with open(f"{path_prefix}.csv", "w", newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(self.trace)
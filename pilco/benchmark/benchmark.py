@@ -0,0 +1,302 @@
+import argparse
+import datetime
+import json
+import logging
+import platform
+import sys
+import timeit
+
+import autograd.numpy as np
+from autograd import value_and_grad
+
+from experiments.util.logger_util import enable_logging
+from pilco.controller.rbf_controller import RBFController
+from pilco.cost_function.saturated_loss import SaturatedLoss
+from pilco.gaussian_process.gaussian_process import GaussianProcess
+from pilco.gaussian_process.multivariate_gp import MultivariateGP
+from pilco.gaussian_process.sparse_multivariate_gp import SparseMultivariateGP
+from pilco.kernel.rbf_kernel import RBFKernel
+from pilco.pilco import PILCO
+from pilco.util.util import parse_args as parse_pilco_args
+
+# parameter grids for each benchmark case, "quick" only runs the first setting of each case
+SWEEPS = {
+    "rbf_kernel": [{"n": n, "state_dim": d} for n in [100, 500, 1000] for d in [4, 6]],
+    "log_marginal_likelihood": [{"n": n, "state_dim": 6} for n in [100, 300, 500]],
+    "log_marginal_likelihood_grad": [{"n": n, "state_dim": 6} for n in [100, 300, 500]],
+    "predict_from_dist": [{"n": n, "state_dim": d} for n in [100, 300, 1000] for d in [4, 6]],
+    "predict_from_dist_sparse": [{"n": 1000, "inducing_points": m, "state_dim": d} for m in [50, 100, 300] for d in
+                                 [4, 6]],
+    "choose_action": [{"features": f, "state_dim": d} for f in [20, 50, 100] for d in [4, 6]],
+    "rollout": [{"n": 300, "inducing_points": m, "features": f, "state_dim": 5} for m in [0, 100] for f in [20, 50]],
+    "trajectory_cost_grad": [{"n": 300, "inducing_points": m, "features": f, "horizon": h, "state_dim": 5} for m in
+                             [0, 100] for f in [20, 50] for h in [10, 50]],
+}
+
+
+def get_dataset(n: int, input_dim: int, n_targets: int) -> tuple:
+    """
+    generate a random regression data set in the same way as the test cases
+    :param n: number of samples
+    :param input_dim: dimensionality of inputs
+    :param n_targets: dimensionality of targets
+    :return: x, y
+    """
+    x = np.random.rand(n, input_dim)
+    a = np.random.rand(input_dim, n_targets)
+    y = np.sin(x).dot(a) + 1e-3 * (np.random.rand(n, n_targets) - 0.5)
+    return x, y
+
+
+def get_input_dist(state_dim: int) -> tuple:
+    """
+    generate a random input distribution
+    :param state_dim: dimensionality of the distribution
+    :return: mean, covariance
+    """
+    mean = np.random.rand(state_dim)
+    cov = np.random.rand(state_dim, state_dim)
+    return mean, cov.dot(cov.T)
+
+
+def get_dynamics_model(n: int, state_dim: int, n_actions: int = 1, inducing_points: int = 0) -> MultivariateGP:
+    """
+    generate a (sparse) dynamics model on random data without optimizing the hyperparameters
+    :param n: number of training samples
+    :param state_dim: state dimensionality
+    :param n_actions: action dimensionality
+    :param inducing_points: number of inducing points, 0 results in using the full GP
+    :return: dynamics model
+    """
+    x, y = get_dataset(n, state_dim + n_actions, state_dim)
+
+    length_scales = np.repeat(np.log(np.std(x, axis=0)).reshape(1, -1), state_dim, axis=0)
+    sigma_f = np.log(np.std(y, axis=0))
+    sigma_eps = np.log(np.std(y, axis=0) / 10)
+
+    if inducing_points:
+        return SparseMultivariateGP(x=x, y=y, n_targets=state_dim, length_scales=length_scales, sigma_f=sigma_f,
+                                    sigma_eps=sigma_eps, n_inducing_points=inducing_points)
+
+    return MultivariateGP(x=x, y=y, n_targets=state_dim, container=GaussianProcess, length_scales=length_scales,
+                          sigma_f=sigma_f, sigma_eps=sigma_eps)
+
+
+def get_policy(features: int, state_dim: int, n_actions: int = 1) -> RBFController:
+    """
+    generate a random RBF policy
+    :param features: number of RBF features
+    :param state_dim: state dimensionality
+    :param n_actions: action dimensionality
+    :return: RBF policy
+    """
+    x, y = get_dataset(features, state_dim, n_actions)
+    length_scales = np.random.rand(n_actions, state_dim)
+    return RBFController(x, y, n_actions=n_actions, length_scales=length_scales)
+
+
+def get_pilco(n: int, inducing_points: int, features: int, state_dim: int, horizon: int = 1) -> PILCO:
+    """
+    generate a PILCO instance with random dynamics model and policy
+    :param n: number of training samples for the dynamics model
+    :param inducing_points: number of inducing points, 0 results in using the full GP
+    :param features: number of RBF features
+    :param state_dim: state dimensionality
+    :param horizon: rollout horizon
+    :return: PILCO instance
+    """
+    # take any env, to avoid issues with gym.make
+    args = parse_pilco_args([])
+    args.env_name = "MountainCarContinuous-v0"
+    args.max_action = np.array([10.0])
+    args.horizon = horizon
+
+    loss = SaturatedLoss(state_dim=state_dim, target_state=np.random.rand(state_dim))
+    pilco = PILCO(args, loss=loss)
+    pilco.env.close()
+
+    pilco.state_dim = state_dim
+    pilco.n_actions = 1
+    pilco.start_mean, pilco.start_cov = get_input_dist(state_dim)
+    pilco.dynamics_model = get_dynamics_model(n, state_dim, inducing_points=inducing_points)
+    pilco.policy = get_policy(features, state_dim)
+
+    return pilco
+
+
+def setup_case(case: str, params: dict) -> callable:
+    """
+    prepare the function to time for a benchmark case
+    :param case: name of the benchmark case
+    :param params: parameters of the case
+    :return: callable without arguments
+    """
+    if case == "rbf_kernel":
+        x, _ = get_dataset(params["n"], params["state_dim"], 1)
+        kernel = RBFKernel()
+        hyperparams = np.random.rand(params["state_dim"] + 1)
+        return lambda: kernel(hyperparams, x)
+
+    if case in ["log_marginal_likelihood", "log_marginal_likelihood_grad"]:
+        x, y = get_dataset(params["n"], params["state_dim"], 1)
+        gp = GaussianProcess(length_scales=np.log(np.std(x, axis=0)), sigma_f=np.log(np.std(y)),
+                             sigma_eps=np.log(np.std(y) / 10))
+        gp.set_XY(x, y)
+        hyperparams = gp._wrap_kernel_hyperparams()
+        if case == "log_marginal_likelihood":
+            return lambda: gp.log_marginal_likelihood(hyperparams)
+        return lambda: value_and_grad(gp.log_marginal_likelihood)(hyperparams)
+
+    if case in ["predict_from_dist", "predict_from_dist_sparse"]:
+        model = get_dynamics_model(params["n"], params["state_dim"], inducing_points=params.get("inducing_points", 0))
+        mean, cov = get_input_dist(params["state_dim"] + 1)
+        # cache gram matrix and betas before timing
+        model.predict_from_dist(mean, cov)
+        return lambda: model.predict_from_dist(mean, cov)
+
+    if case == "choose_action":
+        policy = get_policy(params["features"], params["state_dim"])
+        mean, cov = get_input_dist(params["state_dim"])
+        bound = np.array([10.0])
+        policy.choose_action(mean, cov, bound=bound)
+        return lambda: policy.choose_action(mean, cov, bound=bound)
+
+    if case == "rollout":
+        pilco = get_pilco(params["n"], params["inducing_points"], params["features"], params["state_dim"])
+        pilco.rollout(pilco.policy, pilco.start_mean, pilco.start_cov)
+        return lambda: pilco.rollout(pilco.policy, pilco.start_mean, pilco.start_cov)
+
+    if case == "trajectory_cost_grad":
+        pilco = get_pilco(params["n"], params["inducing_points"], params["features"], params["state_dim"],
+                          horizon=params["horizon"])
+        policy_params = pilco.policy.get_params()
+        return lambda: value_and_grad(pilco._optimize_hyperparams)(policy_params)
+
+    raise ValueError(f"Unknown benchmark case {case}.")
+
+
+def time_case(func: callable, repeats: int, warmup: int = 1) -> dict:
+    """
+    time a benchmark function
+    :param func: function to time
+    :param repeats: number of timed calls
+    :param warmup: number of untimed calls before timing
+    :return: dict of timing statistics in seconds
+    """
+    for _ in range(warmup):
+        func()
+
+    timings = np.zeros(repeats)
+    for i in range(repeats):
+        start = timeit.default_timer()
+        func()
+        timings[i] = timeit.default_timer() - start
+
+    return {"min": float(timings.min()), "median": float(np.median(timings)), "mean": float(timings.mean()),
+            "std": float(timings.std()), "repeats": repeats}
+
+
+def run_benchmarks(cases: list, quick: bool = False, repeats: int = 5, seed: int = 1) -> dict:
+    """
+    run all parameter settings of the given benchmark cases
+    :param cases: names of the benchmark cases to run
+    :param quick: only run the first parameter setting of each case
+    :param repeats: number of timed calls per setting
+    :param seed: random seed for generating the data
+    :return: dict with meta information and the results of each setting
+    """
+    results = {}
+
+    for case in cases:
+        for params in SWEEPS[case][:1] if quick else SWEEPS[case]:
+            np.random.seed(seed)
+            key = case + "[" + ",".join(f"{k}={v}" for k, v in sorted(params.items())) + "]"
+
+            result = time_case(setup_case(case, params), repeats=repeats)
+            result.update({"case": case, "params": params})
+            results[key] = result
+
+            logging.info(f"{key}: median={result['median'] * 1e3:.3f}ms, min={result['min'] * 1e3:.3f}ms")
+
+    meta = {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+    return {"meta": meta, "results": results}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    compare benchmark results against a stored baseline based on the median timings
+    :param results: current benchmark results
+    :param baseline: stored baseline results
+    :param tolerance: relative slow down which is still accepted, e.g. .1 for 10%
+    :return: keys of all settings which regressed
+    """
+    regressions = []
+
+    for key, result in results["results"].items():
+        if key not in baseline["results"]:
+            logging.info(f"{key}: no baseline available")
+            continue
+
+        ratio = result["median"] / baseline["results"][key]["median"]
+
+        if ratio > 1 + tolerance:
+            regressions.append(key)
+            logging.warning(f"{key}: REGRESSION {ratio:.2f}x of baseline")
+        elif ratio < 1 - tolerance:
+            logging.info(f"{key}: improvement {ratio:.2f}x of baseline")
+        else:
+            logging.info(f"{key}: unchanged {ratio:.2f}x of baseline")
+
+    return regressions
+
+
+def parse_args(args: list) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='pilco benchmark')
+    parser.add_argument('--cases', type=str, nargs="*", default=list(SWEEPS.keys()),
+                        help=f'Benchmark cases to run, supported: {list(SWEEPS.keys())}. (default: all)')
+    parser.add_argument('--quick', default=False, action='store_true',
+                        help='Only run the first parameter setting of each case. (default: False)')
+    parser.add_argument('--repeats', type=int, default=5,
+                        help='Number of timed calls for each parameter setting. (default: 5)')
+    parser.add_argument('--seed', type=int, default=1,
+                        help='Random seed for generating the benchmark data. (default: 1)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='JSON file to write the results to. (default: None)')
+    parser.add_argument('--compare', type=str, default=None,
+                        help='JSON file of stored baseline results to compare against. (default: None)')
+    parser.add_argument('--tolerance', type=float, default=.1,
+                        help='Relative slow down of the median timing which is flagged as regression. (default: .1)')
+
+    return parser.parse_args(args)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    enable_logging(logging_lvl=logging.INFO)
+
+    results = run_benchmarks(args.cases, quick=args.quick, repeats=args.repeats, seed=args.seed)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        logging.info(f"Benchmark results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            logging.warning(f"{len(regressions)} regression(s) compared to {args.compare}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
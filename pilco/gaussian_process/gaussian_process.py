@@ -49,6 +49,9 @@ class GaussianProcess(object):
         self.betas = None
         self.K_inv = None
 
+        # number of objective evaluations of the last hyperparameter optimization
+        self.n_evaluations = 0
+
     def set_XY(self, x: np.ndarray, y: np.ndarray) -> None:
         """
         set x and y
@@ -110,6 +113,7 @@ class GaussianProcess(object):
             res = minimize(value_and_grad(self._optimize_hyperparams), params, jac=True, method='CG')
 
         best_params = res.x
+        self.n_evaluations = res.nfev
 
         self.length_scales, self.sigma_f, self.sigma_eps = self.unwrap_params(best_params)
 
@@ -10,6 +10,9 @@ from pilco.gaussian_process.rbf_network import RBFNetwork
 
 class MultivariateGP(object):
 
+    # memory budget in bytes for each block of the Q matrix during moment matching
+    q_block_bytes = 2 ** 26
+
     def __init__(self, x: np.ndarray, y: np.ndarray, n_targets: int,
                  container: Union[Type[GaussianProcess], Type[RBFNetwork], None], length_scales: np.ndarray,
                  sigma_f: np.ndarray, sigma_eps: np.ndarray, is_policy: bool = False):
@@ -32,6 +35,9 @@ class MultivariateGP(object):
         self.beta = None
         self.K_inv = None
 
+        # number of objective evaluations of the last hyperparameter optimization
+        self.n_evaluations = 0
+
         self.models = []
 
         self.make_models(length_scales, sigma_f, sigma_eps, container)
@@ -139,43 +145,80 @@ class MultivariateGP(object):
 
         k = 2 * sigma_f.reshape(target_dim, 1) - .5 * np.sum(zeta_a ** 2, axis=2)
 
-        diff_a = np.repeat(diff_scaled[:, np.newaxis, :, :], target_dim, axis=1)
-        diff_b = -np.repeat(diff_scaled[np.newaxis, :, :, :], target_dim, axis=0)
-
-        precision_add = np.expand_dims(precision_inv2, 0) + np.expand_dims(precision_inv2, 1)
-
-        # compute R, which is used for scaling
-        R = sigma @ precision_add + np.identity(state_dim)
-        scaling_factor = np.linalg.det(R) ** -.5
+        # Q[a,b] = Q[b,a].T, hence only the target pairs with a <= b are computed
+        cov = [[None] * target_dim for _ in range(target_dim)]
 
-        R_inv = np.stack(np.array(
-            [np.linalg.solve(R.reshape(-1, state_dim, state_dim)[i], sigma) for i in range(target_dim ** 2)]))
-        R_inv = R_inv.reshape(target_dim, target_dim, state_dim, state_dim) / 2
+        for a in range(target_dim):
+            for b in range(a, target_dim):
+                # compute R, which is used for scaling
+                R = sigma @ (precision_inv2[a] + precision_inv2[b]) + np.identity(state_dim)
+                scaling_factor = np.linalg.det(R) ** -.5
+                R_inv = np.linalg.solve(R, sigma) / 2
 
-        # compute squared mahalanobis distance
-        diff_a_Q = diff_a @ R_inv
-        diff_b_Q = diff_b @ R_inv
-        mahalanobis_dist = np.expand_dims(np.sum(diff_a_Q * diff_a, axis=-1), axis=-1) + np.expand_dims(
-            np.sum(diff_b_Q * diff_b, axis=-1), axis=-2) - 2 * np.einsum('...ij, ...kj->...ik', diff_a_Q, diff_b)
+                # the trace term is only required for the diagonal, K_inv = 0 for policies anyway
+                K_inv = self.K_inv[a] if a == b and not self.is_policy else None
 
-        # compute Q matrix
-        Q = np.exp(k[:, np.newaxis, :, np.newaxis] + k[np.newaxis, :, np.newaxis, :] + mahalanobis_dist)
+                beta_Q_beta, trace = self._compute_q_terms(diff_scaled[a], diff_scaled[b], k[a], k[b], R_inv,
+                                                           self.beta[:, a], self.beta[:, b], K_inv)
 
-        if self.is_policy:
-            # simplified computation for policy as K_inv = 0 anyway
-            # only adding of ridge term
-            cov = scaling_factor * np.einsum('ji,iljk,kl->il', self.beta, Q, self.beta) + 1e-6 * np.identity(target_dim)
-        else:
-            cov = np.einsum('ji,iljk,kl->il', self.beta, Q, self.beta)
+                if a != b:
+                    cov[a][b] = cov[b][a] = scaling_factor * beta_Q_beta
+                elif self.is_policy:
+                    # only adding of ridge term
+                    cov[a][b] = scaling_factor * beta_Q_beta + 1e-6
+                else:
+                    cov[a][b] = scaling_factor * (beta_Q_beta - trace) + np.exp(2 * sigma_f[a])
 
-            trace = np.hstack(np.array([np.sum(Q[i, i] * self.K_inv[i]) for i in range(target_dim)]))
-            cov = (cov - np.diag(trace)) * scaling_factor + np.diag(np.exp(2 * sigma_f))
+        cov = np.array(cov)
 
         # Centralize moments
         cov = cov - mean[:, np.newaxis] @ mean[np.newaxis, :]
 
         return mean, cov, input_output_cov
 
+    def _compute_q_terms(self, diff_a: np.ndarray, diff_b: np.ndarray, k_a: np.ndarray, k_b: np.ndarray,
+                         R_inv: np.ndarray, beta_a: np.ndarray, beta_b: np.ndarray, K_inv: np.ndarray = None) -> tuple:
+        """
+        computes beta_a.T @ Q_ab @ beta_b and the trace term sum(Q_ab * K_inv) of the predictive covariance
+        without materializing Q_ab at once. Q_ab is evaluated in blocks of rows, which fit into self.q_block_bytes.
+        Q_ab[i,j] = exp(k_a[i] + k_b[j] + (diff_a[i] + diff_b[j]) @ R_inv @ (diff_a[i] + diff_b[j]).T)
+        :param diff_a: scaled centralized inputs of target a [n, input_dim]
+        :param diff_b: scaled centralized inputs of target b [n, input_dim]
+        :param k_a: log kernel values of target a [n]
+        :param k_b: log kernel values of target b [n]
+        :param R_inv: inv(R) @ sigma / 2 for target pair (a, b) [input_dim, input_dim]
+        :param beta_a: betas of target a [n]
+        :param beta_b: betas of target b [n]
+        :param K_inv: inverse gram matrix for the trace term or None if it is not required [n, n]
+        :return: beta_a.T @ Q_ab @ beta_b, sum(Q_ab * K_inv) or 0 if no K_inv is given
+        """
+
+        n = diff_a.shape[0]
+        # about four float64 arrays of shape [block_size, n] are alive for each block
+        block_size = max(1, int(self.q_block_bytes // (8 * n * 4)))
+
+        diff_b_R = diff_b @ R_inv
+        maha_b = np.sum(diff_b_R * diff_b, axis=-1)
+
+        beta_Q_beta = 0
+        trace = 0
+
+        for start in range(0, n, block_size):
+            block = slice(start, min(start + block_size, n))
+
+            # compute squared mahalanobis distance for the rows of the current block
+            diff_a_R = diff_a[block] @ R_inv
+            mahalanobis_dist = np.expand_dims(np.sum(diff_a_R * diff_a[block], axis=-1), axis=-1) + \
+                np.expand_dims(maha_b, axis=0) + 2 * diff_a_R @ diff_b.T
+
+            Q = np.exp(np.expand_dims(k_a[block], axis=-1) + np.expand_dims(k_b, axis=0) + mahalanobis_dist)
+
+            beta_Q_beta = beta_Q_beta + beta_a[block] @ Q @ beta_b
+            if K_inv is not None:
+                trace = trace + np.sum(Q * K_inv[block])
+
+        return beta_Q_beta, trace
+
     def optimize(self) -> None:
         """
         optimizes the hyperparameters for all gaussian process models
@@ -186,9 +229,12 @@ class MultivariateGP(object):
         self.K_inv = None
         self.beta = None
 
+        self.n_evaluations = 0
+
         for i, gp in enumerate(self.models):
             logging.info("Optimization for GP (output={}) started.".format(i))
             gp.optimize()
+            self.n_evaluations += gp.n_evaluations
 
     def save(self, save_dir) -> None:
         """
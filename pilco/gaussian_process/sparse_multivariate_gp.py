@@ -130,6 +130,8 @@ class SparseMultivariateGP(MultivariateGP):
         :return: None
         """
 
+        self.n_evaluations = 0
+
         for i, gp in enumerate(self.models):
             logging.info("Optimization for GP (output={}) started.".format(i))
             try:
@@ -140,6 +142,7 @@ class SparseMultivariateGP(MultivariateGP):
                 msg = gp.optimize('scg', messages=True)
 
             logging.info(msg)
+            self.n_evaluations += msg.funct_eval
             logging.info(gp)
             logging.info(f"Length scales: {gp.kern.lengthscale.values}")
 
@@ -1,5 +1,6 @@
 import datetime
 import logging
+import multiprocessing as mp
 import os
 
 import autograd.numpy as np
@@ -8,6 +9,7 @@ import quanser_robots
 from autograd import value_and_grad
 from scipy.optimize import minimize
 
+from experiments.util.timer_util import PhaseTimer
 from pilco.controller.controller import Controller
 from pilco.controller.linear_controller import LinearController
 from pilco.controller.rbf_controller import RBFController
@@ -15,7 +17,8 @@ from pilco.cost_function.loss import Loss
 from pilco.gaussian_process.gaussian_process import GaussianProcess
 from pilco.gaussian_process.multivariate_gp import MultivariateGP
 from pilco.gaussian_process.sparse_multivariate_gp import SparseMultivariateGP
-from pilco.util.util import load_model, get_env, get_joint_dist
+from pilco.util.util import load_model, get_env, get_joint_dist, sample_random_transitions, \
+    sample_random_transitions_from_env
 
 # define the plotting style
 plt.style.use('seaborn-whitegrid')
@@ -93,6 +96,12 @@ class PILCO(object):
         # test rendering
         self.test = args.test
 
+        # -----------------------------------------------------
+        # optional timing of the training phases
+        self.timer = PhaseTimer(enabled=args.profile)
+        timestamp = datetime.datetime.now().strftime('%Y-%m-%d-%H-%M-%S')
+        self.timing_path = f"./experiments/logs/PILCO_{self.args.env_name}_{timestamp}_timing"
+
         # -----------------------------------------------------
         # create plotting directory
         if self.args.export_plots:
@@ -115,7 +124,8 @@ class PILCO(object):
 
         if not self.data_loaded:
             # if training is not continued get initial data set from random policy
-            self.sample_inital_data_set(n_init=self.args.initial_samples)
+            with self.timer.phase("sample_initial_data_set"):
+                self.sample_inital_data_set(n_init=self.args.initial_samples)
 
         elif "RR" in self.args.env_name and self.policy:
             # continue training policy on the real system by creating some samples first
@@ -126,7 +136,8 @@ class PILCO(object):
             self.state_delta = np.append(self.state_delta, y_test, axis=0)
 
         for _ in range(self.args.steps):
-            self.learn_dynamics_model()
+            with self.timer.phase("learn_dynamics_model"):
+                self.learn_dynamics_model()
             self.learn_policy()
 
             x_test, y_test = self.execute_test_run()
@@ -135,6 +146,9 @@ class PILCO(object):
             self.state_action_pairs = np.append(self.state_action_pairs, x_test, axis=0)
             self.state_delta = np.append(self.state_delta, y_test, axis=0)
 
+            self.timer.end_iteration()
+            self.timer.save(self.timing_path)
+
         self.env.close()
 
     def sample_inital_data_set(self, n_init: int) -> None:
@@ -144,42 +158,39 @@ class PILCO(object):
         :return: None
         """
 
-        state_action_pairs = []
-        state_delta = []
-
-        i = 0
-        state_prev = self.env.reset()
-        done = False
-
-        # sample more than init until current episode is over, select randomly at the end.
-        while not done or i < n_init:
-
-            # take initial random action
-            if self.args.max_action:
-                action = np.random.uniform(-self.args.max_action, self.args.max_action, 1)
-            else:
-                action = self.env.action_space.sample()
-            state, reward, done, _ = self.env.step(action)
+        if self.args.sample_worker > 1 and "RR" not in self.args.env_name:
+            # each worker samples its share in its own env until the share is reached and its episode is over
+            n_samples = int(np.ceil(n_init / self.args.sample_worker))
+            worker_args = [(self.args.env_name, self.args.seed + i + 1, n_samples, self.args.max_action) for i in
+                           range(self.args.sample_worker)]
 
-            # safe state-action pair as input for dynamics GP
-            state_action_pairs.append(np.concatenate([state_prev, action]))
+            with mp.Pool(self.args.sample_worker) as pool:
+                samples = pool.starmap(sample_random_transitions_from_env, worker_args)
 
-            # include some noise to reduce data correlations and non semi definite matrices during optimization
-            noise = np.random.multivariate_normal(np.zeros(state.shape), 1e-6 * np.identity(state.shape[0]))
-            state_delta.append(state - state_prev + noise)
-
-            # reset env if terminal state was reached before max samples were generated
-            if done:
-                state = self.env.reset()
+            state_action_pairs = np.concatenate([x for x, _ in samples])
+            state_delta = np.concatenate([y for _, y in samples])
+        else:
+            # sample more than init until current episode is over, select randomly at the end.
+            state_action_pairs, state_delta = sample_random_transitions(self.env, n_init, self.args.max_action)
 
-            state_prev = state
-            i += 1
+        # include some noise to reduce data correlations and non semi definite matrices during optimization
+        state_delta = state_delta + self.sample_noise(state_delta.shape)
 
         # sample some random training samples
         idx = np.random.choice(range(0, len(state_action_pairs)), n_init, replace=False)
 
-        self.state_action_pairs = np.array(state_action_pairs)[idx]
-        self.state_delta = np.array(state_delta)[idx]
+        self.state_action_pairs = state_action_pairs[idx]
+        self.state_delta = state_delta[idx]
+
+    @staticmethod
+    def sample_noise(shape: tuple, variance: float = 1e-6) -> np.ndarray:
+        """
+        draw gaussian noise for all state deltas in one batch
+        :param shape: shape of the state deltas [n_samples, state_dim]
+        :param variance: variance of the noise
+        :return: noise of given shape
+        """
+        return np.random.multivariate_normal(np.zeros(shape[1]), variance * np.identity(shape[1]), size=shape[0])
 
     def learn_dynamics_model(self) -> None:
         """
@@ -203,6 +214,7 @@ class PILCO(object):
             self.dynamics_model.fit(self.state_action_pairs, self.state_delta)
 
         self.dynamics_model.optimize()
+        self.timer.count("dynamics_objective_evaluations", self.dynamics_model.n_evaluations)
 
     def learn_policy(self, target_noise: float = 0.1) -> None:
         """
@@ -233,7 +245,8 @@ class PILCO(object):
             else:
                 raise ValueError(f"Unsupported policy {self.args.policy} found.")
 
-        self.optimize_policy()
+        with self.timer.phase("optimize_policy"):
+            self.optimize_policy()
 
     def get_trajectory_estimates(self, policy: Controller):
         """
@@ -304,8 +317,9 @@ class PILCO(object):
 
         # ------------------------------------------------
         # get mean and covar of next action, optionally with squashing and scaling towards an action bound
-        action_mean, action_cov, action_input_output_cov = policy.choose_action(state_mean, state_cov,
-                                                                                bound=self.args.max_action)
+        with self.timer.phase("rollout/choose_action"):
+            action_mean, action_cov, action_input_output_cov = policy.choose_action(state_mean, state_cov,
+                                                                                    bound=self.args.max_action)
 
         # ------------------------------------------------
         # get joint dist p(x,u)
@@ -316,8 +330,9 @@ class PILCO(object):
 
         # ------------------------------------------------
         # compute delta and build next state dist
-        delta_mean, delta_cov, delta_input_output_cov = self.dynamics_model.predict_from_dist(state_action_mean,
-                                                                                              state_action_cov)
+        with self.timer.phase("rollout/predict_from_dist"):
+            delta_mean, delta_cov, delta_input_output_cov = self.dynamics_model.predict_from_dist(state_action_mean,
+                                                                                                  state_action_cov)
 
         # cross cov is times inv(s), see matlab code
         delta_input_output_cov = state_action_input_output_cov @ delta_input_output_cov
@@ -347,6 +362,7 @@ class PILCO(object):
                            options=options)
 
         self.policy.set_params(res.x)
+        self.timer.count("policy_optimizer_iterations", res.nit)
 
         # Make one more run for plots
         cost = self.compute_trajectory_cost(policy=self.policy)
@@ -364,6 +380,7 @@ class PILCO(object):
         """
 
         self.policy.set_params(params)
+        self.timer.count("policy_objective_evaluations")
 
         # cost of trajectory
         return self.compute_trajectory_cost(self.policy)
@@ -386,45 +403,47 @@ class PILCO(object):
 
         done = False
         t = 0
-        while not done:
-            if not self.args.no_render:
-                self.env.render()
-            t += 1
-
-            # no uncertainty during testing required
-            action, _, _ = self.policy.choose_action(state_prev, 0 * np.identity(len(state_prev)),
-                                                     bound=self.args.max_action)
-            action = action.flatten()
+        with self.timer.phase("execute_test_run"):
+            while not done:
+                if not self.args.no_render:
+                    self.env.render()
+                t += 1
 
-            state, reward, done, _ = self.env.step(action)
-            state = state
+                # no uncertainty during testing required
+                action, _, _ = self.policy.choose_action(state_prev, 0 * np.identity(len(state_prev)),
+                                                         bound=self.args.max_action)
+                action = action.flatten()
 
-            # create history and new training instance
-            x.append(np.append(state_prev, action))
+                state, reward, done, _ = self.env.step(action)
+                state = state
 
-            noise = np.random.multivariate_normal(np.zeros(state.shape), 1e-6 * np.identity(state.shape[0]))
-            y.append(state - state_prev + noise)
+                # create history and new training instance
+                x.append(np.append(state_prev, action))
+                y.append(state - state_prev)
 
-            rewards += reward
-            state_prev = state
+                rewards += reward
+                state_prev = state
 
         logging.info(f"reward={rewards}, episode_len={t}")
 
-        self.save(rewards)
+        with self.timer.phase("save"):
+            self.save(rewards)
 
         # convert x & y from lists into numpy arrays
         x = np.array(x)
         y = np.array(y)
-
-        # define parameters for plotting
-        estimated_state_means, estimated_state_covs, estimated_action_means, estimated_action_covs =\
-            self.get_trajectory_estimates(self.policy)
-        actual_states = np.array(x[:self.args.horizon, :-1])
-        actual_actions = np.array(x[:self.args.horizon, -self.n_actions:])
-
-        # create plots for the rollouts
-        self.print_trajectory(estimated_state_means, estimated_state_covs, estimated_action_means, estimated_action_covs,
-                              actual_states, actual_actions)
+        y = y + self.sample_noise(y.shape)
+
+        with self.timer.phase("plotting"):
+            # define parameters for plotting
+            estimated_state_means, estimated_state_covs, estimated_action_means, estimated_action_covs =\
+                self.get_trajectory_estimates(self.policy)
+            actual_states = np.array(x[:self.args.horizon, :-1])
+            actual_actions = np.array(x[:self.args.horizon, -self.n_actions:])
+
+            # create plots for the rollouts
+            self.print_trajectory(estimated_state_means, estimated_state_covs, estimated_action_means,
+                                  estimated_action_covs, actual_states, actual_actions)
 
         if len(x) > self.max_samples_test_run:
             idx = np.random.choice(range(0, len(x)), self.max_samples_test_run, replace=False)
@@ -142,6 +142,43 @@ def test_smgpr():
     np.testing.assert_allclose(V, V_mat, rtol=1e-3)
 
 
+def test_mgpr_q_blocks():
+    np.random.seed(1)
+
+    state_dim = 3
+    n_targets = 3
+
+    n_samples = 100
+
+    # Training Dataset
+    X0 = np.random.rand(n_samples, state_dim)
+    A = np.random.rand(state_dim, n_targets)
+    Y0 = np.sin(X0).dot(A) + 1e-3 * (np.random.rand(n_samples, n_targets) - 0.5)
+    length_scales = np.random.rand(n_targets, state_dim)
+    sigma_f = np.ones(n_targets)
+    sigma_eps = np.log(.1 * np.ones(n_targets))
+
+    mgpr = MultivariateGP(X0, Y0, container=GaussianProcess, length_scales=length_scales, n_targets=n_targets,
+                          sigma_f=sigma_f, sigma_eps=sigma_eps)
+
+    # Generate input
+    mu = np.random.rand(1, state_dim)
+    sigma = np.random.rand(state_dim, state_dim)
+    sigma = sigma.dot(sigma.T)
+
+    M, S, V = mgpr.predict_from_dist(mu, sigma)
+
+    # evaluate Q in blocks of 7 rows
+    mgpr.q_block_bytes = 8 * n_samples * 4 * 7
+    M_blocks, S_blocks, V_blocks = mgpr.predict_from_dist(mu, sigma)
+
+    np.testing.assert_allclose(M, M_blocks)
+    np.testing.assert_allclose(S, S_blocks, rtol=1e-10)
+    np.testing.assert_allclose(S, S.T, rtol=1e-10)
+    np.testing.assert_allclose(V, V_blocks)
+
+
 if __name__ == '__main__':
     test_mgpr()
     test_smgpr()
+    test_mgpr_q_blocks()
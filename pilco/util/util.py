@@ -1,5 +1,6 @@
 import argparse
 import logging
+import multiprocessing as mp
 import time
 from typing import Tuple
 
@@ -11,6 +12,9 @@ from gym.wrappers import Monitor
 
 from pilco.controller.controller import Controller
 
+# policy and env of the current evaluate_policy_parallel() worker process
+_evaluation_worker = {}
+
 
 def load_model(path):
     return pickle.load(open(path, "rb"))
@@ -41,37 +45,191 @@ def evaluate_policy(policy: Controller, env: gym.Env, n_runs: int = 100, max_act
     lengths = np.zeros(n_runs)
 
     for i in range(n_runs):
-        state_prev = env.reset().flatten()
+        render = not no_render and "RR" not in env.spec.id and i == 0
+        rewards[i], lengths[i] = run_episode(policy, env, max_action, render=render)
 
-        done = False
-        sleep = True
+        logging.info(f"episode reward={rewards[i]}, episode length={lengths[i]}")
 
-        while not done:
-            if not no_render and "RR" not in env.spec.id and i == 0:
-                env.render()
-                if sleep:  # add a small delay to do a screen capture of the test run if needed
-                    time.sleep(1)
-                    sleep = False
+    log_evaluation(rewards, lengths)
 
-            lengths[i] += 1
 
-            # no uncertainty during testing required
-            action, _, _ = policy.choose_action(state_prev, 0 * np.identity(len(state_prev)), bound=max_action)
-            action = action.flatten()
+def evaluate_policy_parallel(policy_path: str, env_name: str, n_runs: int = 100,
+                             max_action: np.array = np.array([1]), n_workers: int = None, seed: int = 1) -> None:
+    """
+    execute test runs for a given pilco policy in parallel.
+    Episodes are distributed over a pool of worker processes, which each load the policy once
+    and run their own simulated environment. Episode results are logged as soon as they are finished.
+    Rendering and real robot environments are not supported, use evaluate_policy() instead.
+    :param policy_path: path to the pickled policy
+    :param env_name: name of the simulated gym environment
+    :param n_runs: number of episodes to evaluate
+    :param max_action: max action to take
+    :param n_workers: number of worker processes, if None all available cores are used
+    :param seed: base seed, episode i is run with seed + i
+    :return: None
+    """
 
-            state, reward, done, _ = env.step(action)
-            state = state.flatten()
+    if "RR" in env_name:
+        raise ValueError("Parallel evaluation is only supported for simulated environments.")
 
-            rewards[i] += reward
-            state_prev = state
+    rewards = np.zeros(n_runs)
+    lengths = np.zeros(n_runs)
 
-        logging.info(f"episode reward={rewards[i]}, episode length={lengths[i]}")
-    logging.info(f"mean over {n_runs} runs: reward={rewards.mean()} +/- {rewards.std()}, length={lengths.mean()}"
+    n_workers = min(n_workers or mp.cpu_count(), n_runs)
+
+    with mp.Pool(n_workers, initializer=_init_evaluation_worker, initargs=(policy_path, env_name, max_action)) as pool:
+        # results are streamed back in the order they finish
+        for i, reward, length in pool.imap_unordered(_evaluate_episode, [(i, seed + i) for i in range(n_runs)]):
+            rewards[i] = reward
+            lengths[i] = length
+
+            logging.info(f"episode reward={rewards[i]}, episode length={lengths[i]}")
+
+    log_evaluation(rewards, lengths)
+
+
+def _init_evaluation_worker(policy_path: str, env_name: str, max_action: np.ndarray) -> None:
+    """
+    load policy and environment once per worker process of evaluate_policy_parallel()
+    :param policy_path: path to the pickled policy
+    :param env_name: name of the simulated gym environment
+    :param max_action: max action to take
+    :return: None
+    """
+    _evaluation_worker["policy"] = load_model(policy_path)
+    _evaluation_worker["env"] = get_env(env_name)
+    _evaluation_worker["max_action"] = max_action
+
+
+def _evaluate_episode(episode: Tuple[int, int]) -> Tuple[int, float, int]:
+    """
+    run one episode in a worker process of evaluate_policy_parallel()
+    :param episode: tuple of (episode index, seed for the episode)
+    :return: episode index, episode reward, episode length
+    """
+    i, seed = episode
+    env = _evaluation_worker["env"]
+    env.seed(seed)
+
+    reward, length = run_episode(_evaluation_worker["policy"], env, _evaluation_worker["max_action"])
+
+    return i, reward, length
+
+
+def run_episode(policy: Controller, env: gym.Env, max_action: np.ndarray, render: bool = False) -> Tuple[float, int]:
+    """
+    run one episode for given env and pilco policy
+    :param policy: policy to evaluate
+    :param env: gym environment
+    :param max_action: max action to take
+    :param render: render the episode
+    :return: episode reward, episode length
+    """
+    state_prev = env.reset().flatten()
+
+    done = False
+    sleep = True
+
+    reward_sum = 0
+    length = 0
+
+    while not done:
+        if render:
+            env.render()
+            if sleep:  # add a small delay to do a screen capture of the test run if needed
+                time.sleep(1)
+                sleep = False
+
+        length += 1
+
+        # no uncertainty during testing required
+        action, _, _ = policy.choose_action(state_prev, 0 * np.identity(len(state_prev)), bound=max_action)
+        action = action.flatten()
+
+        state, reward, done, _ = env.step(action)
+        state = state.flatten()
+
+        reward_sum += reward
+        state_prev = state
+
+    return reward_sum, length
+
+
+def log_evaluation(rewards: np.ndarray, lengths: np.ndarray) -> None:
+    """
+    log aggregated statistics of evaluation runs
+    :param rewards: episode rewards
+    :param lengths: episode lengths
+    :return: None
+    """
+    logging.info(f"mean over {len(rewards)} runs: reward={rewards.mean()} +/- {rewards.std()}, length={lengths.mean()}"
                  f" +/- {lengths.std()}")
     logging.info(f"best run: reward={rewards.max()}, length={lengths[rewards.argmax()]}")
     logging.info(f"worst run: reward={rewards.min()}, length={lengths[rewards.argmin()]}")
 
 
+def sample_random_transitions(env: gym.Env, n_samples: int, max_action: np.ndarray = None) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    sample transitions with random actions until at least n_samples are generated and the current episode is over
+    :param env: gym environment
+    :param n_samples: minimum amount of samples to be generated
+    :param max_action: max action for uniform random actions, if None the action space is sampled
+    :return: state-action pairs, state deltas
+    """
+
+    state_action_pairs = []
+    states_prev = []
+    states = []
+
+    i = 0
+    state_prev = env.reset()
+    done = False
+
+    while not done or i < n_samples:
+
+        # take initial random action
+        if max_action:
+            action = np.random.uniform(-max_action, max_action, 1)
+        else:
+            action = env.action_space.sample()
+        state, reward, done, _ = env.step(action)
+
+        # safe state-action pair as input for dynamics GP
+        state_action_pairs.append(np.concatenate([state_prev, action]))
+        states_prev.append(state_prev)
+        states.append(state)
+
+        # reset env if terminal state was reached before max samples were generated
+        if done:
+            state = env.reset()
+
+        state_prev = state
+        i += 1
+
+    return np.array(state_action_pairs), np.array(states) - np.array(states_prev)
+
+
+def sample_random_transitions_from_env(env_name: str, seed: int, n_samples: int, max_action: np.ndarray = None) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    sample random transitions in a newly created simulated environment, used as worker for a process pool
+    :param env_name: name of the simulated gym environment
+    :param seed: seed for env and random actions
+    :param n_samples: minimum amount of samples to be generated
+    :param max_action: max action for uniform random actions, if None the action space is sampled
+    :return: state-action pairs, state deltas
+    """
+    env = get_env(env_name)
+    env.seed(seed)
+    np.random.seed(seed)
+
+    samples = sample_random_transitions(env, n_samples, max_action)
+    env.close()
+
+    return samples
+
+
 def squash_action_dist(mean: np.ndarray, cov: np.ndarray, input_output_cov: np.ndarray, bound: np.ndarray) \
         -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
@@ -159,6 +317,9 @@ def parse_args(args: list) -> argparse.Namespace:
     parser.add_argument('--initial-samples', type=int, default=300,
                         help='Number of initial samples for learning the dynamics before first policy optimization. '
                              '(default: 300)')
+    parser.add_argument('--sample-worker', type=int, default=1,
+                        help='Number of worker processes with their own simulated environment for sampling the initial '
+                             'samples in parallel. (default: 1)')
     parser.add_argument('--max-samples-test-run', type=int, default=300,
                         help='Maximum samples taken from one test episode. This is required to avoid running out of '
                              'memory. (default: 300)')
@@ -202,11 +363,18 @@ def parse_args(args: list) -> argparse.Namespace:
                         help='Start run without training and evaluate for number of --test-runs (default: False)')
     parser.add_argument('--test-runs', type=int, default=10,
                         help='Number of test evaluation runs during training or in test mode (default: 10)')
+    parser.add_argument('--eval-worker', type=int, default=1,
+                        help='Number of worker processes to run the --test-runs of simulated environments in parallel. '
+                             'Rendering is not supported for more than one worker. (default: 1)')
     parser.add_argument('--no-log', default=False, action='store_true',
                         help='Disables exports to a log file into the log directory if set to True. (default: True)')
     parser.add_argument('--export-plots', default=False, action='store_true',
                         help='Exports the trajectory plots as latex TikZ figures into "./experiments/plots/". '
                              'You need to install "matplotlib2tikz" if set to True. (default: False)')
+    parser.add_argument('--profile', default=False, action='store_true',
+                        help='Enables timing of the training phases and counting of objective evaluations. '
+                             'A summary is logged for each iteration and the trace is exported as JSON and CSV '
+                             'to "./experiments/logs/". (default: False)')
     parser.add_argument('--no-render', default=False, action='store_true',
                         help='Disables rendering. (default: False)')
     parser.add_argument('--monitor', default=False, action='store_true',
@@ -9,7 +9,7 @@ from pilco.cost_function.saturated_loss import SaturatedLoss
 from pilco.pilco import PILCO
 import time
 
-from pilco.util.util import parse_args, evaluate_policy, load_model, get_env
+from pilco.util.util import parse_args, evaluate_policy, evaluate_policy_parallel, load_model, get_env
 
 
 def main():
@@ -30,7 +30,11 @@ def main():
         if args.weight_dir[-1] != '/':
             args.weight_dir += '/'
 
-    if args.test:
+    if args.test and args.eval_worker > 1 and "RR" not in args.env_name:
+        env.close()
+        evaluate_policy_parallel(f"{args.weight_dir}policy.p", args.env_name, n_runs=args.test_runs,
+                                 max_action=args.max_action, n_workers=args.eval_worker, seed=args.seed)
+    elif args.test:
         policy = load_model(f"{args.weight_dir}policy.p")
         evaluate_policy(policy, env, max_action=args.max_action, no_render=args.no_render, n_runs=args.test_runs)
         env.close()